@@ -0,0 +1,66 @@
+"""CacheVersions provides subroutines for the versions under which cached data is read, counters in the Django cache
+which are bumped as the data changes so entries cached under a previous version are no longer read (see
+courses.manage.coursetrees).
+
+Versions are only shared by the processes which share the Django cache. The local memory cache is private to each
+process, so reference data kept by a process under a version (see learning_styles.manage.learningstyles) is also read
+again after REFERENCE_DATA_TIMEOUT seconds, which bounds how long a change made by another process goes unseen.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+__version__ = '1.0'
+__author__ = 'Callum Dempsey Leach'
+
+
+def get_cache_version(key: str) -> int:
+    """
+    Returns the version stored under a key, creating it if the key is not cached. Versions start from the current time
+    (in milliseconds) so a version which is evicted and created again does not return to the value of a version whose
+    entries are still cached.
+
+    :param key: The key of the version.
+    :return: Returns the version as an integer.
+    """
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_cache_version(key: str) -> None:
+    """
+    Increments the version stored under a key so the entries of the previous version are no longer read.
+
+    :param key: The key of the version.
+    """
+    try:
+        cache.incr(key)
+    except ValueError:
+        # The version is not cached, creating it starts a version no entry is cached under.
+        get_cache_version(key)
+
+
+def get_reference_data_timeout() -> float:
+    """
+    Returns the number of seconds a process keeps reference data before reading it again (whatever its version).
+
+    :return: Returns the REFERENCE_DATA_TIMEOUT setting (a minute if it is not set).
+    """
+    return getattr(settings, 'REFERENCE_DATA_TIMEOUT', 60)
+
+
+def is_reference_data_current(cached_version: int, loaded_at: float, version: int) -> bool:
+    """
+    Returns whether reference data kept by a process may still be read.
+
+    :param cached_version: The version the data was read under (None if it has not been read).
+    :param loaded_at: The time (of time.monotonic()) the data was read.
+    :param version: The current version of the data.
+    :return: Returns True if the data was read under the current version within REFERENCE_DATA_TIMEOUT seconds.
+    """
+    return cached_version == version and time.monotonic() - loaded_at < get_reference_data_timeout()
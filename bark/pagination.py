@@ -0,0 +1,17 @@
+"""Pagination provides the subroutines shared by the interfaces which page through their listings by cursor (the last
+id or sequence number shown), passed between pages as the "after" query parameter.
+"""
+
+__version__ = '1.0'
+__author__ = 'Callum Dempsey Leach'
+
+
+def get_page_cursor(request) -> int:
+    """
+    Returns the cursor of the requested page (the "after" query parameter), or None for the first page.
+
+    :param request: the HttpRequest object passed.
+    :return returns the cursor as an integer or None.
+    """
+    after = request.GET.get('after', '')
+    return int(after) if after.isdigit() else None
@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'learning_styles',
     'resources',
     'static_containers',
+    'search',
     'students_interfaces',
     'students_interfaces.templatetags',
 ]
@@ -135,3 +136,30 @@ STATICFILES_DIRS = [
 # Where user uploaded files will go (all media)
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/uploaded')
 MEDIA_URL = '/uploaded/'
+
+# Lesson progress write-behind. When enabled, lesson completions are validated in-request and appended to a durable
+# queue in PROGRESS_QUEUE_DIR rather than written to the database, and the flush_progress_queue management command
+# writes them in batched transactions (run it with --loop as a worker alongside the web server).
+PROGRESS_WRITE_BEHIND = False
+PROGRESS_QUEUE_DIR = os.path.join(BASE_DIR, 'progress_queue')
+
+# Lesson ordering. "dense" renumbers the lessons in between whenever a lesson is inserted or moved. "gapped" places the
+# lesson by a sparse ordering key (writing only its own row) and the compact_lesson_order management command derives
+# the sequence numbers students see from the keys (run it with --loop as a worker alongside the web server). Run the
+# command before switching back to "dense".
+LESSON_ORDERING_MODE = 'dense'
+
+# Caches. The trees of courses (a course, its lessons and their learning resources) and pages of the catalog are cached
+# for student pages under versions which are bumped as courses change (see courses.manage.coursetrees). The local memory
+# cache is private to each process, so when serving from several processes configure a shared cache (e.g. memcached)
+# or a change made in one process is not seen by the others until COURSE_TREE_CACHE_TIMEOUT seconds have passed.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+COURSE_TREE_CACHE_TIMEOUT = 60 * 60 * 24
+# Reference data which almost never changes (learning styles) is also kept by each process and read again once its
+# version is bumped or, as a bumped version is not seen by other processes of a local memory cache, after this many
+# seconds.
+REFERENCE_DATA_TIMEOUT = 60
@@ -0,0 +1,74 @@
+"""Transactions provides subroutines for work which should be performed once per transaction after it commits, however
+many rows of the transaction ask for it, e.g. a signal handler which runs for every row of a cascading deletion.
+
+The items of a transaction are gathered in a batch, a callback registered with transaction.on_commit() once per
+transaction, so the work is performed once for all of them. Batches are held per thread and connection by weak
+reference only, so a batch whose callback is discarded by Django (as its transaction or savepoint is rolled back) is
+released with it and the next item starts a new batch. Items added within a savepoint which is rolled back stay in a
+surviving batch, so the work should check its items against the committed rows.
+"""
+
+import threading
+import weakref
+
+from django.db import transaction
+
+__version__ = '1.0'
+__author__ = 'Callum Dempsey Leach'
+
+local = threading.local()
+
+
+class CommitBatch:
+    """
+    The items of a transaction, passed to the work in a single call once it commits.
+    """
+
+    def __init__(self, work):
+        self.work = work
+        self.items = set()
+        self.committed = False
+
+    def __call__(self):
+        self.committed = True
+        self.work(set(self.items))
+
+
+def add_to_commit_batch(name: str, item, work, using: str = None) -> None:
+    """
+    Adds an item to the batch of the current transaction, which is passed to the work once the transaction commits
+    (or immediately if there is no transaction).
+
+    :param name: The name of the batch (the work of each name is performed separately).
+    :param item: The (hashable) item.
+    :param work: The function called with the set of items of the batch.
+    :param using: The alias of the database (the default database if not provided).
+    """
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        work({item})
+        return
+    batches = local.__dict__.setdefault('batches', {})
+    reference = batches.get((connection.alias, name))
+    batch = reference() if reference is not None else None
+    if batch is None or batch.committed:
+        batch = CommitBatch(work)
+        transaction.on_commit(batch, using=using)
+        batches[(connection.alias, name)] = weakref.ref(batch)
+    batch.items.add(item)
+
+
+def discard_from_commit_batch(name: str, item, using: str = None) -> None:
+    """
+    Discards an item from the batch of the current transaction, e.g. once its work has been performed within the
+    transaction.
+
+    :param name: The name of the batch.
+    :param item: The item.
+    :param using: The alias of the database (the default database if not provided).
+    """
+    connection = transaction.get_connection(using)
+    reference = getattr(local, 'batches', {}).get((connection.alias, name))
+    batch = reference() if reference is not None else None
+    if batch is not None and not batch.committed:
+        batch.items.discard(item)
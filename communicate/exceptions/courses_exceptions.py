@@ -11,3 +11,8 @@ class NoCoursesExistException(Exception):
 class ProgressNotFound(Exception):
     """Should be called if progress for a user was not found (and needs handling)"""
     pass
+
+
+class InvalidCourseArchiveException(Exception):
+    """Should be called if a course archive (or its manifest or files) is invalid"""
+    pass
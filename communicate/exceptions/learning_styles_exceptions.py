@@ -1,3 +1,8 @@
 class NoLearningStylesException(Exception):
     """Should be called if no learning styles exist"""
     pass
+
+
+class InvalidQuestionnaireResponsesException(Exception):
+    """Should be called if the responses to a learning styles questionnaire (or their file) are invalid"""
+    pass
@@ -6,3 +6,8 @@ class LessonNotFoundException(Exception):
 class NoLessonsExistException(Exception):
     """Should be called if a lesson does not exist"""
     pass
+
+
+class InvalidLessonSequenceException(Exception):
+    """Should be called if lessons cannot be given the sequence requested"""
+    pass
@@ -0,0 +1,8 @@
+class InvalidSearchQueryException(Exception):
+    """Should be called if a search query has nothing to search for"""
+    pass
+
+
+class SearchUnavailableException(Exception):
+    """Should be called if the search index is not available for the database in use"""
+    pass
@@ -1,17 +1,28 @@
 from collections import Iterable
 
 from django.contrib.auth.models import User
-from django.core.exceptions import ObjectDoesNotExist
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import transaction
 
-from communicate.exceptions.courses_exceptions import CourseNotFoundException
+from communicate.exceptions.courses_exceptions import CourseNotFoundException, InvalidCourseArchiveException
 from communicate.exceptions.learning_resources_exceptions import LearningResourceNotFoundException
-from communicate.exceptions.lessons_exceptions import LessonNotFoundException
+from communicate.exceptions.learning_styles_exceptions import InvalidQuestionnaireResponsesException
+from communicate.exceptions.lessons_exceptions import LessonNotFoundException, InvalidLessonSequenceException
 from courses.manage.courses import get_course_from_id, remove_courses_ids_from_user, \
-    generate_next_lesson_sequence_number
-from courses.manage.lessons import get_lesson_from_id, remove_lessons_ids_from_course
+    generate_next_lesson_sequence_number, get_courses_from_user, get_course_lessons_sorted, split_keyset_page, \
+    clone_course
+from courses.manage.coursearchives import prepare_course_archive, create_course_from_archive, \
+    remove_course_archive_files
+from courses.manage.lessons import get_lesson_from_id, remove_lessons_ids_from_course, move_lesson, reorder_lessons
 from courses.manage.lessonslearningstylesresources import remove_lessonlearningstyleresources_ids_from_lesson, \
     get_lessonslearningstyleresource_from_id
+from communicate.students import update_students_learning_styles
 from courses.models import Courses, Lessons
+from learning_styles.manage.questionnaire import score_questionnaire_responses_csv, MAXIMUM_REPORTED_ERRORS
+from roles.manage.roles import get_users_with_roles_ids
+from search.manage.searchindex import index_course_documents
+from static_containers.manage.dockercontainers import clone_docker_containers, create_docker_containers
+from static_containers.tasks import schedule_docker_container_builds
 
 
 def remove_courses_list(user: User, courses: Iterable):
@@ -58,6 +69,30 @@ def get_leaders_course(course_id: int, user: User):
         raise CourseNotFoundException
 
 
+def get_leaders_courses_page(user: User, after: int = None, page_size: int = 50) -> tuple:
+    """
+    Given a leader will return a page of the courses they own in id order.
+    :param user: The User object representing the leader.
+    :param after: The id of the last course of the previous page, if not provided the first page is returned.
+    :param page_size: The number of courses of a page.
+    :return: Returns a tuple of a list of Courses objects and the cursor of the next page (None if it is the last page).
+    """
+    return split_keyset_page(get_courses_from_user(user, after=after, limit=page_size + 1), page_size, 'id')
+
+
+def get_leaders_course_lessons_page(course: Courses, after: int = None, page_size: int = 100) -> tuple:
+    """
+    Given a course will return a page of its lessons in sequence order.
+    :param course: The Courses object.
+    :param after: The sequence number of the last lesson of the previous page, if not provided the first page is
+    returned.
+    :param page_size: The number of lessons of a page.
+    :return: Returns a tuple of a list of Lessons objects and the cursor of the next page (None if it is the last page).
+    """
+    return split_keyset_page(get_course_lessons_sorted(course, after=after, limit=page_size + 1), page_size,
+                             'sequence_number')
+
+
 def get_leaders_lesson(lesson_id: int, course: Courses, user: User):
     """
     Given a lesson id and a course and a specified leader, returns the lesson for that course for that leader.
@@ -109,3 +144,101 @@ def get_maximum_lesson_sequence_number(course: Courses) -> int:
     """
     next_lesson_sequence_number = generate_next_lesson_sequence_number(course=course)
     return next_lesson_sequence_number
+
+
+def move_leaders_lesson(lesson: Lessons, sequence_number: int):
+    """
+    Given a lesson and a sequence number will move the lesson to that place in its course, shifting the lessons in
+    between by one place.
+    :param lesson: The Lessons object to move.
+    :param sequence_number: The new sequence number of the lesson.
+    :raises: Raises an InvalidLessonSequenceException if the sequence number is outside the course.
+    """
+    if not 1 <= int(sequence_number) <= lesson.course.lessons_set.count():
+        raise InvalidLessonSequenceException
+    move_lesson(lesson, int(sequence_number))
+
+
+def reorder_leaders_lessons(course: Courses, lesson_ids: Iterable):
+    """
+    Given a course and the ids of all of its lessons in a new order will reorder the lessons of the course.
+    :param course: The Courses object to reorder the lessons of.
+    :param lesson_ids: The ids of every lesson of the course in their new order.
+    :raises: Raises an InvalidLessonSequenceException if the ids are not exactly the lessons of the course.
+    """
+    lesson_ids = [int(lesson_id) for lesson_id in lesson_ids]
+    if len(lesson_ids) != len(set(lesson_ids)) or \
+            set(lesson_ids) != set(course.lessons_set.values_list('id', flat=True)):
+        raise InvalidLessonSequenceException
+    reorder_lessons(course, lesson_ids)
+
+
+def clone_leaders_course(course: Courses, title: str = None) -> Courses:
+    """
+    Given a course will copy it along with its lessons and learning resources for its leader. The copied learning
+    resources share the original uploads and built images rather than duplicating or rebuilding them.
+    :param course: The Courses object to copy.
+    :param title: The title of the copy, if not provided the copy has the same title.
+    :return: Returns the new Courses object.
+    """
+    with transaction.atomic():
+        clone, resource_ids = clone_course(course, title=title)
+        clone_docker_containers(resource_ids)
+        index_course_documents(clone)
+    return clone
+
+
+def import_leaders_course(user: User, archive_file) -> Courses:
+    """
+    Given a course archive (see courses.manage.coursearchives) will create its course, lessons and learning resources
+    for a leader in a single transaction. The images of the learning resources are built in the background once the
+    course is committed rather than inline.
+    :param user: The User object representing the leader.
+    :param archive_file: The archive, as a path or file object.
+    :return: Returns the new Courses object.
+    :raises: Raises an InvalidCourseArchiveException if the archive or any of its files are invalid.
+    """
+    try:
+        prepared_archive = prepare_course_archive(archive_file)
+    except ValidationError as e:
+        raise InvalidCourseArchiveException(e.messages[0])
+    try:
+        with transaction.atomic():
+            course, resources = create_course_from_archive(user, prepared_archive)
+            create_docker_containers(resources)
+            index_course_documents(course)
+            schedule_docker_container_builds(resources)
+    except Exception:
+        remove_course_archive_files(prepared_archive)
+        raise
+    return course
+
+
+def import_leaders_questionnaire_responses(user: User, responses_file, purge_progress: bool = False) -> tuple:
+    """
+    Given a CSV file of the responses of a cohort of students to the learning styles questionnaire (see
+    learning_styles.manage.questionnaire) will score every response at once and replace the learning styles of the
+    students with their results in a single transaction. A leader may only import the responses of students (users
+    with no role, who are not staff), so that a new intake can be scored before taking any lesson, an administrator
+    those of any user.
+    :param user: The User object representing the leader, or None for an administrator (e.g. from the command line).
+    :param responses_file: The CSV file, as a file object.
+    :param purge_progress: If true the progress of the students whose learning styles changed is deleted, as it is
+    when a student changes their own learning styles.
+    :return: Returns a tuple of the number of students scored and the number whose learning styles changed.
+    :raises: Raises an InvalidQuestionnaireResponsesException if the file, a response or a student is invalid or a
+    leader imports the responses of a user who is not a student.
+    """
+    try:
+        students_learning_styles = score_questionnaire_responses_csv(responses_file)
+    except ValidationError as e:
+        raise InvalidQuestionnaireResponsesException(e.messages[0])
+    if user is not None and not user.is_superuser:
+        users_with_roles_ids = get_users_with_roles_ids(student.id for student in students_learning_styles)
+        others = [student.username for student in students_learning_styles
+                  if student.is_staff or student.is_superuser or student.id in users_with_roles_ids]
+        if others:
+            raise InvalidQuestionnaireResponsesException(
+                "The following users are not students: " + ", ".join(others[:MAXIMUM_REPORTED_ERRORS]) + ".")
+    changed = update_students_learning_styles(students_learning_styles, purge_progress=purge_progress)
+    return len(students_learning_styles), len(changed)
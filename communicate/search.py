@@ -0,0 +1,23 @@
+from communicate.exceptions.search_exceptions import InvalidSearchQueryException, SearchUnavailableException
+from search.manage.searchindex import search_index, is_search_index_enabled, get_search_match_expression
+
+
+def search_catalog(query: str, page: int = 1, page_size: int = 20) -> tuple:
+    """
+    Given a search query will return a page of the courses, lessons and learning resources which match it, best
+    matches first.
+    :param query: The text searched for.
+    :param page: The page of results (the first page is 1).
+    :param page_size: The number of results of a page.
+    :return: Returns a tuple of a list of dictionaries of the document (course, lesson or resource), id, title,
+    description, course_id and lesson_id of each result and whether there is a next page.
+    :raises: Raises an InvalidSearchQueryException if the query has no terms.
+    :raises: Raises a SearchUnavailableException if the search index is not available.
+    """
+    if not is_search_index_enabled():
+        raise SearchUnavailableException
+    if not get_search_match_expression(query):
+        raise InvalidSearchQueryException
+    assert int(page) > 0
+    results = search_index(query, offset=(page - 1) * page_size, limit=page_size + 1)
+    return results[:page_size], len(results) > page_size
@@ -9,7 +9,7 @@ from static_containers.docker_api.image_utils import prepare_nginx_dockerfile_fo
     has_resource_file_dockerfile, \
     get_dockerfile, create_image
 from static_containers.manage.dockercontainers import get_docker_container_from_resource, \
-    flag_docker_container_for_rebuild
+    flag_docker_container_for_rebuild, get_resource_image_name
 
 
 def lessonslearningstyleresource_to_nginx_alpine_static_container(
@@ -36,10 +36,12 @@ def lessonslearningstyleresource_to_nginx_alpine_static_container(
         prepare_nginx_dockerfile_for_resource(resource_file)
     # Get the dockerfile path
     dockerfile = get_dockerfile(resource_file)
-    # Set container name and image name to be the unique name.
+    # Set container name to be the unique name. The image is named after the resource file so that copies of the
+    # resource (which share the file) share the image.
     container_name = docker_container.unique_name.lower()
-    image_name = docker_container.unique_name.lower()
+    image_name = (docker_container.image_name or docker_container.unique_name).lower()
     if docker_container.build:
+        image_name = get_resource_image_name(resource_file)
         create_image(dockerfile, image_name)
         # If a container for the resource object already exists it needs to be rebuilt.
         # Some people might lose access temporarily during this time.
@@ -47,13 +49,14 @@ def lessonslearningstyleresource_to_nginx_alpine_static_container(
             # Remove the container for the container object
             force_remove_container(container_name)
         # Instantiate a new container using the database details and NGINX default port (80).
-        instantiate_bound_container(container_name, image_name, 80, resource_port)
+        instantiate_bound_container(image_name, container_name, 80, resource_port)
+        docker_container.image_name = image_name
         flag_docker_container_for_rebuild(docker_container, False)
         docker_container.save()
     # If the resource doesn't require rebuilding from a new image then *just* check a container exists (it
     # should if we just instantiated one).
     if not has_container(container_name):
-        instantiate_bound_container(container_name, image_name, 80, resource_port)
+        instantiate_bound_container(image_name, container_name, 80, resource_port)
     # Make sure the container is spun up or refreshed. If an interface error occurs then return a Http500 response
     # (as it may or may not require further investigation).
     try:
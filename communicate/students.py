@@ -2,26 +2,41 @@ from collections import Iterable
 
 from django.contrib.auth.models import User
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 from django.db.models import QuerySet
 
-from communicate.exceptions.courses_exceptions import CourseNotFoundException, NoCoursesExistException
+from bark.cacheversions import get_cache_version, bump_cache_version
+from communicate.exceptions.courses_exceptions import CourseNotFoundException, NoCoursesExistException, \
+    ProgressNotFound
 from communicate.exceptions.learning_resources_exceptions import NoLearningResourcesExistException, \
     LearningResourceNotFoundException
 from communicate.exceptions.learning_styles_exceptions import NoLearningStylesException
 from communicate.exceptions.lessons_exceptions import LessonNotFoundException
 from communicate.exceptions.lessons_exceptions import NoLessonsExistException
-from courses.manage.courses import get_course_from_id, has_course_sequence_number, \
-    get_all, get_course_lesson_from_sequence_number
-from courses.manage.lessons import get_lesson_from_id
+from courses.manage.courses import has_course_sequence_number, \
+    get_all, get_course_lesson_from_sequence_number, get_course_lessons_from_ids
+from courses.manage.coursetrees import get_course_tree as get_cached_course_tree, get_catalog_page
+from courses.manage.resourceranking import get_learning_style_vector, rank_course_tree_lesson_resources
+from courses.manage.usercourseprogress import get_user_course_progress, get_course_progress_bitmaps, \
+    decode_completed_lessons, has_bitmap_sequence_number, merge_user_course_progress_lessons, \
+    get_bitmap_completion_percentage, get_bitmap_contiguous_sequence_number
 from courses.manage.lessonslearningstylesresources import get_all_learning_styles_lesson_resources, \
     get_excluded_learning_styles_lesson_resources, get_lessonslearningstyleresource_from_id
 from courses.manage.userlessonscompleted import get_user_completed_lessons_sorted, \
-    has_user_completed_lesson, has_user_completed_course_lessons, get_user_course_completion_percentages, \
-    purge_user_course_progress, add_user_completed_lesson, purge_user_progress
-from courses.models import Courses, Lessons
+    has_user_completed_lesson, has_user_completed_course_lessons, get_users_course_completion_percentages, \
+    purge_user_course_progress, add_user_completed_lesson, purge_user_progress, add_user_completed_lessons, \
+    purge_users_progress
+from courses.models import Courses, Lessons, UserCourseProgress
+from courses.progressqueue import is_write_behind_enabled, enqueue_completed_lesson, get_pending_completed_lessons, \
+    discard_pending_completed_lessons, enqueue_completed_lessons
 from courses.models import LessonsLearningStylesResources
-from learning_styles.manage.userlearningstyles import get_user_learning_styles_from_user, purge_user_userlearningstyles, \
-    add_to_user_userlearningstyles_collection
+from learning_styles.manage.userlearningstyles import get_user_learning_styles_from_user, \
+    set_users_userlearningstyles
+from learning_styles.models import LearningStyles
+
+# The session key of a student's memoized learning styles and the cache key of the version of their learning styles.
+LEARNING_STYLES_SESSION_KEY = 'learning_styles'
+LEARNING_STYLES_VERSION_KEY = 'learning_styles_version:'
 
 
 def has_next_lesson(lesson: Lessons) -> bool:
@@ -53,19 +68,30 @@ def get_next_lesson(lesson: Lessons) -> Lessons:
     return next_lesson
 
 
-def get_course(course_id: int):
+def get_course_tree(course_id: int) -> dict:
     """
-    Gets a course from an id.
+    Gets the cached tree of a course, its lessons in sequence order and their learning resources (see
+    courses.manage.coursetrees).
     :param course_id: An integer representing the course id.
-    :return: Returns the Courses object.
+    :return: Returns the course tree as a dictionary.
     :raises: Raises CourseNotFoundException if the course does not exist.
     """
     try:
-        return get_course_from_id(course_id)
+        return get_cached_course_tree(course_id)
     except ObjectDoesNotExist:
         raise CourseNotFoundException
 
 
+def get_course(course_id: int):
+    """
+    Gets a course from an id (from the course's cached tree).
+    :param course_id: An integer representing the course id.
+    :return: Returns the Courses object.
+    :raises: Raises CourseNotFoundException if the course does not exist.
+    """
+    return get_course_tree(course_id)['course']
+
+
 def get_all_courses():
     """
     Returns all Courses objects (if there are any).
@@ -78,6 +104,20 @@ def get_all_courses():
     return courses
 
 
+def get_courses_page(after: int = None, page_size: int = 20) -> tuple:
+    """
+    Returns a page of Courses objects in id order (if there are any).
+    :param after: The id of the last course of the previous page, if not provided the first page is returned.
+    :param page_size: The number of courses of a page.
+    :return: Returns a tuple of a list of Courses objects and the cursor of the next page (None if it is the last page).
+    :raises: Raises NoCoursesExistException if no courses exist.
+    """
+    courses, next_cursor = get_catalog_page(after=after, page_size=page_size)
+    if not courses and after is None:
+        raise NoCoursesExistException
+    return courses, next_cursor
+
+
 def get_learning_resources(learning_styles: Iterable, lesson: Lessons) -> QuerySet:
     """
     Given a list of learning styles and a Lessons returns all associable learning resources for that Lesson.
@@ -110,19 +150,29 @@ def get_all_learning_resources_except_learningstyles_from_list(learning_styles:
 
 def get_course_lesson(lesson_id: int, course: Courses) -> Lessons:
     """
-    Gets a lesson for a course given its id.
+    Gets a lesson for a course given its id (from the course's cached tree).
     :param lesson_id: The lesson for the course.
     :param course: The Courses object to check.
     :return: Returns the Lessons object queried.
     :raises: Raises a LessonNotFound exception if the course does not have the lesson.
     """
-    try:
-        lesson = get_lesson_from_id(lesson_id)
-        if not lesson.course == course:
-            raise LessonNotFoundException
-        return lesson
-    except ObjectDoesNotExist:
+    lesson = get_course_tree(course.id)['lessons_by_id'].get(int(lesson_id))
+    if lesson is None:
         raise LessonNotFoundException
+    return lesson
+
+
+def get_lesson_ranked_learning_resources(learning_styles: Iterable, lesson: Lessons) -> list:
+    """
+    Given a list of learning styles and a lesson returns every learning resource of the lesson ranked against the
+    learning styles (from the course's cached tree, see courses.manage.resourceranking).
+    :param learning_styles: The LearningStyles objects.
+    :param lesson: The Lessons object.
+    :return: Returns a list of (learning resource, score) tuples, highest score first. Resources for the learning styles
+    score above 0.
+    """
+    return rank_course_tree_lesson_resources(get_course_tree(lesson.course_id), lesson,
+                                             get_learning_style_vector(learning_styles))
 
 
 def get_lesson_resource(learning_resource_id: int, lesson: Lessons, course: Courses) -> LessonsLearningStylesResources:
@@ -147,36 +197,111 @@ def get_lesson_resource(learning_resource_id: int, lesson: Lessons, course: Cour
 
 def get_first_lesson_in_course(course: Courses):
     """
-    Given a course returns its first lesson.
+    Given a course returns its first lesson (from the course's cached tree).
     :param course: The Courses object.
     :return: Returns the first lesson.
     """
-    try:
-        lesson = get_course_lesson_from_sequence_number(course, 1)
-        return lesson
-    except ObjectDoesNotExist:
+    lessons = get_course_tree(course.id)['lessons']
+    if not lessons or lessons[0].sequence_number != 1:
         raise CourseNotFoundException
+    return lessons[0]
+
+
+def get_course_lessons_from_id_list(lesson_ids: Iterable, course: Courses) -> list:
+    """
+    Gets lessons of a course given their ids in a single query.
+    :param lesson_ids: The ids of the lessons of the course.
+    :param course: The Courses object to check.
+    :return: Returns a list of the Lessons objects queried.
+    :raises: Raises a LessonNotFound exception if the course does not have any one of the lessons.
+    """
+    lesson_ids = set(lesson_ids)
+    lessons = list(get_course_lessons_from_ids(course, lesson_ids))
+    if len(lessons) != len(lesson_ids):
+        raise LessonNotFoundException
+    return lessons
+
+
+def get_course_lessons(course: Courses) -> list:
+    """
+    Given a course returns all of its lessons in sequence order (from the course's cached tree).
+    :param course: The Courses object.
+    :return: Returns a list of the course's lessons sorted by sequence number.
+    """
+    return get_course_tree(course.id)['lessons']
 
 
-def add_student_completed_lesson(student: User, lesson: Lessons):
+def add_student_completed_lesson(student: User, lesson: Lessons) -> bool:
     """
-    Adds a student has completed a lesson.
+    Adds a student has completed a lesson. Adding a lesson the student has already completed does nothing.
     :param student: The Users object representing the student.
     :param lesson: The Lessons object representing the lesson.
+    :return: Returns true if the lesson was added otherwise returns false (it was already complete).
     """
-    add_user_completed_lesson(student, lesson)
+    # In write-behind mode the completion is queued and written later by the flush_progress_queue command.
+    if is_write_behind_enabled():
+        if has_student_completed_lesson(student, lesson):
+            return False
+        enqueue_completed_lesson(student, lesson)
+        return True
+    return add_user_completed_lesson(student, lesson)
 
 
-def update_student_learning_styles(student: User, learning_styles: Iterable):
+def add_student_completed_lessons(student: User, lessons: Iterable) -> int:
     """
-    Given a list of learning styles will remove all student learning styles and update with the new ones.
+    Adds a student has completed lessons in a single transaction. Lessons the student has already completed are
+    skipped.
+    :param student: The Users object representing the student.
+    :param lessons: The Lessons objects representing the lessons.
+    :return: Returns the number of lessons added (in write-behind mode, the number queued).
+    """
+    # In write-behind mode the completions are queued and written later by the flush_progress_queue command.
+    if is_write_behind_enabled():
+        lessons = list(lessons)
+        enqueue_completed_lessons(student, lessons)
+        return len(lessons)
+    return add_user_completed_lessons(student, lessons)
+
+
+def update_students_learning_styles(students_learning_styles: dict, purge_progress: bool = False) -> set:
+    """
+    Given the new learning styles of many students (e.g. a cohort reassigned by an administrator) will apply only the
+    changes to their learning styles in a single transaction and invalidate the memoized learning styles of the
+    students whose learning styles changed.
+    :param students_learning_styles: A dictionary of User objects to iterables of their new LearningStyles objects.
+    :param purge_progress: If true the progress of the students whose learning styles changed is deleted in the same
+    transaction.
+    :return: Returns the set of ids of the students whose learning styles changed.
+    """
+    with transaction.atomic():
+        changed = set_users_userlearningstyles(students_learning_styles)
+        if purge_progress:
+            if is_write_behind_enabled():
+                for student in students_learning_styles:
+                    if student.id in changed:
+                        discard_pending_completed_lessons(student)
+            purge_users_progress(changed)
+        for student in students_learning_styles:
+            if student.id in changed:
+                invalidate_student_learning_styles(student)
+    return changed
+
+
+def update_student_learning_styles(student: User, learning_styles: Iterable, request=None,
+                                   purge_progress: bool = False) -> bool:
+    """
+    Given a list of learning styles will replace the student's learning styles with them, applying only the changes.
     :param student: The User object representing the student.
     :param learning_styles: an iterable of LearningStyles objects.
+    :param request: The request of the student, if provided its memoized learning styles are discarded.
+    :param purge_progress: If true and the student's learning styles changed their progress is deleted in the same
+    transaction.
+    :return: Returns true if the student's learning styles changed otherwise returns false.
     """
-    # Delete existing settings.
-    purge_user_userlearningstyles(student)
-    # Populate the many to many relationship.
-    add_to_user_userlearningstyles_collection(student, learning_styles)
+    changed = bool(update_students_learning_styles({student: learning_styles}, purge_progress=purge_progress))
+    if changed and request is not None:
+        invalidate_student_learning_styles(student, request=request)
+    return changed
 
 
 def get_student_completed_lessons_sorted(student: User, course: Courses):
@@ -197,6 +322,8 @@ def delete_course_student_progress(course: Courses, student: User):
     :param course: The Courses object.
     :param student: The User object representing the student.
     """
+    if is_write_behind_enabled():
+        discard_pending_completed_lessons(student, course)
     purge_user_course_progress(student, course)
 
 
@@ -205,6 +332,8 @@ def delete_all_student_progress(student):
     Deletes all student progress.
     :param student: The User object representing the student.
     """
+    if is_write_behind_enabled():
+        discard_pending_completed_lessons(student)
     purge_user_progress(student)
 
 
@@ -215,7 +344,8 @@ def has_student_completed_lesson(student: User, lesson: Lessons) -> bool:
     :param lesson: The Lessons object.
     :return: Returns whether the student has completed the course
     """
-
+    if is_write_behind_enabled() and lesson.id in get_pending_completed_lessons(student):
+        return True
     return has_user_completed_lesson(student, lesson)
 
 
@@ -230,23 +360,158 @@ def has_student_completed_any_course_lessons(student: User, course: Courses):
     return has_user_completed_course_lessons(student, course)
 
 
+def get_student_course_progress(student: User, course: Courses) -> UserCourseProgress:
+    """
+    Provided a student and a course will return the summary of the student's progress through the course.
+    :param student: The User object representing the student.
+    :param course: The Courses object.
+    :return: Returns the UserCourseProgress object of the student for the course.
+    :raises: Raises ProgressNotFound if the student has not completed any lessons of the course.
+    """
+    # In write-behind mode completions which are still queued are merged in so the student sees them immediately.
+    pending_lesson_ids = get_pending_completed_lessons(student, course) if is_write_behind_enabled() else []
+    try:
+        progress = get_user_course_progress(student, course)
+    except ObjectDoesNotExist:
+        if not pending_lesson_ids:
+            raise ProgressNotFound
+        progress = UserCourseProgress(user=student, course=course)
+    if pending_lesson_ids:
+        progress = merge_user_course_progress_lessons(progress, pending_lesson_ids)
+    return progress
+
+
+def get_student_course_completed_lessons(progress: UserCourseProgress) -> int:
+    """
+    Provided the summary of a student's progress through a course will return the lessons they have completed.
+    :param progress: The UserCourseProgress object.
+    :return: Returns a bitmap of completed lessons indexed by lesson sequence number.
+    """
+    return decode_completed_lessons(progress.completed_lessons)
+
+
+def has_student_progress_completed_lesson(completed_lessons: int, lesson: Lessons) -> bool:
+    """
+    Provided a bitmap of the lessons a student has completed will identify if the lesson is one of them.
+    :param completed_lessons: The bitmap of completed lessons indexed by lesson sequence number.
+    :param lesson: The Lessons object.
+    :return: Returns true if the lesson is complete otherwise returns false.
+    """
+    return has_bitmap_sequence_number(completed_lessons, lesson.sequence_number)
+
+
+def get_student_progress_contiguous_sequence_number(completed_lessons: int) -> int:
+    """
+    Provided a bitmap of the lessons a student has completed will return the sequence number of the last lesson of the
+    run of lessons completed from the start of the course.
+    :param completed_lessons: The bitmap of completed lessons indexed by lesson sequence number.
+    :return: Returns the sequence number (0 if the first lesson is not complete).
+    """
+    return get_bitmap_contiguous_sequence_number(completed_lessons)
+
+
+def mark_student_progress_completed_lesson(completed_lessons: int, lesson: Lessons) -> int:
+    """
+    Provided a bitmap of the lessons a student has completed will mark the lesson as one of them.
+    :param completed_lessons: The bitmap of completed lessons indexed by lesson sequence number.
+    :param lesson: The Lessons object.
+    :return: Returns the updated bitmap.
+    """
+    return completed_lessons | (1 << (lesson.sequence_number - 1))
+
+
+def get_students_course_progress_bitmaps(course: Courses, students: Iterable = None) -> dict:
+    """
+    Provided a course will return the completed lessons bitmaps of a cohort of students in a single read.
+    :param course: The Courses object.
+    :param students: The User objects representing the students, if not provided every student with progress is
+    returned.
+    :return: Returns a dictionary of student ids to bitmaps indexed by lesson sequence number.
+    """
+    return get_course_progress_bitmaps(course, users=students)
+
+
 def get_student_course_completion_percentages(student: User, courses) -> dict:
     """
     Provided a student will return the percentages of courses they have completed as a dictionary object
     :param student: The User object representing the student.
-    :param courses: Th
+    :param courses: The Courses objects.
     :return: Returns the students course completion percentages.
     """
-    return get_user_course_completion_percentages(user=student, courses=courses)
+    completion_percentages = get_users_course_completion_percentages(users=[student], courses=courses).get(student.id)
+    if is_write_behind_enabled() and get_pending_completed_lessons(student):
+        # Recalculate the courses with queued completions from the merged progress.
+        for course in courses:
+            if get_pending_completed_lessons(student, course):
+                completed_lessons = get_student_course_completed_lessons(get_student_course_progress(student, course))
+                completion_percentages[course.id] = get_bitmap_completion_percentage(completed_lessons,
+                                                                                     course.lessons_set.count())
+    return completion_percentages
 
 
-def get_student_learning_styles(student: User) -> []:
+def get_students_course_completion_percentages(students: Iterable, courses: Iterable) -> dict:
     """
-    Provided a student will return the student's LearningStyles.
+    Provided a collection of students will return the percentages of courses each of them have completed.
+    :param students: The User objects representing the students.
+    :param courses: The Courses objects.
+    :return: Returns a dictionary of student ids to the students course completion percentages.
+    """
+    return get_users_course_completion_percentages(users=students, courses=courses)
+
+
+def get_student_learning_styles_version(student: User) -> int:
+    """
+    Provided a student will return the version of their learning styles, which changes whenever they are updated.
     :param student: the User object representing the student.
-    :return: Returns the students learning styles as a list.
+    :return: Returns the version as an integer.
     """
-    learning_styles = get_user_learning_styles_from_user(student)
+    return get_cache_version(LEARNING_STYLES_VERSION_KEY + str(student.id))
+
+
+def invalidate_student_learning_styles(student: User, request=None) -> None:
+    """
+    Provided a student will invalidate their memoized learning styles (in every session), when they are changed and
+    again once the change commits so learning styles read before the change commits are not memoized under the
+    current version.
+    :param student: the User object representing the student.
+    :param request: The request of the student, if provided its memoized learning styles are discarded too.
+    """
+    key = LEARNING_STYLES_VERSION_KEY + str(student.id)
+    bump_cache_version(key)
+    transaction.on_commit(lambda: bump_cache_version(key))
+    if request is not None:
+        request.learning_styles = None
+        request.session.pop(LEARNING_STYLES_SESSION_KEY, None)
+
+
+def get_student_learning_styles(student: User, request=None) -> []:
+    """
+    Provided a student will return the student's LearningStyles. If the student's request is provided their learning
+    styles are memoized on the request and in their session (with the version of their learning styles, so the session's
+    copy is read again once they are updated), otherwise they are read in a single query.
+    :param student: the User object representing the student.
+    :param request: The request of the student.
+    :return: Returns the students learning styles as a list.
+    :raises: Raises NoLearningStylesException if the student has no learning styles.
+    """
+    if request is None:
+        learning_styles = get_user_learning_styles_from_user(student)
+    elif getattr(request, 'learning_styles', None) is not None:
+        learning_styles = request.learning_styles
+    else:
+        # The version is read before the learning styles so that an update part way through is read again next time.
+        version = get_student_learning_styles_version(student)
+        profile = request.session.get(LEARNING_STYLES_SESSION_KEY)
+        if profile and profile['version'] == version:
+            learning_styles = [LearningStyles(id=learning_style_id, name=name, spectrum_id=spectrum_id)
+                               for learning_style_id, name, spectrum_id in profile['learning_styles']]
+        else:
+            learning_styles = get_user_learning_styles_from_user(student)
+            request.session[LEARNING_STYLES_SESSION_KEY] = {
+                'version': version,
+                'learning_styles': [[learning_style.id, learning_style.name, learning_style.spectrum_id]
+                                    for learning_style in learning_styles]}
+        request.learning_styles = learning_styles
     if len(learning_styles) == 0:
         raise NoLearningStylesException
     return learning_styles
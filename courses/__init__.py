@@ -0,0 +1,3 @@
+# The package must register the 'apps.py' file [see for details] as it isn't a default part of the Django framework.
+
+default_app_config = 'courses.apps.CoursesConfig'
@@ -7,15 +7,14 @@ free to use these to help update the database.
 https://docs.djangoproject.com/en/1.11/ref/forms/
 """
 
-import zipfile
 from django import forms
 from django.forms import ModelForm
 from courses.manage.courses import has_course_sequence_number
-from courses.manage.lessons import sequence_lessons
+from courses.manage.lessons import move_lesson, insert_lesson, is_gapped_lesson_ordering
 from courses.models import Courses, Lessons
 from courses.models import LessonsLearningStylesResources
-from learning_styles.models import LearningStyles
-from resources.manage.resources import create_resource
+from learning_styles.forms import LearningStyleChoiceField
+from resources.manage.resources import create_resource, validate_resource_zip
 
 
 class CoursesCreateForm(ModelForm):
@@ -43,6 +42,12 @@ class CoursesEditForm(CoursesCreateForm):
         fields = ['title', 'description', 'logo']
 
 
+class CoursesImportForm(forms.Form):
+    archive = forms.FileField(label='Please specify a zip file containing manifest.json',
+                              required=True,
+                              )
+
+
 class LessonsCreateForm(ModelForm):
     def __init__(self, *args, **kwargs):
         maximum_sequence_number = kwargs.pop('maximum_sequence_number')
@@ -55,7 +60,8 @@ class LessonsCreateForm(ModelForm):
     def clean_sequence_number(self):
         cleaned_data = super(LessonsCreateForm, self).clean()
         sequence_number = cleaned_data.get('sequence_number')
-        if has_course_sequence_number(self.course, sequence_number):
+        # When lessons are ordered by key a new lesson can be placed before a lesson which has its sequence number.
+        if not is_gapped_lesson_ordering() and has_course_sequence_number(self.course, sequence_number):
             raise forms.ValidationError("Sequence number already exists. Please choose a unique sequence number.")
         else:
             return sequence_number
@@ -65,7 +71,7 @@ class LessonsCreateForm(ModelForm):
         Lessons = super(LessonsCreateForm, self).save(commit=False)
         if commit:
             Lessons.course = self.course
-            Lessons.save()
+            insert_lesson(Lessons)
         return Lessons
 
     class Meta:
@@ -77,16 +83,16 @@ class LessonsEditForm(LessonsCreateForm):
     def __init__(self, *args, **kwargs):
         self.lesson = kwargs.pop('lesson')
         super(LessonsEditForm, self).__init__(*args, **kwargs)
+        # An existing lesson can be moved to any place up to the last lesson of the course.
+        maximum_sequence_number = self.fields['sequence_number'].max_value - 1
+        self.fields['sequence_number'] = forms.IntegerField(required=True, initial=maximum_sequence_number,
+                                                            max_value=maximum_sequence_number, min_value=1)
 
     def clean_sequence_number(self):
+        # Moving the lesson to a sequence number which is taken shifts the lessons in between so any sequence number
+        # within the course is valid.
         cleaned_data = super(LessonsCreateForm, self).clean()
-        sequence_number = cleaned_data.get('sequence_number')
-
-        if sequence_number == self.lesson.sequence_number:
-            return self.lesson.sequence_number
-        if has_course_sequence_number(self.course, sequence_number):
-            raise forms.ValidationError("Sequence number already exists. Please choose a unique sequence number.")
-        return sequence_number
+        return cleaned_data.get('sequence_number')
 
     def save(self, commit=True):
         # Create a Lessons instance but don't commit it to the DB
@@ -94,10 +100,12 @@ class LessonsEditForm(LessonsCreateForm):
         if commit:
             lesson.course = self.course
             lesson.id = self.lesson.id
+            # The lesson keeps its place whilst its details are saved and is then moved. If a user changes a value from
+            # 2-4 in a sequence 1,2,3,4 then lessons 3 and 4 are shifted to 2 and 3 in the same transaction.
+            sequence_number = lesson.sequence_number
+            lesson.sequence_number = self.lesson.sequence_number
             lesson.save()
-            # If a user changes a value from 3-4 in a sequence 1,2,3 then the sequence will be 1,2,4.
-            # The lessons should be sequenced here to 1,2,3,4.
-            sequence_lessons(lesson.course)
+            move_lesson(lesson, sequence_number)
         return lesson
 
     class Meta:
@@ -111,12 +119,11 @@ class LessonsLearningStylesResourcesCreateForm(ModelForm):
         self.course = kwargs.pop('course')
         self.lesson = kwargs.pop('lesson')
         super(LessonsLearningStylesResourcesCreateForm, self).__init__(*args, **kwargs)
+        self.fields['learning_style'].refresh_choices()
 
-    learning_style = forms.ModelChoiceField(
-        queryset=LearningStyles.objects.all(),
+    learning_style = LearningStyleChoiceField(
         widget=forms.Select,
         required=True,
-        initial=0,
     )
     resources = forms.FileField(
         label='Please specify a zip file containing index.html',
@@ -127,20 +134,11 @@ class LessonsLearningStylesResourcesCreateForm(ModelForm):
         cleaned_data = super(LessonsLearningStylesResourcesCreateForm, self).clean()
         resource = cleaned_data.get('resources')
         if resource:
-            # Check if the file is a zip file
-            if zipfile.is_zipfile(resource):
-                zip_file = zipfile.ZipFile(resource)
-                found_index = False
-                for file in zip_file.namelist():
-                    if file == "index.html":
-                        found_index = True
-                if not found_index:
-                    raise forms.ValidationError("Zip file does not contain 'index.html'.")
-                # At this stage we can create a resource and link the resource object to the form (rather than the
-                # uploaded resource).
-                self.resources = create_resource(resource)
-            else:
-                raise forms.ValidationError("Please upload a zip file containing 'index.html'.")
+            # Check the file is a zip file containing index.html.
+            validate_resource_zip(resource)
+            # At this stage we can create a resource and link the resource object to the form (rather than the
+            # uploaded resource).
+            self.resources = create_resource(resource)
             return resource
 
     def save(self, commit=True):
@@ -0,0 +1,260 @@
+"""CourseArchives provides an interface of subroutines for importing a whole course (its lessons and learning resources)
+from a single archive. Operations in this module refer to operations which are performable on course archives or are
+within reason to do with the domain of importing courses.
+
+A course archive is a zip file with a manifest (manifest.json) at its root which names the other files of the archive:
+
+    {"title": "Astronomy", "description": "The night sky", "logo": "logo.png",
+     "lessons": [{"title": "Telescopes", "description": "",
+                  "resources": [{"learning_style": "Visual", "title": "Telescopes", "description": "",
+                                 "file": "telescopes/visual.zip"}]}]}
+
+Lessons are sequenced in the order they are listed. The logo is optional and every resource file must be a zip file
+containing 'index.html' (as an uploaded learning resource must be). Learning styles are referred to by name.
+
+Importing is in two steps so that all of the database rows can be created in a transaction of the caller's (see
+communicate.leaders.import_leaders_course): prepare_course_archive() extracts, validates and stores the files of an
+archive, then create_course_from_archive() creates the rows in bulk. The rows are created with bulk inserts, which do
+not send signals, so the caller is responsible for anything maintained by signals.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from courses.manage.courses import bulk_create_with_ids
+from courses.manage.lessons import ORDER_KEY_SPACING
+from courses.models import Courses, Lessons, LessonsLearningStylesResources
+from learning_styles.manage.learningstyles import read_learning_style_bits
+from learning_styles.models import LearningStyles
+from resources.manage.resources import validate_resource_zip, save_resource_file
+from resources.models import Resources
+
+__version__ = '1.0'
+__author__ = 'Callum Dempsey Leach'
+
+MANIFEST_NAME = 'manifest.json'
+# The largest manifest (in bytes) which is read.
+MAXIMUM_MANIFEST_SIZE = 1 << 20
+# The greatest length of titles and descriptions (as the models allow).
+MAXIMUM_TEXT_LENGTH = 100
+# The number of resource zips validated at once.
+VALIDATION_WORKERS = 4
+# The size of the buffer files are extracted through, so a large file is never read into memory at once.
+EXTRACT_BUFFER_SIZE = 1 << 16
+# The errors raised reading a corrupt, truncated or encrypted archive (or one compressed by an unsupported method).
+ARCHIVE_READ_ERRORS = (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError, RuntimeError, OSError)
+
+
+def get_manifest_text(entry: dict, key: str, required: bool = True) -> str:
+    """
+    Returns a title or description of an entry of a course archive manifest.
+    :param entry: The dictionary of the course, a lesson or a resource.
+    :param key: The key of the text.
+    :param required: If false an absent text is returned as an empty string.
+    :return: Returns the text as a string.
+    :raises: Raises a ValidationError if the text is absent (and required), not a string or too long.
+    """
+    text = entry.get(key, None if required else "")
+    if not isinstance(text, str) or (required and not text.strip()):
+        raise ValidationError("The manifest requires a '" + key + "' for every entry.")
+    if len(text) > MAXIMUM_TEXT_LENGTH:
+        raise ValidationError("The manifest '" + key + "' '" + text[:20] + "...' is longer than " +
+                              str(MAXIMUM_TEXT_LENGTH) + " characters.")
+    return text
+
+
+def get_manifest_file(entry: dict, key: str, names: set, required: bool = True) -> str:
+    """
+    Returns the name of a file of an entry of a course archive manifest.
+    :param entry: The dictionary of the course or a resource.
+    :param key: The key of the name.
+    :param names: The set of the names of the files the archive contains.
+    :param required: If false an absent name is returned as None.
+    :return: Returns the name as a string (or None).
+    :raises: Raises a ValidationError if the name is absent (and required), not a string or names a file the archive
+    does not contain.
+    """
+    name = entry.get(key)
+    if name is None and not required:
+        return None
+    if not isinstance(name, str) or name not in names:
+        raise ValidationError("The archive does not contain the " + key + " '" + str(name) + "'.")
+    return name
+
+
+def read_course_archive_manifest(archive: zipfile.ZipFile) -> dict:
+    """
+    Reads and validates the manifest of a course archive, the learning styles it names are replaced by their objects.
+    :param archive: The ZipFile of the archive.
+    :return: Returns the manifest as a dictionary.
+    :raises: Raises a ValidationError if the manifest is absent or malformed or names a file the archive does not
+    contain or a learning style which does not exist.
+    """
+    try:
+        info = archive.getinfo(MANIFEST_NAME)
+    except KeyError:
+        raise ValidationError("The archive does not contain '" + MANIFEST_NAME + "'.")
+    if info.file_size > MAXIMUM_MANIFEST_SIZE:
+        raise ValidationError("The archive's '" + MANIFEST_NAME + "' is too large.")
+    try:
+        manifest = json.loads(archive.read(info).decode('utf-8'))
+    except ValueError:
+        raise ValidationError("The archive's '" + MANIFEST_NAME + "' is not valid JSON.")
+    if not isinstance(manifest, dict) or not isinstance(manifest.get('lessons'), list):
+        raise ValidationError("The manifest requires a list of 'lessons'.")
+    names = set(archive.namelist())
+    course = {'title': get_manifest_text(manifest, 'title'),
+              'description': get_manifest_text(manifest, 'description', required=False),
+              'logo': get_manifest_file(manifest, 'logo', names, required=False), 'lessons': []}
+    learning_style_names = set()
+    for lesson in manifest['lessons']:
+        if not isinstance(lesson, dict) or not isinstance(lesson.get('resources', []), list):
+            raise ValidationError("The manifest requires each lesson to have a list of 'resources'.")
+        resources = []
+        for resource in lesson.get('resources', []):
+            if not isinstance(resource, dict):
+                raise ValidationError("The archive does not contain the resource '" + str(resource) + "'.")
+            if not isinstance(resource.get('learning_style'), str):
+                raise ValidationError("The manifest requires a 'learning_style' for every resource.")
+            learning_style_names.add(resource['learning_style'])
+            resources.append({'learning_style': resource['learning_style'],
+                              'title': get_manifest_text(resource, 'title'),
+                              'description': get_manifest_text(resource, 'description', required=False),
+                              'file': get_manifest_file(resource, 'file', names)})
+        course['lessons'].append({'title': get_manifest_text(lesson, 'title'),
+                                  'description': get_manifest_text(lesson, 'description', required=False),
+                                  'resources': resources})
+    learning_styles = {learning_style.name: learning_style for learning_style in
+                       LearningStyles.objects.filter(name__in=learning_style_names)}
+    for lesson in course['lessons']:
+        for resource in lesson['resources']:
+            if resource['learning_style'] not in learning_styles:
+                raise ValidationError("The learning style '" + resource['learning_style'] + "' does not exist.")
+            resource['learning_style'] = learning_styles[resource['learning_style']]
+    return course
+
+
+def extract_course_archive_files(archive: zipfile.ZipFile, names: list, directory: str) -> dict:
+    """
+    Extracts files of a course archive to a directory, streaming each through a fixed size buffer. Files are extracted
+    under names of their position in the list (rather than their names in the archive) so no name in an archive can
+    write outside of the directory.
+    :param archive: The ZipFile of the archive.
+    :param names: A list of the names of the files in the archive.
+    :param directory: The path of the directory to extract to.
+    :return: Returns a dictionary of the names of the files in the archive to the paths they were extracted to.
+    """
+    paths = {}
+    for i, name in enumerate(names):
+        path = os.path.join(directory, str(i) + os.path.splitext(name)[1].lower())
+        with archive.open(name) as source, open(path, 'wb') as destination:
+            shutil.copyfileobj(source, destination, EXTRACT_BUFFER_SIZE)
+        paths[name] = path
+    return paths
+
+
+def validate_resource_zips(paths: dict) -> None:
+    """
+    Validates extracted resource files are zip files containing 'index.html' using a pool of workers.
+    :param paths: A dictionary of the names of the files in the archive to the paths they were extracted to.
+    :raises: Raises a ValidationError naming the first invalid file (in name order).
+    """
+    with ThreadPoolExecutor(max_workers=VALIDATION_WORKERS) as executor:
+        validations = {name: executor.submit(validate_resource_zip, path) for name, path in paths.items()}
+    for name in sorted(validations):
+        try:
+            validations[name].result()
+        except ValidationError as e:
+            raise ValidationError("'" + name + "': " + e.messages[0])
+
+
+def remove_course_archive_files(prepared_archive: dict) -> None:
+    """
+    Removes the stored files of a prepared course archive, e.g. when its rows could not be created.
+    :param prepared_archive: The prepared archive returned by prepare_course_archive().
+    """
+    for stored_name in prepared_archive['files'].values():
+        default_storage.delete(stored_name)
+
+
+def prepare_course_archive(archive_file) -> dict:
+    """
+    Reads the manifest of a course archive, extracts its files to a temporary directory, validates its resource zips
+    and saves its files to storage (under unique upload names).
+    :param archive_file: The archive, as a path or file object.
+    :return: Returns a dictionary of the validated 'manifest' and the 'files' (a dictionary of the names of the files
+    in the archive to the names of the stored files).
+    :raises: Raises a ValidationError if the archive or any of its files are invalid or cannot be read (in which case
+    nothing is stored).
+    """
+    try:
+        archive = zipfile.ZipFile(archive_file)
+    except ARCHIVE_READ_ERRORS:
+        raise ValidationError("Please upload a zip file containing '" + MANIFEST_NAME + "'.")
+    prepared_archive = {'manifest': None, 'files': {}}
+    with archive, tempfile.TemporaryDirectory() as directory:
+        try:
+            manifest = read_course_archive_manifest(archive)
+            resource_names = sorted({resource['file'] for lesson in manifest['lessons']
+                                     for resource in lesson['resources']})
+            names = resource_names + ([manifest['logo']] if manifest['logo'] is not None else [])
+            paths = extract_course_archive_files(archive, names, directory)
+            validate_resource_zips({name: paths[name] for name in resource_names})
+        except ARCHIVE_READ_ERRORS as e:
+            raise ValidationError("The archive could not be read (" + str(e) + ").")
+        prepared_archive['manifest'] = manifest
+        try:
+            for name, path in paths.items():
+                prepared_archive['files'][name] = save_resource_file(path, name)
+        except Exception:
+            remove_course_archive_files(prepared_archive)
+            raise
+    return prepared_archive
+
+
+def create_course_from_archive(author: User, prepared_archive: dict) -> tuple:
+    """
+    Creates the course, lessons and learning resources of a prepared course archive in a single transaction using bulk
+    inserts. Resources which name the same file in the archive share its stored file.
+    :param author: The User object of the leader who authors the course.
+    :param prepared_archive: The prepared archive returned by prepare_course_archive().
+    :return: Returns a tuple of the new Courses object and a list of its new LessonsLearningStylesResources objects.
+    """
+    manifest = prepared_archive['manifest']
+    files = prepared_archive['files']
+    with transaction.atomic():
+        logo = None
+        if manifest['logo'] is not None:
+            logo = Resources.objects.create(file=files[manifest['logo']])
+        course = Courses.objects.create(author=author, title=manifest['title'], description=manifest['description'],
+                                        logo=logo)
+        Lessons.objects.bulk_create([Lessons(course=course, sequence_number=sequence_number,
+                                             order_key=sequence_number * ORDER_KEY_SPACING, title=lesson['title'],
+                                             description=lesson['description'])
+                                     for sequence_number, lesson in enumerate(manifest['lessons'], 1)],
+                                    batch_size=500)
+        # The lessons' ids are read back by sequence number.
+        lesson_ids = dict(Lessons.objects.filter(course=course).values_list('sequence_number', 'id'))
+        entries = [(lesson_ids[sequence_number], resource)
+                   for sequence_number, lesson in enumerate(manifest['lessons'], 1)
+                   for resource in lesson['resources']]
+        resource_files = bulk_create_with_ids(Resources, [Resources(file=files[resource['file']])
+                                                          for lesson_id, resource in entries])
+        learning_style_bits = read_learning_style_bits(resource['learning_style'].id for lesson_id, resource in entries)
+        resources = bulk_create_with_ids(LessonsLearningStylesResources, [
+            LessonsLearningStylesResources(lesson_id=lesson_id, learning_style=resource['learning_style'],
+                                           learning_style_bit=learning_style_bits.get(resource['learning_style'].id, 0),
+                                           resource=resource_file, title=resource['title'],
+                                           description=resource['description'])
+            for (lesson_id, resource), resource_file in zip(entries, resource_files)])
+    return course, resources
@@ -12,29 +12,72 @@ de-couple courses from the rest of the implementing application.
 from collections import Iterable
 
 from django.contrib.auth.models import User
-from django.db.models import QuerySet
+from django.db import connection, transaction
+from django.db.models import QuerySet, Max
 
-from courses.models import Courses, Lessons
+from courses.models import Courses, Lessons, LessonsLearningStylesResources
+from resources.models import Resources
 
 __version__ = '1.0'
 __author__ = 'Callum Dempsey Leach'
 
 
-def get_all() -> QuerySet:
+def get_keyset_page(queryset: QuerySet, key: str, after=None, limit: int = None) -> QuerySet:
     """
-    Return all course entries in the database as a QuerySet object of Course objects.
+    Orders a QuerySet by a unique field and returns the rows after a cursor (keyset pagination). Unlike an offset each
+    page is a single indexed read however far into the rows it is.
+    :param queryset: The QuerySet to paginate.
+    :param key: The name of the unique field to order by.
+    :param after: The value of the field of the last row of the previous page, if not provided the first page is
+    returned.
+    :param limit: The greatest number of rows to return, if not provided every row after the cursor is returned.
+    :return: Returns a QuerySet of the page.
+    """
+    queryset = queryset.order_by(key)
+    if after is not None:
+        queryset = queryset.filter(**{key + '__gt': after})
+    if limit is not None:
+        assert int(limit) > 0
+        queryset = queryset[:limit]
+    return queryset
+
+
+def split_keyset_page(rows: Iterable, page_size: int, key: str) -> tuple:
+    """
+    Splits the rows read for a page (read with a limit of page_size + 1 so that the next page's existence is known
+    without a count) into the page and the cursor of the next page.
+    :param rows: The rows read by get_keyset_page.
+    :param page_size: The number of rows of a page.
+    :param key: The name of the unique field the rows are ordered by.
+    :return: Returns a tuple of a list of the rows of the page and the cursor of the next page (None if there are no
+    more rows).
+    """
+    rows = list(rows)
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, getattr(rows[-1], key)
+
+
+def get_all(after: int = None, limit: int = None) -> QuerySet:
+    """
+    Return all course entries in the database as a QuerySet object of Course objects in id order.
+    :param after: The id of the last course of the previous page, if not provided courses are returned from the first.
+    :param limit: The greatest number of courses to return, if not provided every course is returned.
     :return: Returns all Courses in a QuerySet.
     """
-    return Courses.objects.all()
+    return get_keyset_page(Courses.objects.all(), 'id', after=after, limit=limit)
 
 
-def get_courses_from_user(user: User) -> QuerySet:
+def get_courses_from_user(user: User, after: int = None, limit: int = None) -> QuerySet:
     """
     Provided a User object (as a foreign entity) will return all courses for that user as a QuerySet object.
     :param user: The User object specified.
-    :return: Returns a QuerySet object of all courses with a specific user as a foreign key.
+    :param after: The id of the last course of the previous page, if not provided courses are returned from the first.
+    :param limit: The greatest number of courses to return, if not provided every course is returned.
+    :return: Returns a QuerySet object of all courses with a specific user as a foreign key in id order.
     """
-    courses = Courses.objects.filter(author=user)
+    courses = get_keyset_page(Courses.objects.filter(author=user), 'id', after=after, limit=limit)
     return courses
 
 
@@ -94,17 +137,13 @@ def generate_next_lesson_sequence_number(course: Courses) -> int:
     :param course: The Course object to generate the next lesson sequence number for.
     :return: Returns the sequence number as an integer.
     """
-    # For all Lessons objects count the number of Lessons objects with the course passed as a foreign key.
-    if Lessons.objects.filter(course=course).count() == 0:
-        # If the value is 0 then determine the next sequence number for lessons as 1.
-        next_sequence_number = 1
-    else:
-        # Otherwise attain the greatest sequence number Lessons for a course (ordering by sequence number ascending
-        # i.e. "9,8,7" and getting the first value.
-        last_sequence_number = Lessons.objects.filter(course=course).order_by(
-            '-sequence_number').first().sequence_number
-        # The next sequence number is that value +1.
-        next_sequence_number = last_sequence_number + 1
+    # The greatest sequence number is read in a single statement (an empty course has none, so its first lesson is 1).
+    # To allocate the number to a new lesson without colliding with a concurrent insert see
+    # courses.manage.lessons.append_lessons.
+    last_sequence_number = Lessons.objects.filter(course=course).aggregate(
+        last_sequence_number=Max('sequence_number'))['last_sequence_number'] or 0
+    # The next sequence number is that value +1.
+    next_sequence_number = last_sequence_number + 1
     # Assert the return value is not negative or 0.
     assert next_sequence_number > 0
     return next_sequence_number
@@ -134,3 +173,86 @@ def get_course_lesson_from_sequence_number(course: Courses, sequence_number: int
     """
     assert int(sequence_number) > 0
     return Lessons.objects.get(course=course, sequence_number=sequence_number)
+
+
+def get_course_lessons_sorted(course: Courses, after: int = None, limit: int = None) -> QuerySet:
+    """
+    Provided a Courses object will return all of its lessons sorted by sequence number.
+    :param course: The Courses object.
+    :param after: The sequence number of the last lesson of the previous page, if not provided lessons are returned
+    from the first.
+    :param limit: The greatest number of lessons to return, if not provided every lesson is returned.
+    :return: Returns a QuerySet object of the course's Lessons objects in sequence order.
+    """
+    return get_keyset_page(Lessons.objects.filter(course=course), 'sequence_number', after=after, limit=limit)
+
+
+def get_course_lessons_from_ids(course: Courses, ids: Iterable) -> QuerySet:
+    """
+    Provided a Courses object and lesson ids will return the lessons of the course with those ids.
+    :param course: The Courses object.
+    :param ids: An iterable of Lessons ids.
+    :return: Returns a QuerySet object of the course's Lessons objects with the ids (ids of lessons of other courses
+    or which do not exist are omitted).
+    """
+    return Lessons.objects.filter(course=course, id__in=list(ids))
+
+
+def bulk_create_with_ids(model, objects: list) -> list:
+    """
+    Bulk inserts objects of a model and sets their primary keys. Databases which do not return the primary keys of a
+    bulk insert have them read back as the largest primary keys of the table, so this must be performed inside a
+    transaction which has already written (and so holds the database's write lock, as SQLite does).
+    :param model: The model class.
+    :param objects: A list of unsaved objects of the model.
+    :return: Returns the list of objects with their primary keys set.
+    """
+    if not objects:
+        return objects
+    if connection.features.can_return_ids_from_bulk_insert:
+        return model.objects.bulk_create(objects, batch_size=500)
+    last_id = model.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+    model.objects.bulk_create(objects, batch_size=500)
+    ids = list(model.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True))
+    assert len(ids) == len(objects)
+    for obj, id in zip(objects, ids):
+        obj.id = id
+    return objects
+
+
+def clone_course(course: Courses, title: str = None) -> tuple:
+    """
+    Provided a Courses object will copy it along with its lessons and learning resources in a single transaction using
+    bulk inserts. The copies of resources refer to the same uploaded files rather than copying them. As bulk inserts
+    do not send signals, the caller is responsible for anything maintained by signals (see
+    communicate.leaders.clone_leaders_course).
+    :param course: The Courses object to copy.
+    :param title: The title of the copy, if not provided the copy has the same title.
+    :return: Returns a tuple of the new Courses object and a dictionary of the ids of the course's learning resources
+    to the ids of their copies.
+    """
+    with transaction.atomic():
+        logo = None
+        if course.logo_id is not None:
+            logo = Resources.objects.create(file=course.logo.file.name)
+        clone = Courses.objects.create(author=course.author, title=course.title if title is None else title,
+                                       description=course.description, logo=logo,
+                                       lessons_order_stale=course.lessons_order_stale)
+        lessons = list(Lessons.objects.filter(course=course).order_by('sequence_number'))
+        Lessons.objects.bulk_create([Lessons(course=clone, sequence_number=lesson.sequence_number,
+                                             order_key=lesson.order_key, title=lesson.title,
+                                             description=lesson.description) for lesson in lessons], batch_size=500)
+        # The copies are matched to the original lessons by sequence number.
+        clone_lesson_ids = dict(Lessons.objects.filter(course=clone).values_list('sequence_number', 'id'))
+        lesson_ids = {lesson.id: clone_lesson_ids[lesson.sequence_number] for lesson in lessons}
+        resources = list(LessonsLearningStylesResources.objects.filter(lesson__course=course).select_related(
+            'resource').order_by('id'))
+        files = bulk_create_with_ids(Resources, [Resources(file=resource.resource.file.name)
+                                                 for resource in resources])
+        clone_resources = bulk_create_with_ids(LessonsLearningStylesResources, [
+            LessonsLearningStylesResources(lesson_id=lesson_ids[resource.lesson_id],
+                                           learning_style_id=resource.learning_style_id,
+                                           learning_style_bit=resource.learning_style_bit, resource=file,
+                                           title=resource.title, description=resource.description)
+            for resource, file in zip(resources, files)])
+    return clone, {resource.id: clone_resource.id for resource, clone_resource in zip(resources, clone_resources)}
@@ -0,0 +1,171 @@
+"""CourseTrees provides an interface of subroutines for the read cache of course trees, the course, its lessons in
+sequence order and their learning resources grouped by learning style, which every student page of a course is built
+from. Operations in this module refer to operations which are performable on the cache or are within reason to do with
+the domain of reading courses.
+
+A tree is cached under a key of its course's version (see bark.cacheversions), a counter which is bumped whenever
+the course, its lessons or their learning resources are saved or deleted (see courses.signals). Bulk inserts and
+updates do not send signals, so the subroutines which perform them bump the version themselves. A bumped version is
+never read again, so stale trees are never invalidated but expire (after the COURSE_TREE_CACHE_TIMEOUT setting). The
+catalog of courses is cached in the same way under a version which is bumped whenever a course is saved or deleted.
+
+Trees hold model objects so they can be rendered as read from the database. They are shared between users, per-user
+data such as progress is overlaid on a tree by the caller.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+from bark.cacheversions import get_cache_version, bump_cache_version
+from bark.transactions import add_to_commit_batch
+from courses.manage.courses import get_all, split_keyset_page
+from courses.models import Courses, Lessons, LessonsLearningStylesResources
+
+__version__ = '1.0'
+__author__ = 'Callum Dempsey Leach'
+
+COURSE_TREE_VERSION_KEY = 'course_tree_version:'
+COURSE_TREE_KEY = 'course_tree:'
+CATALOG_VERSION_KEY = 'catalog_version'
+CATALOG_PAGE_KEY = 'catalog_page:'
+# The name of the commit batch of the course trees invalidated in a transaction (see bark.transactions), whose items
+# are course ids and CATALOG_ITEM.
+COURSE_TREE_BATCH = 'course_trees_invalidation'
+CATALOG_ITEM = 'catalog'
+# The name of the commit batch of the lessons whose course trees are invalidated once a transaction commits.
+LESSON_COURSE_TREE_BATCH = 'lessons_course_trees_invalidation'
+# The number of lessons whose courses are read in a single query.
+LESSONS_BATCH_SIZE = 500
+
+
+def get_course_tree_timeout() -> int:
+    """
+    Returns the number of seconds a course tree (or page of the catalog) is cached for.
+
+    :return: Returns the COURSE_TREE_CACHE_TIMEOUT setting (a day if it is not set).
+    """
+    return getattr(settings, 'COURSE_TREE_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def bump_course_tree_version(course_id: int) -> None:
+    """
+    Invalidates the cached tree of a course.
+
+    :param course_id: The id of the course.
+    """
+    bump_cache_version(COURSE_TREE_VERSION_KEY + str(course_id))
+
+
+def bump_catalog_version() -> None:
+    """
+    Invalidates the cached pages of the catalog of courses.
+    """
+    bump_cache_version(CATALOG_VERSION_KEY)
+
+
+def bump_course_tree_versions(items: set) -> None:
+    """
+    Invalidates the cached trees of courses (and the catalog).
+
+    :param items: A set of the ids of the courses (and CATALOG_ITEM if the catalog is invalidated).
+    """
+    for item in items:
+        if item == CATALOG_ITEM:
+            bump_catalog_version()
+        else:
+            bump_course_tree_version(item)
+
+
+def invalidate_course_tree(course_id: int, catalog: bool = False) -> None:
+    """
+    Invalidates the cached tree of a course (and the catalog) when it is changed and again once the change commits, so
+    a tree read from the database before the change commits is not cached under the current version. The versions
+    are bumped once the transaction commits in a single callback however many rows of the transaction change.
+
+    :param course_id: The id of the course.
+    :param catalog: If true the pages of the catalog are invalidated too.
+    """
+    items = {course_id, CATALOG_ITEM} if catalog else {course_id}
+    bump_course_tree_versions(items)
+    for item in items:
+        add_to_commit_batch(COURSE_TREE_BATCH, item, bump_course_tree_versions)
+
+
+def invalidate_lessons_course_trees(lesson_ids: set) -> None:
+    """
+    Invalidates the cached trees of the courses of lessons, reading the courses in batches. The trees of courses which
+    were deleted along with their lessons were invalidated as they were deleted.
+
+    :param lesson_ids: A set of the ids of the lessons.
+    """
+    lesson_ids = sorted(lesson_ids)
+    course_ids = set()
+    for i in range(0, len(lesson_ids), LESSONS_BATCH_SIZE):
+        course_ids.update(Lessons.objects.filter(id__in=lesson_ids[i:i + LESSONS_BATCH_SIZE]).values_list(
+            'course_id', flat=True))
+    for course_id in course_ids:
+        invalidate_course_tree(course_id)
+
+
+def invalidate_lesson_course_tree(lesson_id: int) -> None:
+    """
+    Invalidates the cached tree of the course of a lesson once the current transaction commits, reading the courses of
+    every lesson of the transaction in one batch (e.g. for learning resources deleted without their lessons loaded).
+
+    :param lesson_id: The id of the lesson.
+    """
+    add_to_commit_batch(LESSON_COURSE_TREE_BATCH, lesson_id, invalidate_lessons_course_trees)
+
+
+def build_course_tree(course_id: int) -> dict:
+    """
+    Reads the tree of a course (and its logo) from the database in three queries.
+
+    :param course_id: The id of the course.
+    :return: Returns a dictionary of the 'course', its 'lessons' in sequence order, 'lessons_by_id' and the
+    'resources' of each lesson (a dictionary of lesson ids to dictionaries of learning style ids to lists of resources).
+    :raises: Raises ObjectDoesNotExist if the course does not exist.
+    """
+    course = Courses.objects.select_related('logo').get(id=course_id)
+    lessons = list(Lessons.objects.filter(course=course).order_by('sequence_number'))
+    for lesson in lessons:
+        lesson.course = course
+    resources = {lesson.id: {} for lesson in lessons}
+    for resource in LessonsLearningStylesResources.objects.filter(lesson__course=course).select_related(
+            'learning_style').order_by('id'):
+        resources[resource.lesson_id].setdefault(resource.learning_style_id, []).append(resource)
+    return {'course': course, 'lessons': lessons, 'lessons_by_id': {lesson.id: lesson for lesson in lessons},
+            'resources': resources}
+
+
+def get_course_tree(course_id: int) -> dict:
+    """
+    Returns the tree of a course (see build_course_tree()) from the cache, reading and caching it if it is not cached.
+
+    :param course_id: The id of the course.
+    :return: Returns the tree as a dictionary.
+    :raises: Raises ObjectDoesNotExist if the course does not exist.
+    """
+    key = COURSE_TREE_KEY + str(course_id) + ':' + str(get_cache_version(COURSE_TREE_VERSION_KEY + str(course_id)))
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_course_tree(course_id)
+        cache.set(key, tree, get_course_tree_timeout())
+    return tree
+
+
+def get_catalog_page(after: int = None, page_size: int = 20) -> tuple:
+    """
+    Returns a page of the catalog of courses (see courses.manage.courses.split_keyset_page()) from the cache, reading
+    and caching it if it is not cached.
+
+    :param after: The id of the last course of the previous page, if not provided the first page is returned.
+    :param page_size: The number of courses per page.
+    :return: Returns a tuple of the list of Courses objects of the page and the cursor of the next page (or None).
+    """
+    key = CATALOG_PAGE_KEY + str(get_cache_version(CATALOG_VERSION_KEY)) + ':' + str(after) + ':' + str(page_size)
+    page = cache.get(key)
+    if page is None:
+        page = split_keyset_page(get_all(after=after, limit=page_size + 1).select_related('logo'), page_size, 'id')
+        cache.set(key, page, get_course_tree_timeout())
+    return page
@@ -4,13 +4,51 @@ database). Operations in this module refer to operations which are performable o
 encapsulated by Courses) or are within reason to do with the domain of Lessons management.
 
 Lessons in the standard implementation have Courses as foreign key entities.
+
+Lessons are ordered by a dense sequence number (1,2,3...) which progress is indexed by. By default every insert or move
+renumbers the lessons in between. When the LESSON_ORDERING_MODE setting is "gapped" lessons are instead ordered by a
+sparse ordering key, so an insert or move updates only the lesson's own row and marks its course stale. The sequence
+numbers (and progress) are then derived from the ordering keys when the course is compacted (see the
+compact_lesson_order management command), which also spaces the keys out again.
 """
 from collections import Iterable
+
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from django.db.models import F, Case, When, Value, Max, BigIntegerField
+from django.db.models.functions import Coalesce
+
+from bark.transactions import add_to_commit_batch, discard_from_commit_batch
+from courses.manage.courses import generate_next_lesson_sequence_number
+from courses.manage.coursetrees import invalidate_course_tree
+from courses.manage.usercourseprogress import rebuild_course_progress
 from courses.models import Lessons, Courses
 
 __version__ = '1.0'
 __author__ = 'Callum Dempsey Leach'
 
+# The number of lessons renumbered per statement (SQLite binds at most 999 parameters per statement).
+RESEQUENCE_BATCH_SIZE = 300
+# The gap between the ordering keys of neighbouring lessons once a course is compacted. Each lesson placed between two
+# others halves the gap, so this leaves room for 20 lessons to be placed at the same point before compacting.
+ORDER_KEY_SPACING = 1 << 20
+# The ordering key of a lesson, a lesson inserted without one (a NULL key) is ordered by the key of its sequence number.
+LESSON_ORDER_KEY = Coalesce('order_key', F('sequence_number') * ORDER_KEY_SPACING, output_field=BigIntegerField())
+# The number of times lessons are inserted at freshly allocated sequence numbers before giving up, should concurrent
+# inserts keep taking the numbers first.
+ALLOCATE_ATTEMPTS = 5
+# The name of the batch of courses whose lessons are sequenced once a transaction commits.
+SEQUENCE_BATCH = 'lessons_sequencing'
+
+
+def is_gapped_lesson_ordering() -> bool:
+    """
+    Identifies whether lessons are placed by ordering key rather than renumbered on insert or move.
+
+    :return: Returns true if the LESSON_ORDERING_MODE setting is "gapped" otherwise returns false.
+    """
+    return getattr(settings, 'LESSON_ORDERING_MODE', 'dense') == 'gapped'
+
 
 def get_lesson_from_id(id: int) -> Lessons:
     """
@@ -62,13 +100,14 @@ def remove_lessons_ids_from_course(course: Courses, ids: Iterable) -> None:
     # We need to be careful with these kinds of assertions because Django will accept str values "1" and int value 1.
     # To overcome this we use Python list comprehension in conjunction with wrapping variables.
     assert all([str(i).isdigit() and int(i) > 0 for i in ids])
-    # pk in allows for list filtering
-    Lessons.objects.filter(course=course, pk__in=ids).delete()
-    # Sequence the courses lessons once we have performed our update.
-    sequence_lessons(course)
+    with transaction.atomic():
+        # pk in allows for list filtering
+        Lessons.objects.filter(course=course, pk__in=ids).delete()
+        # Sequence the courses lessons once we have performed our update.
+        sequence_lessons(course)
 
 
-def sequence_lessons(course: Courses) -> None:
+def sequence_lessons(course: Courses, order_key: bool = None) -> None:
     """
     For a course, sequences the order of lessons in the database (not for re-order but perform an update to make sure
     there are no "missing" sequences). To illustrate if a lesson is created with a sequence number of 5 and another
@@ -76,19 +115,272 @@ def sequence_lessons(course: Courses) -> None:
     risks violating uniqueness constraints). This operation will perform an operation which updates those kinds of
     sequences to "5,6" without violating uniqueness.
     :param course: The Courses object to sequence the lessons of.
+    :param order_key: If true the lessons are sequenced in the order of their ordering keys and the keys are spaced
+    out again (compacting the course), if not provided this follows the LESSON_ORDERING_MODE setting.
     """
-
-    # Performs update in sequence to prevent uniqueness constraint conflict. For instance if we change 6 to 5 and 5 to
-    # 4 then the uniqueness of the value 5 is violated. But given a lesson sequence 1,2,4,5, we can perform a unique
-    # update for each value by performing value assignment based on its position in the sequence i.e.
-    # updating 4 as 1,2,"3",4. This is performable with a simple for loop.
-    lessons = Lessons.objects.filter(course=course).order_by(
-        'sequence_number')
-    i = 1
-    for lesson in lessons:
-        if lesson.sequence_number == i:
-            pass
+    if order_key is None:
+        order_key = is_gapped_lesson_ordering()
+    with transaction.atomic():
+        lessons = Lessons.objects.filter(course=course)
+        if order_key:
+            # Cleared before the lessons are read so that a lesson placed whilst sequencing marks the course stale
+            # again once it commits.
+            Courses.objects.filter(id=course.id).update(lessons_order_stale=False)
+            lessons = lessons.annotate(lesson_order_key=LESSON_ORDER_KEY).order_by('lesson_order_key',
+                                                                                   'sequence_number')
         else:
-            lesson.sequence_number = i
-        lesson.save()
-        i = i + 1
+            lessons = lessons.order_by('sequence_number')
+        lessons = list(lessons.values_list('id', 'sequence_number', 'order_key'))
+        # Given a lesson sequence 1,2,4,5 the lessons numbered 4 and 5 move to 3 and 4. Once one lesson has moved
+        # every lesson after it has moved too, so the lessons which move are those from the first gap onwards and only
+        # those rows are touched. Compacting also gives lessons without an ordering key their key.
+        moved = [(lesson_id, sequence_number, i) for i, (lesson_id, sequence_number, key) in enumerate(lessons, 1)
+                 if sequence_number != i or (order_key and key != i * ORDER_KEY_SPACING)]
+        if moved:
+            renumber_lessons(course, moved, max([sequence_number for lesson_id, sequence_number, key in lessons] +
+                                                [len(lessons)]))
+        # Every user's progress summary for the course may have shifted with the sequence (or with the lessons removed
+        # or edited beforehand).
+        rebuild_course_progress(course)
+    # The course no longer needs sequencing when its transaction commits.
+    discard_from_commit_batch(SEQUENCE_BATCH, course.id)
+
+
+def sequence_courses_lessons(course_ids: Iterable) -> None:
+    """
+    Sequences the lessons of each of many courses, skipping courses which no longer exist.
+    :param course_ids: The ids of the courses.
+    """
+    for course in Courses.objects.filter(id__in=list(course_ids)):
+        sequence_lessons(course)
+
+
+def schedule_lessons_sequencing(course_id: int) -> None:
+    """
+    Schedules the lessons of a course to be sequenced (and so its progress summaries rebuilt) once the current
+    transaction commits, once however many of its lessons the transaction deletes outside this module (e.g. from the
+    admin, or along with their course). Otherwise a deleted lesson leaves a gap in the sequence and a progress summary
+    whose next lesson was deleted reads as the course being complete.
+    :param course_id: The id of the course.
+    """
+    add_to_commit_batch(SEQUENCE_BATCH, course_id, sequence_courses_lessons)
+
+
+def compact_lesson_order() -> int:
+    """
+    Sequences every course with lessons placed by ordering key since it was last sequenced, deriving the sequence
+    numbers from the ordering keys and spacing the keys out again.
+    :return: Returns the number of courses compacted.
+    """
+    courses = list(Courses.objects.filter(lessons_order_stale=True))
+    for course in courses:
+        sequence_lessons(course, order_key=True)
+    return len(courses)
+
+
+def get_lesson_order_key(course: Courses, sequence_number: int, lesson: Lessons = None) -> int:
+    """
+    Returns an ordering key which places a lesson at a sequence number of a course, between the ordering keys of the
+    lessons either side of it. If there is no room between them the course is compacted first.
+    :param course: The Courses object to place the lesson in.
+    :param sequence_number: The sequence number to place the lesson at (a sequence number beyond the last lesson places
+    it last).
+    :param lesson: The Lessons object if it already belongs to the course (so it is not counted as a neighbour).
+    :return: Returns the ordering key as an integer.
+    """
+    assert int(sequence_number) > 0
+    others = Lessons.objects.filter(course=course)
+    if lesson is not None:
+        others = others.exclude(id=lesson.id)
+    others = others.annotate(lesson_order_key=LESSON_ORDER_KEY).order_by('lesson_order_key', 'sequence_number')
+    others = others.values_list('lesson_order_key', flat=True)
+    if sequence_number == 1:
+        neighbours = [None] + list(others[:1])
+    else:
+        neighbours = list(others[sequence_number - 2:sequence_number])
+        if not neighbours:
+            neighbours = list(others.reverse()[:1])
+    before, after = (neighbours + [None, None])[:2]
+    if before is None and after is None:
+        return ORDER_KEY_SPACING
+    if after is None:
+        return before + ORDER_KEY_SPACING
+    if before is None:
+        return after - ORDER_KEY_SPACING
+    if after - before < 2:
+        sequence_lessons(course, order_key=True)
+        return get_lesson_order_key(course, sequence_number, lesson)
+    return (before + after) // 2
+
+
+def append_lessons(course: Courses, lessons: list, order_keys: bool = True) -> None:
+    """
+    Saves new lessons after the last lesson of a course in the order given, allocating their sequence numbers. The
+    course is locked whilst the numbers are allocated (on databases which support row locks) and the lessons are
+    inserted in a savepoint, so if a concurrent insert takes one of the numbers first they are inserted again at freshly
+    allocated numbers rather than failing.
+    :param course: The Courses object to add the lessons to.
+    :param lessons: A list of unsaved Lessons objects (their primary keys are set once saved).
+    :param order_keys: If true the lessons are given ordering keys after the last lesson, otherwise their ordering keys
+    are kept.
+    :raises: Raises an IntegrityError if the sequence numbers could not be allocated after ALLOCATE_ATTEMPTS attempts.
+    """
+    gapped = is_gapped_lesson_ordering()
+    for attempt in range(1, ALLOCATE_ATTEMPTS + 1):
+        try:
+            with transaction.atomic():
+                list(Courses.objects.select_for_update().filter(id=course.id).values_list('id', flat=True))
+                last = Lessons.objects.filter(course=course).aggregate(sequence_number=Max('sequence_number'),
+                                                                       order_key=Max(LESSON_ORDER_KEY))
+                for i, lesson in enumerate(lessons, 1):
+                    lesson.course = course
+                    lesson.sequence_number = (last['sequence_number'] or 0) + i
+                    if order_keys and gapped:
+                        lesson.order_key = (last['order_key'] or 0) + i * ORDER_KEY_SPACING
+                    elif order_keys:
+                        lesson.order_key = lesson.sequence_number * ORDER_KEY_SPACING
+                if len(lessons) == 1:
+                    lessons[0].save()
+                else:
+                    Lessons.objects.bulk_create(lessons, batch_size=RESEQUENCE_BATCH_SIZE)
+                    # Not every database returns the primary keys of a bulk insert so they are read back.
+                    ids = dict(Lessons.objects.filter(
+                        course=course, sequence_number__gt=last['sequence_number'] or 0).values_list(
+                        'sequence_number', 'id'))
+                    for lesson in lessons:
+                        lesson.id = ids[lesson.sequence_number]
+                    # Bulk inserts do not send the signals which invalidate the course's cached tree.
+                    invalidate_course_tree(course.id)
+            return
+        except IntegrityError:
+            if attempt == ALLOCATE_ATTEMPTS:
+                raise
+
+
+def insert_lesson(lesson: Lessons) -> None:
+    """
+    Saves a new lesson at its sequence number. When lessons are ordered by key only the new lesson's row is written, it
+    is given a free sequence number after the last lesson until its course is compacted.
+    :param lesson: The unsaved Lessons object with its course and sequence number set.
+    """
+    course = lesson.course
+    if not is_gapped_lesson_ordering():
+        try:
+            with transaction.atomic():
+                lesson.order_key = lesson.sequence_number * ORDER_KEY_SPACING
+                lesson.save()
+        except IntegrityError:
+            # Another lesson took the sequence number first. If the lesson was being added after the last lesson then
+            # it is added after that one instead.
+            if lesson.sequence_number < generate_next_lesson_sequence_number(course) - 1:
+                raise
+            append_lessons(course, [lesson])
+        # Users who had completed every lesson now have a next lesson.
+        rebuild_course_progress(course)
+        return
+    with transaction.atomic():
+        lesson.order_key = get_lesson_order_key(course, lesson.sequence_number)
+        append_lessons(course, [lesson], order_keys=False)
+        Courses.objects.filter(id=course.id).update(lessons_order_stale=True)
+
+
+def renumber_lessons(course: Courses, moved: list, maximum_sequence_number: int) -> None:
+    """
+    For a course, assigns new sequence numbers to lessons in a bounded number of statements without violating
+    uniqueness. Only the lessons between the smallest and largest of the moved lessons' current sequence numbers are
+    touched. This should be performed inside a transaction.
+    :param course: The Courses object the lessons belong to.
+    :param moved: A list of (lesson id, current sequence number, new sequence number) tuples of the lessons to move.
+    The new sequence numbers must be free once every moved lesson has left its current sequence number. The moved
+    lessons' ordering keys are spaced out by their new sequence numbers.
+    :param maximum_sequence_number: The largest sequence number held by any lesson of the course or assigned by moved.
+    """
+    # Assigning the new numbers directly risks violating uniqueness part way through an UPDATE (if 5 becomes 4 before 4
+    # becomes 3), so the affected range is first shifted above every current and new sequence number in one statement.
+    # The moved lessons are then assigned their new numbers in batched statements and any lessons within the range
+    # which did not move are shifted back in one statement.
+    lowest = min(old for lesson_id, old, new in moved)
+    highest = max(old for lesson_id, old, new in moved)
+    offset = maximum_sequence_number - lowest + 1
+    shifted = Lessons.objects.filter(course=course, sequence_number__gte=lowest, sequence_number__lte=highest).update(
+        sequence_number=F('sequence_number') + offset)
+    for i in range(0, len(moved), RESEQUENCE_BATCH_SIZE):
+        batch = moved[i:i + RESEQUENCE_BATCH_SIZE]
+        Lessons.objects.filter(id__in=[lesson_id for lesson_id, old, new in batch]).update(
+            sequence_number=Case(*[When(id=lesson_id, then=Value(new)) for lesson_id, old, new in batch]),
+            order_key=Case(*[When(id=lesson_id, then=Value(new * ORDER_KEY_SPACING)) for lesson_id, old, new in batch]))
+    if shifted != len(moved):
+        Lessons.objects.filter(course=course, sequence_number__gt=maximum_sequence_number).update(
+            sequence_number=F('sequence_number') - offset)
+    # Updates do not send the signals which invalidate the course's cached tree.
+    invalidate_course_tree(course.id)
+
+
+def move_lesson(lesson: Lessons, sequence_number: int) -> None:
+    """
+    Moves a lesson to a sequence number in a single transaction, shifting the lessons between its current and new
+    sequence numbers by one place to make room (moving lesson 2 to 4 in 1,2,3,4,5 moves 3 and 4 to 2 and 3). Only the
+    lessons in that range are touched and the progress summaries of the course are updated with them. When lessons are
+    ordered by key only the lesson's ordering key is updated and its course is marked stale.
+    :param lesson: The Lessons object to move.
+    :param sequence_number: The new sequence number of the lesson (between 1 and the course's largest sequence
+    number).
+    """
+    course = lesson.course
+    if is_gapped_lesson_ordering():
+        with transaction.atomic():
+            order_key = get_lesson_order_key(course, sequence_number, lesson)
+            Lessons.objects.filter(id=lesson.id).update(order_key=order_key)
+            Courses.objects.filter(id=course.id).update(lessons_order_stale=True)
+        lesson.order_key = order_key
+        return
+    with transaction.atomic():
+        current_sequence_number = Lessons.objects.values_list('sequence_number', flat=True).get(id=lesson.id)
+        maximum_sequence_number = Lessons.objects.filter(course=course).aggregate(
+            maximum=Max('sequence_number'))['maximum']
+        assert 1 <= int(sequence_number) <= maximum_sequence_number
+        if sequence_number != current_sequence_number:
+            # The lesson is parked above the course so that the range can be shifted through its sequence number,
+            # the range is then shifted above the parked lesson and back down (or up) by one place in two statements.
+            parked_sequence_number = maximum_sequence_number + 1
+            if sequence_number > current_sequence_number:
+                lowest, highest, shift = current_sequence_number + 1, sequence_number, -1
+            else:
+                lowest, highest, shift = sequence_number, current_sequence_number - 1, 1
+            Lessons.objects.filter(id=lesson.id).update(sequence_number=parked_sequence_number)
+            Lessons.objects.filter(course=course, sequence_number__gte=lowest, sequence_number__lte=highest).update(
+                sequence_number=F('sequence_number') + parked_sequence_number)
+            Lessons.objects.filter(course=course, sequence_number__gt=parked_sequence_number).update(
+                sequence_number=F('sequence_number') - parked_sequence_number + shift,
+                order_key=(F('sequence_number') - parked_sequence_number + shift) * ORDER_KEY_SPACING)
+            Lessons.objects.filter(id=lesson.id).update(sequence_number=sequence_number,
+                                                        order_key=sequence_number * ORDER_KEY_SPACING)
+            invalidate_course_tree(course.id)
+            rebuild_course_progress(course)
+    lesson.sequence_number = sequence_number
+    lesson.order_key = sequence_number * ORDER_KEY_SPACING
+
+
+def reorder_lessons(course: Courses, ids: Iterable) -> None:
+    """
+    Reorders every lesson of a course in a single transaction. Only the lessons between the first and last lessons
+    whose sequence numbers change are touched and the progress summaries of the course are updated with them. When
+    lessons are ordered by key the course is compacted in the new order.
+    :param course: The Courses object to reorder the lessons of.
+    :param ids: The primary keys of every lesson of the course in their new order (the first is given sequence number
+    1).
+    """
+    ids = [int(i) for i in ids]
+    order_key = is_gapped_lesson_ordering()
+    with transaction.atomic():
+        if order_key:
+            Courses.objects.filter(id=course.id).update(lessons_order_stale=False)
+        lessons = {lesson_id: (sequence_number, key) for lesson_id, sequence_number, key in
+                   Lessons.objects.filter(course=course).values_list('id', 'sequence_number', 'order_key')}
+        assert len(ids) == len(set(ids)) and set(ids) == set(lessons)
+        moved = [(lesson_id, lessons[lesson_id][0], i) for i, lesson_id in enumerate(ids, 1)
+                 if lessons[lesson_id][0] != i or (order_key and lessons[lesson_id][1] != i * ORDER_KEY_SPACING)]
+        if moved:
+            renumber_lessons(course, moved, max([sequence_number for sequence_number, key in lessons.values()] +
+                                                [len(ids)]))
+            rebuild_course_progress(course)
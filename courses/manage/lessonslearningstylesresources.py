@@ -4,9 +4,10 @@ operations which are performable on LessonsLearningStylesResources entities or a
 domain of LessonsLearningStylesResources management. """
 
 from collections import Iterable
-from django.db.models import QuerySet
+from django.db.models import QuerySet, F
 from courses.models import Lessons
 from courses.models import LessonsLearningStylesResources
+from learning_styles.manage.learningstyles import get_learning_style_ids_signature
 
 __version__ = '1.0'
 __author__ = 'Callum Dempsey Leach'
@@ -41,8 +42,25 @@ def get_all_learning_styles_lesson_resources(learning_styles: Iterable, lesson:
     :param lesson: The Lessons object.
     :return: returns all associable LessonsResources objects.
     """
-    resources = LessonsLearningStylesResources.objects.filter(learning_style__in=learning_styles, lesson=lesson)
-    return resources
+    signature = get_learning_style_ids_signature(learning_style.id for learning_style in learning_styles)
+    return get_signature_lesson_resources(signature, lesson)
+
+
+def get_signature_lesson_resources(signature: int, lesson: Lessons, excluded: bool = False) -> QuerySet:
+    """
+    Given a learning style signature (see learning_styles.manage.learningstyles) returns the lesson resources for its
+    learning styles, matched by the resources' learning style bits in a single predicate.
+
+    :param signature: The signature, e.g. a user's.
+    :param lesson: The Lessons object.
+    :param excluded: If true the lesson resources which are *not* for the signature's learning styles are returned.
+    :return: returns the LessonsResources objects.
+    """
+    resources = LessonsLearningStylesResources.objects.filter(lesson=lesson).annotate(
+        learning_style_match=F('learning_style_bit').bitand(signature))
+    if excluded:
+        return resources.filter(learning_style_match=0)
+    return resources.exclude(learning_style_match=0)
 
 
 def has_lesson_resource(lesson: Lessons, resource: LessonsLearningStylesResources) -> bool:
@@ -65,5 +83,5 @@ def get_excluded_learning_styles_lesson_resources(learning_styles: Iterable, les
     :param lesson: The Lessons Object
     :return: Returns a Queryset of requested resources.
     """
-    resources = LessonsLearningStylesResources.objects.filter(lesson=lesson).exclude(learning_style__in=learning_styles)
-    return resources
+    signature = get_learning_style_ids_signature(learning_style.id for learning_style in learning_styles)
+    return get_signature_lesson_resources(signature, lesson, excluded=True)
@@ -0,0 +1,84 @@
+"""ResourceRanking provides an interface of subroutines for ranking the learning resources of a lesson against a
+student's learning styles. Operations in this module refer to operations which are performable on the learning
+resources of a course tree (see courses.manage.coursetrees) or are within reason to do with the domain of recommending
+learning resources.
+
+The Felder-Silverman model places a student on four spectra (the spectrum_id of a learning style: 0 active/reflective,
+1 sequential/global, 2 visual/verbal and 3 sensing/intuitive). A student's learning styles are read as a vector of the
+learning styles they hold on each spectrum (with a strength, 1 unless known otherwise), and every learning resource is
+scored by the learning style it was made for: a resource for a learning style the student holds scores the strength of
+that learning style, a resource for another learning style on a spectrum the student is placed on scores its negative
+and a resource for a learning style on a spectrum the student is not placed on scores 0. Each spectrum's scores are
+weighted, so a spectrum which matters more to the choice of a resource (such as visual/verbal) may rank ahead.
+
+Resources are read from the lesson -> learning style -> resources index of the course's cached tree, which is kept up
+to date by the signals in courses.signals, so each learning style is scored once and no resource is queried.
+"""
+
+from collections import Iterable
+
+from courses.models import Lessons
+
+__version__ = '1.0'
+__author__ = 'Callum Dempsey Leach'
+
+# The weight of the score of each spectrum, a spectrum which is not listed is weighted 1.
+SPECTRUM_WEIGHTS = {0: 1.0, 1: 1.0, 2: 1.0, 3: 1.0}
+
+
+def get_learning_style_vector(learning_styles: Iterable, strengths: dict = None) -> dict:
+    """
+    Returns the learning style vector of a student.
+
+    :param learning_styles: The LearningStyles objects of the student.
+    :param strengths: A dictionary of learning style ids to the strength of the student's preference for them, a
+    learning style which is not listed has a strength of 1.
+    :return: Returns a dictionary of spectrum ids to dictionaries of the ids of the student's learning styles on the
+    spectrum to their strengths.
+    """
+    strengths = strengths or {}
+    vector = {}
+    for learning_style in learning_styles:
+        vector.setdefault(learning_style.spectrum_id, {})[learning_style.id] = strengths.get(learning_style.id, 1.0)
+    return vector
+
+
+def score_learning_style(learning_style, vector: dict, spectrum_weights: dict = None) -> float:
+    """
+    Scores a learning style against a learning style vector.
+
+    :param learning_style: The LearningStyles object.
+    :param vector: The learning style vector returned by get_learning_style_vector().
+    :param spectrum_weights: A dictionary of spectrum ids to the weights of their scores (SPECTRUM_WEIGHTS if not
+    provided).
+    :return: Returns the score, positive if the student holds the learning style, negative if they hold another on its
+    spectrum and 0 if they are not placed on its spectrum.
+    """
+    spectrum = vector.get(learning_style.spectrum_id)
+    if not spectrum:
+        return 0.0
+    weight = (SPECTRUM_WEIGHTS if spectrum_weights is None else spectrum_weights).get(learning_style.spectrum_id, 1.0)
+    if learning_style.id in spectrum:
+        return weight * spectrum[learning_style.id]
+    return -weight * max(spectrum.values())
+
+
+def rank_course_tree_lesson_resources(tree: dict, lesson: Lessons, vector: dict,
+                                      spectrum_weights: dict = None) -> list:
+    """
+    Ranks every learning resource of a lesson of a course tree against a learning style vector.
+
+    :param tree: The course tree.
+    :param lesson: The Lessons object.
+    :param vector: The learning style vector returned by get_learning_style_vector().
+    :param spectrum_weights: A dictionary of spectrum ids to the weights of their scores (SPECTRUM_WEIGHTS if not
+    provided).
+    :return: Returns a list of (resource, score) tuples, highest score first (and in the order the resources were
+    created for equal scores).
+    """
+    ranked_resources = []
+    for learning_style_resources in tree['resources'].get(lesson.id, {}).values():
+        # Every resource of the index's entry is for the same learning style so it is scored once.
+        score = score_learning_style(learning_style_resources[0].learning_style, vector, spectrum_weights)
+        ranked_resources.extend((resource, score) for resource in learning_style_resources)
+    return sorted(ranked_resources, key=lambda ranked_resource: (-ranked_resource[1], ranked_resource[0].id))
@@ -0,0 +1,273 @@
+"""UserCourseProgress provides an interface of subroutines for the management of UserCourseProgress models (and thus
+the entities in the database). Operations in this module refer to operations which are performable on
+UserCourseProgress entities or are within reason to do with the domain of UserCourseProgress management.
+
+UserCourseProgress is a denormalized summary of UserLessonsCompleted. Every operation which changes a user's save data
+or the sequence of a course's lessons should refresh the summary through this module so that reading progress stays a
+single lookup.
+
+The lessons a user has completed are held as a bitmap indexed by sequence number (bit 0 is the lesson with sequence
+number 1). Answering whether a lesson is complete, which lesson is next or how much of a course is done are bit
+operations on the bitmap rather than queries.
+"""
+
+import math
+from collections import Iterable
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from courses.models import UserCourseProgress, UserLessonsCompleted, Lessons, Courses
+
+__version__ = '1.0'
+__author__ = 'Callum Dempsey Leach'
+
+
+def encode_completed_lessons(bitmap: int) -> bytes:
+    """
+    Encodes a bitmap of completed lessons to the bytes stored by a UserCourseProgress object.
+
+    :param bitmap: The bitmap as an integer.
+    :return: Returns the bitmap as little-endian bytes.
+    """
+    return bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+
+
+def decode_completed_lessons(completed_lessons: bytes) -> int:
+    """
+    Decodes the bytes stored by a UserCourseProgress object to a bitmap of completed lessons.
+
+    :param completed_lessons: The little-endian bytes (or memoryview, as some database drivers return).
+    :return: Returns the bitmap as an integer.
+    """
+    return int.from_bytes(bytes(completed_lessons or b''), 'little')
+
+
+def get_completed_lessons_bitmap(completed_sequence_numbers: Iterable) -> int:
+    """
+    Builds a bitmap of completed lessons from their sequence numbers.
+
+    :param completed_sequence_numbers: An iterable of the sequence numbers of the completed lessons.
+    :return: Returns the bitmap as an integer.
+    """
+    bitmap = 0
+    for sequence_number in completed_sequence_numbers:
+        bitmap = bitmap | (1 << (sequence_number - 1))
+    return bitmap
+
+
+def has_bitmap_sequence_number(bitmap: int, sequence_number: int) -> bool:
+    """
+    Identifies if the lesson at a sequence number is marked complete in a bitmap.
+
+    :param bitmap: The bitmap as an integer.
+    :param sequence_number: The sequence number of the lesson.
+    :return: Returns true if the lesson is complete otherwise returns false.
+    """
+    assert int(sequence_number) > 0
+    return bool(bitmap >> (sequence_number - 1) & 1)
+
+
+def get_bitmap_contiguous_sequence_number(bitmap: int) -> int:
+    """
+    Returns the highest sequence number for which every lesson up to and including it is marked complete in a bitmap
+    (the number of trailing set bits).
+
+    :param bitmap: The bitmap as an integer.
+    :return: Returns the sequence number (0 if the first lesson is not complete).
+    """
+    return (~bitmap & (bitmap + 1)).bit_length() - 1
+
+
+def get_bitmap_completed_count(bitmap: int) -> int:
+    """
+    Returns the number of lessons marked complete in a bitmap.
+
+    :param bitmap: The bitmap as an integer.
+    :return: Returns the number of set bits.
+    """
+    return bin(bitmap).count('1')
+
+
+def get_bitmap_completion_percentage(bitmap: int, number_of_lessons: int) -> int:
+    """
+    Returns the percentage of a course's lessons marked complete in a bitmap.
+
+    :param bitmap: The bitmap as an integer.
+    :param number_of_lessons: The number of lessons in the course.
+    :return: Returns the percentage rounded down (0 if the course has no lessons).
+    """
+    if not number_of_lessons:
+        return 0
+    # Lessons beyond the end of the course cannot count towards it.
+    bitmap = bitmap & ((1 << number_of_lessons) - 1)
+    return math.floor((float(get_bitmap_completed_count(bitmap)) / float(number_of_lessons) * 100))
+
+
+def summarise_completed_sequence_numbers(completed_sequence_numbers: Iterable, lesson_ids: dict = None) -> dict:
+    """
+    Given the sequence numbers of the lessons a user has completed for a course, summarises them into the values held
+    by a UserCourseProgress object.
+
+    :param completed_sequence_numbers: An iterable of the sequence numbers of the completed lessons.
+    :param lesson_ids: A dictionary of the course's sequence numbers to lesson ids, if not provided the next lesson is
+    left out of the summary (for the caller to read).
+    :return: Returns a dictionary of UserCourseProgress field names to values.
+    """
+    bitmap = get_completed_lessons_bitmap(completed_sequence_numbers)
+    contiguous_sequence_number = get_bitmap_contiguous_sequence_number(bitmap)
+    summary = {'completed_count': get_bitmap_completed_count(bitmap),
+               'completed_lessons': encode_completed_lessons(bitmap),
+               'contiguous_sequence_number': contiguous_sequence_number}
+    if lesson_ids is not None:
+        summary['next_lesson_id'] = lesson_ids.get(contiguous_sequence_number + 1)
+    return summary
+
+
+def get_user_course_progress(user: User, course: Courses) -> UserCourseProgress:
+    """
+    Returns the progress summary of a user for a course.
+
+    :param user: The User object.
+    :param course: The Courses object.
+    :return: Returns the UserCourseProgress object (with the next lesson preloaded).
+    :raises: Raises an ObjectDoesNotExist exception if the user has no progress for the course.
+    """
+    return UserCourseProgress.objects.select_related('next_lesson').get(user=user, course=course)
+
+
+def get_course_progress_bitmaps(course: Courses, users: Iterable = None) -> dict:
+    """
+    Returns the completed lessons bitmaps of a cohort of users for a course in a single read.
+
+    :param course: The Courses object.
+    :param users: An iterable of User objects, if not provided every user with progress is returned.
+    :return: Returns a dictionary of user ids to bitmaps (users without progress are omitted).
+    """
+    progress = UserCourseProgress.objects.filter(course=course)
+    if users is not None:
+        progress = progress.filter(user_id__in=[user.id for user in users])
+    return {user_id: decode_completed_lessons(completed_lessons)
+            for user_id, completed_lessons in progress.values_list('user_id', 'completed_lessons')}
+
+
+def merge_user_course_progress_lessons(progress: UserCourseProgress, lesson_ids: Iterable) -> UserCourseProgress:
+    """
+    Marks lessons complete in a progress summary without saving it, e.g. to include completions which have not yet
+    been written.
+
+    :param progress: The UserCourseProgress object (which may be unsaved).
+    :param lesson_ids: An iterable of the ids of the completed lessons, lessons not of the course are ignored.
+    :return: Returns the UserCourseProgress object updated with the lessons.
+    """
+    bitmap = decode_completed_lessons(progress.completed_lessons)
+    bitmap = bitmap | get_completed_lessons_bitmap(Lessons.objects.filter(
+        course_id=progress.course_id, id__in=list(lesson_ids)).values_list('sequence_number', flat=True))
+    progress.completed_lessons = encode_completed_lessons(bitmap)
+    progress.completed_count = get_bitmap_completed_count(bitmap)
+    contiguous_sequence_number = get_bitmap_contiguous_sequence_number(bitmap)
+    if progress.next_lesson_id is None or contiguous_sequence_number != progress.contiguous_sequence_number:
+        progress.contiguous_sequence_number = contiguous_sequence_number
+        progress.next_lesson = Lessons.objects.filter(
+            course_id=progress.course_id, sequence_number=contiguous_sequence_number + 1).first()
+    return progress
+
+
+def add_user_course_progress_lessons(user: User, lessons: Iterable) -> None:
+    """
+    Marks lessons complete in the progress summaries of a user for the lessons' courses. Only the summaries are read,
+    the user's save data is not walked.
+
+    :param user: The User object.
+    :param lessons: An iterable of Lessons objects.
+    """
+    course_sequence_numbers = {}
+    for lesson in lessons:
+        course_sequence_numbers.setdefault(lesson.course_id, []).append(lesson.sequence_number)
+    with transaction.atomic():
+        for course_id, sequence_numbers in course_sequence_numbers.items():
+            progress, created = UserCourseProgress.objects.select_for_update().get_or_create(user=user,
+                                                                                             course_id=course_id)
+            bitmap = decode_completed_lessons(progress.completed_lessons)
+            updated_bitmap = bitmap | get_completed_lessons_bitmap(sequence_numbers)
+            if updated_bitmap == bitmap and not created:
+                continue
+            progress.completed_lessons = encode_completed_lessons(updated_bitmap)
+            progress.completed_count = get_bitmap_completed_count(updated_bitmap)
+            contiguous_sequence_number = get_bitmap_contiguous_sequence_number(updated_bitmap)
+            # The next lesson only moves when the contiguous run of completed lessons grows.
+            if created or contiguous_sequence_number != progress.contiguous_sequence_number:
+                progress.contiguous_sequence_number = contiguous_sequence_number
+                progress.next_lesson_id = Lessons.objects.filter(
+                    course_id=course_id, sequence_number=contiguous_sequence_number + 1).values_list(
+                    'id', flat=True).first()
+            progress.save()
+
+
+def add_user_course_progress_lesson(user: User, lesson: Lessons) -> None:
+    """
+    Marks a lesson complete in the progress summary of a user for the lesson's course.
+
+    :param user: The User object.
+    :param lesson: The Lessons object.
+    """
+    add_user_course_progress_lessons(user, [lesson])
+
+
+def update_user_course_progress(user: User, course: Courses) -> None:
+    """
+    Refreshes the progress summary of a user for a course from their save data.
+
+    :param user: The User object.
+    :param course: The Courses object.
+    """
+    completed_sequence_numbers = UserLessonsCompleted.objects.filter(user=user, lesson__course=course).values_list(
+        'lesson__sequence_number', flat=True)
+    summary = summarise_completed_sequence_numbers(completed_sequence_numbers)
+    if summary['completed_count'] == 0:
+        remove_user_course_progress(user, course)
+        return
+    # Only the lesson after the contiguous run is needed so there is no need to load the whole course.
+    summary['next_lesson_id'] = Lessons.objects.filter(
+        course=course, sequence_number=summary['contiguous_sequence_number'] + 1).values_list('id', flat=True).first()
+    UserCourseProgress.objects.update_or_create(user=user, course=course, defaults=summary)
+
+
+def rebuild_course_progress(course: Courses) -> None:
+    """
+    Rebuilds the progress summaries of every user for a course in bulk. This should be performed whenever the lessons
+    of a course are removed or re-sequenced as every user's summary may have shifted (bitmaps are indexed by sequence
+    number).
+
+    :param course: The Courses object.
+    """
+    lesson_ids = dict(Lessons.objects.filter(course=course).values_list('sequence_number', 'id'))
+    completed_sequence_numbers = {}
+    for user_id, sequence_number in UserLessonsCompleted.objects.filter(lesson__course=course).values_list(
+            'user_id', 'lesson__sequence_number'):
+        completed_sequence_numbers.setdefault(user_id, []).append(sequence_number)
+    progress = [UserCourseProgress(user_id=user_id, course_id=course.id,
+                                   **summarise_completed_sequence_numbers(sequence_numbers, lesson_ids))
+                for user_id, sequence_numbers in completed_sequence_numbers.items()]
+    with transaction.atomic():
+        UserCourseProgress.objects.filter(course=course).delete()
+        UserCourseProgress.objects.bulk_create(progress, batch_size=500)
+
+
+def remove_user_course_progress(user: User, course: Courses) -> None:
+    """
+    Removes the progress summary of a user for a course.
+
+    :param user: The User object.
+    :param course: The Courses object.
+    """
+    UserCourseProgress.objects.filter(user=user, course=course).delete()
+
+
+def remove_user_progress(user: User) -> None:
+    """
+    Removes every progress summary of a user.
+
+    :param user: The User object.
+    """
+    UserCourseProgress.objects.filter(user=user).delete()
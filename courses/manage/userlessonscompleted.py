@@ -4,28 +4,115 @@ operations which are performable on UserLessonsCompleted entities or are within
 domain of UserLessonsCompleted management. """
 
 import math
+import uuid
 from collections import Iterable
 
 from django.contrib.auth.models import User
-from django.db.models import QuerySet
+from django.db import connection, transaction, IntegrityError
+from django.db.models import QuerySet, Count, OuterRef, Subquery
 
-from courses.models import UserLessonsCompleted, Lessons, Courses
+from courses.manage.usercourseprogress import add_user_course_progress_lesson, add_user_course_progress_lessons, \
+    remove_user_course_progress, remove_user_progress
+from courses.models import UserLessonsCompleted, Lessons, Courses, UserCourseProgress
 
 __version__ = '1.0'
 __author__ = 'Callum Dempsey Leach'
 
+# The number of rows inserted per statement (SQLite binds at most 999 parameters per statement).
+INSERT_BATCH_SIZE = 400
 
-def add_user_completed_lesson(user: User, lesson: Lessons) -> None:
+
+def insert_completed_lessons(user_lesson_ids: Iterable) -> int:
+    """
+    Inserts completed lessons for users where they are not already present, as a single statement per batch. Relies
+    on the uniqueness of (user, lesson) so that concurrent submits of the same lesson cannot create duplicate save
+    data.
+
+    :param user_lesson_ids: An iterable of (user id, lesson id) tuples.
+    :return: Returns the number of rows of save data inserted (lessons already complete are not counted).
     """
-    Adds a completed lesson to a user.
+    user_lesson_ids = list(user_lesson_ids)
+    table = connection.ops.quote_name(UserLessonsCompleted._meta.db_table)
+    if connection.vendor == 'sqlite':
+        sql = 'INSERT OR IGNORE INTO ' + table + ' (user_id, lesson_id) VALUES {}'
+    elif connection.vendor == 'postgresql':
+        sql = 'INSERT INTO ' + table + ' (user_id, lesson_id) VALUES {} ON CONFLICT DO NOTHING'
+    elif connection.vendor == 'mysql':
+        sql = 'INSERT IGNORE INTO ' + table + ' (user_id, lesson_id) VALUES {}'
+    else:
+        inserted = 0
+        for user_id, lesson_id in user_lesson_ids:
+            try:
+                with transaction.atomic():
+                    inserted = inserted + UserLessonsCompleted.objects.get_or_create(user_id=user_id,
+                                                                                     lesson_id=lesson_id)[1]
+            except IntegrityError:
+                pass
+        return inserted
+    inserted = 0
+    with connection.cursor() as cursor:
+        # Batched to stay within the bound parameter limit of SQLite.
+        for i in range(0, len(user_lesson_ids), INSERT_BATCH_SIZE):
+            batch = user_lesson_ids[i:i + INSERT_BATCH_SIZE]
+            cursor.execute(sql.format(', '.join(['(%s, %s)'] * len(batch))),
+                           [value for user_lesson_id in batch for value in user_lesson_id])
+            inserted = inserted + cursor.rowcount
+    return inserted
+
+
+def insert_user_completed_lessons(user: User, lessons: Iterable) -> int:
+    """
+    Inserts completed lessons for a user where they are not already present.
+
+    :param user: The User object.
+    :param lessons: An iterable of Lessons objects.
+    :return: Returns the number of rows of save data inserted (lessons already complete are not counted).
+    """
+    return insert_completed_lessons((user.id, lesson.id) for lesson in lessons)
+
+
+def insert_user_completed_lesson(user: User, lesson: Lessons) -> bool:
+    """
+    Inserts a completed lesson for a user if it is not already present, as a single statement.
 
     :param user: The User object.
     :param lesson: The Lessons object.
+    :return: Returns true if the save data was inserted otherwise returns false (it already existed).
+    """
+    return insert_user_completed_lessons(user, [lesson]) == 1
+
+
+def add_user_completed_lesson(user: User, lesson: Lessons) -> bool:
+    """
+    Adds a completed lesson to a user. Adding a lesson the user has already completed does nothing.
+
+    :param user: The User object.
+    :param lesson: The Lessons object.
+    :return: Returns true if the lesson was added otherwise returns false (it was already complete).
+    """
+    inserted = insert_user_completed_lesson(user, lesson)
+    if inserted:
+        add_user_course_progress_lesson(user, lesson)
+    return inserted
+
+
+def add_user_completed_lessons(user: User, lessons: Iterable) -> int:
+    """
+    Adds completed lessons to a user in a single transaction. Lessons the user has already completed are skipped.
+
+    :param user: The User object.
+    :param lessons: An iterable of Lessons objects.
+    :return: Returns the number of lessons which were added.
     """
-    UserLessonsCompleted.objects.create(user=user, lesson=lesson)
+    lessons = list(lessons)
+    with transaction.atomic():
+        inserted = insert_user_completed_lessons(user, lessons)
+        if inserted:
+            # Marking a lesson which was already complete leaves the summary unchanged so every lesson is passed.
+            add_user_course_progress_lessons(user, lessons)
+    return inserted
 
 
-# Returns a QuerySet of all the completed lessons of a user profile for a course.
 def has_user_completed_course_lesson(user: User, course: Courses) -> bool:
     """
     Returns whether a user has completed a course lesson.
@@ -44,21 +131,38 @@ def get_user_course_completion_percentages(user: User, courses: Iterable) -> dic
 
     :param user: The User object.
     :param courses: The Courses object.
-    :return:
-    """
-    # For each course get the percentage of lessons completed by the user.
-    course_completion_percentages = {}
-    for course in courses:
-        number_of_lessons = len(course.lessons_set.all())
-        if number_of_lessons == 0:
-            course_completion_percentages.update({course.id: 0})
-        else:
-            # Count the completed lessons belonging to the course, turn that into a percentage against the number of
-            # lessons.
-            completed_lessons = UserLessonsCompleted.objects.filter(lesson__course=course,
-                                                                    user=user).count()
-            completion_percentage = math.floor((float(completed_lessons) / float(number_of_lessons) * 100))
-            course_completion_percentages.update({course.id: completion_percentage})
+    :return: Returns a dictionary of course ids to completion percentages.
+    """
+    return get_users_course_completion_percentages([user], courses).get(user.id)
+
+
+def get_users_course_completion_percentages(users: Iterable, courses: Iterable) -> dict:
+    """
+    Returns a percentage of completed lessons for each user for each course passed, computed in a single aggregated
+    query rather than a pair of counts per course.
+
+    :param users: An iterable of User objects.
+    :param courses: An iterable of Courses objects.
+    :return: Returns a dictionary of user ids to dictionaries of course ids to completion percentages.
+    """
+    user_ids = [user.id for user in users]
+    course_ids = [course.id for course in courses]
+    # Every course starts at 0 for every user, only pairs with progress are returned by the query below.
+    course_completion_percentages = {user_id: {course_id: 0 for course_id in course_ids} for user_id in user_ids}
+    if not user_ids or not course_ids:
+        return course_completion_percentages
+    # Count the lessons of the outer course as a correlated subquery so the lesson totals ride along with the
+    # completed counts (grouping on course_id and selecting only the count is the Django 1.11 idiom for this).
+    number_of_lessons = Lessons.objects.filter(course_id=OuterRef('course_id')).order_by().values(
+        'course_id').annotate(count=Count('id')).values('count')
+    # The completed counts are read from the progress summaries rather than counted from the save data.
+    course_progress = UserCourseProgress.objects.filter(user_id__in=user_ids, course_id__in=course_ids).values(
+        'user_id', 'course_id', 'completed_count').annotate(number_of_lessons=Subquery(number_of_lessons))
+    for row in course_progress:
+        if not row['number_of_lessons']:
+            continue
+        completion_percentage = math.floor((float(row['completed_count']) / float(row['number_of_lessons']) * 100))
+        course_completion_percentages[row['user_id']][row['course_id']] = completion_percentage
     return course_completion_percentages
 
 
@@ -94,8 +198,8 @@ def get_user_completed_lessons_sorted(user: User, course: Courses):
     :param course: The Courses object.
     :return: Returns a sorted set of all the completed lessons of a user for a course.
     """
-    lessons = UserLessonsCompleted.objects.filter(user=user).filter(lesson__course_id=course).order_by(
-        'lesson__sequence_number')
+    lessons = UserLessonsCompleted.objects.filter(user=user).filter(lesson__course_id=course).select_related(
+        'lesson').order_by('lesson__sequence_number')
     return lessons
 
 
@@ -106,6 +210,7 @@ def purge_user_course_progress(user: User, course: Courses) -> None:
     :param course: The Courses object.
     """
     UserLessonsCompleted.objects.filter(lesson__course_id=course.id, user=user).delete()
+    remove_user_course_progress(user, course)
 
 
 def purge_user_progress(user: User) -> None:
@@ -114,3 +219,86 @@ def purge_user_progress(user: User) -> None:
     :param user: User object to purge.
     """
     UserLessonsCompleted.objects.filter(user=user).delete()
+    remove_user_progress(user)
+
+
+def purge_users_progress(user_ids: Iterable) -> None:
+    """
+    Purges (deletes) all user progress for many users (e.g. a cohort) in batches.
+    :param user_ids: The ids of the users.
+    """
+    user_ids = sorted(set(user_ids))
+    for i in range(0, len(user_ids), INSERT_BATCH_SIZE):
+        batch = user_ids[i:i + INSERT_BATCH_SIZE]
+        UserLessonsCompleted.objects.filter(user_id__in=batch).delete()
+        UserCourseProgress.objects.filter(user_id__in=batch).delete()
+
+
+def iterate_portable_completed_lessons(chunk_size: int = 2000):
+    """
+    Iterates all save data in a portable form, identifying users by username and lessons by the key of their course
+    (see Courses.key) and their sequence number rather than by primary key. Rows are read in chunks so memory use does
+    not grow with the amount of save data.
+
+    :param chunk_size: The number of rows read per query.
+    :return: Returns a generator of dictionaries of username, course_key (as a string) and sequence_number.
+    """
+    last_id = 0
+    while True:
+        rows = list(UserLessonsCompleted.objects.filter(id__gt=last_id).order_by('id').values_list(
+            'id', 'user__username', 'lesson__course__key', 'lesson__sequence_number')[:chunk_size].iterator())
+        for row_id, username, course_key, sequence_number in rows:
+            yield {'username': username, 'course_key': str(course_key), 'sequence_number': sequence_number}
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][0]
+
+
+def is_portable_completed_lesson(record) -> bool:
+    """
+    Identifies whether a record is save data in the portable form produced by iterate_portable_completed_lessons().
+
+    :param record: The record.
+    :return: Returns true if the record has a username, a course key and a sequence number otherwise returns false.
+    """
+    if not isinstance(record, dict) or not isinstance(record.get('username'), str) or \
+            not isinstance(record.get('sequence_number'), int):
+        return False
+    try:
+        uuid.UUID(str(record.get('course_key')))
+    except ValueError:
+        return False
+    return True
+
+
+def add_portable_completed_lessons(records: Iterable) -> tuple:
+    """
+    Adds a chunk of save data in the portable form produced by iterate_portable_completed_lessons(). Save data which
+    already exists is skipped, as is save data of users or lessons which do not exist and records which are not in
+    the portable form. Progress summaries are not refreshed, rebuild them for the returned courses once every chunk
+    has been added.
+
+    :param records: An iterable of dictionaries of username, course_key and sequence_number.
+    :return: Returns a tuple of the number of rows added, the number of records skipped and the set of ids of the
+    courses with added save data.
+    """
+    records = list(records)
+    valid_records = [record for record in records if is_portable_completed_lesson(record)]
+    user_ids = dict(User.objects.filter(username__in={record['username'] for record in valid_records}).values_list(
+        'username', 'id'))
+    lessons = {}
+    for lesson_id, course_id, course_key, sequence_number in Lessons.objects.filter(
+            course__key__in={uuid.UUID(record['course_key']) for record in valid_records},
+            sequence_number__in={record['sequence_number'] for record in valid_records}).values_list(
+            'id', 'course_id', 'course__key', 'sequence_number'):
+        lessons[(course_key, sequence_number)] = (lesson_id, course_id)
+    user_lesson_ids = []
+    course_ids = set()
+    for record in valid_records:
+        user_id = user_ids.get(record['username'])
+        lesson = lessons.get((uuid.UUID(record['course_key']), record['sequence_number']))
+        if user_id is not None and lesson is not None:
+            user_lesson_ids.append((user_id, lesson[0]))
+            course_ids.add(lesson[1])
+    added = insert_completed_lessons(user_lesson_ids)
+    return added, len(records) - len(user_lesson_ids), course_ids
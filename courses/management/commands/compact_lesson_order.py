@@ -0,0 +1,32 @@
+"""
+Compacts the courses whose lessons have been placed by ordering key (the "gapped" LESSON_ORDERING_MODE setting),
+deriving the sequence numbers students see from the ordering keys and spacing the keys out again. Run once (e.g. from
+cron) or as a long-running worker with --loop.
+
+Usage: python manage.py compact_lesson_order [--loop [--interval <seconds>]]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from courses.manage.lessons import compact_lesson_order
+
+
+class Command(BaseCommand):
+    help = 'Derives the sequence numbers of lessons placed by ordering key.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', dest='loop',
+                            help='Keep compacting courses until interrupted.')
+        parser.add_argument('--interval', type=float, default=5.0, dest='interval',
+                            help='The number of seconds to wait between compactions when looping.')
+
+    def handle(self, *args, **options):
+        while True:
+            compacted = compact_lesson_order()
+            if compacted or not options['loop']:
+                self.stdout.write("Compacted " + str(compacted) + " course(s).")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
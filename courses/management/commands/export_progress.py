@@ -0,0 +1,46 @@
+"""
+Exports all lesson save data (UserLessonsCompleted) and users' learning styles (UserLearningStyles) as JSON lines, one
+record per line. Users are identified by username, lessons by the key of their course (see Courses.key) and their
+sequence number and learning styles by name so the file can be imported into another database with import_progress.
+Rows are streamed in chunks so memory use is constant however much progress there is.
+
+Usage: python manage.py export_progress [--output <path>] [--chunk-size <n>]
+"""
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from courses.manage.userlessonscompleted import iterate_portable_completed_lessons
+from learning_styles.manage.userlearningstyles import iterate_portable_user_learning_styles
+
+USER_LEARNING_STYLES_RECORD = 'userlearningstyles'
+USER_LESSONS_COMPLETED_RECORD = 'userlessonscompleted'
+
+
+class Command(BaseCommand):
+    help = 'Exports lesson progress and learning styles as portable JSON lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', dest='output', default='-',
+                            help='The path of the file to write. Defaults to standard output.')
+        parser.add_argument('--chunk-size', type=int, default=2000, dest='chunk_size',
+                            help='The number of rows read per query.')
+
+    def handle(self, *args, **options):
+        output = self.stdout if options['output'] == '-' else open(options['output'], 'w')
+        exported = 0
+        try:
+            # Learning styles are written first so that an import applies them before the save data.
+            for record in iterate_portable_user_learning_styles(chunk_size=options['chunk_size']):
+                record['model'] = USER_LEARNING_STYLES_RECORD
+                output.write(json.dumps(record) + '\n')
+                exported = exported + 1
+            for record in iterate_portable_completed_lessons(chunk_size=options['chunk_size']):
+                record['model'] = USER_LESSONS_COMPLETED_RECORD
+                output.write(json.dumps(record) + '\n')
+                exported = exported + 1
+        finally:
+            if output is not self.stdout:
+                output.close()
+        self.stderr.write("Exported " + str(exported) + " record(s).")
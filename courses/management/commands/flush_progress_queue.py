@@ -0,0 +1,33 @@
+"""
+Writes the lesson completions queued in write-behind mode (the PROGRESS_WRITE_BEHIND setting) to the database in
+batched transactions. Run once (e.g. from cron) or as a long-running worker with --loop.
+
+Usage: python manage.py flush_progress_queue [--batch-size <n>] [--loop [--interval <seconds>]]
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from courses.progressqueue import flush_progress_queue
+
+
+class Command(BaseCommand):
+    help = 'Writes queued lesson completions to the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, dest='batch_size',
+                            help='The approximate number of completions written per transaction.')
+        parser.add_argument('--loop', action='store_true', dest='loop',
+                            help='Keep flushing the queue until interrupted.')
+        parser.add_argument('--interval', type=float, default=1.0, dest='interval',
+                            help='The number of seconds to wait between flushes when looping.')
+
+    def handle(self, *args, **options):
+        while True:
+            added = flush_progress_queue(batch_size=options['batch_size'])
+            if added or not options['loop']:
+                self.stdout.write("Flushed " + str(added) + " lesson completion(s).")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
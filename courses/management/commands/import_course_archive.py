@@ -0,0 +1,39 @@
+"""
+Imports a course along with its lessons and learning resources from a course archive (a zip file with a manifest, see
+courses.manage.coursearchives) for a leader. The images of the learning resources are built in the background once the
+course has been created.
+
+Usage: python manage.py import_course_archive <archive> --author <username>
+"""
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from communicate.exceptions.courses_exceptions import InvalidCourseArchiveException
+from communicate.leaders import import_leaders_course
+from static_containers.tasks import wait_for_tasks
+
+
+class Command(BaseCommand):
+    help = 'Imports a course from a course archive.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archive', help='The path of the course archive.')
+        parser.add_argument('--author', dest='author',
+                            help='The username of the leader who authors the course.')
+
+    def handle(self, *args, **options):
+        if not options['author']:
+            raise CommandError("The --author of the course is required.")
+        try:
+            author = User.objects.get(username=options['author'])
+        except User.DoesNotExist:
+            raise CommandError("The user '" + options['author'] + "' does not exist.")
+        try:
+            course = import_leaders_course(author, options['archive'])
+        except (InvalidCourseArchiveException, OSError) as e:
+            raise CommandError(str(e))
+        self.stdout.write("Imported course " + str(course.id) + ", building its learning resources.")
+        # Wait for the images to be built before the process exits.
+        wait_for_tasks()
+        self.stdout.write("Built the images of course " + str(course.id) + ".")
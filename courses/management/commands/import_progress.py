@@ -0,0 +1,81 @@
+"""
+Imports lesson save data (UserLessonsCompleted) and users' learning styles (UserLearningStyles) from the JSON lines
+written by export_progress. Records are read and written in chunks (each chunk in its own transaction) so memory use
+is constant however large the file is. Importing is idempotent: rows which already exist are skipped, as are records
+of users, lessons or learning styles which do not exist in this database. Records missing a field are reported and
+skipped. A user's imported learning styles replace their learning styles on the same spectrum. Progress summaries of
+the affected courses are rebuilt once every record has been imported.
+
+Usage: python manage.py import_progress <path|-> [--chunk-size <n>]
+"""
+
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from courses.management.commands.export_progress import USER_LEARNING_STYLES_RECORD, USER_LESSONS_COMPLETED_RECORD
+from courses.manage.usercourseprogress import rebuild_course_progress
+from courses.manage.userlessonscompleted import add_portable_completed_lessons, is_portable_completed_lesson
+from courses.models import Courses
+from learning_styles.manage.userlearningstyles import add_portable_user_learning_styles, \
+    is_portable_user_learning_style
+
+RECORD_VALIDATORS = {USER_LEARNING_STYLES_RECORD: is_portable_user_learning_style,
+                     USER_LESSONS_COMPLETED_RECORD: is_portable_completed_lesson}
+
+
+class Command(BaseCommand):
+    help = 'Imports lesson progress and learning styles from portable JSON lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='The path of the file to read, or - for standard input.')
+        parser.add_argument('--chunk-size', type=int, default=400, dest='chunk_size',
+                            help='The number of records written per transaction.')
+
+    def handle(self, *args, **options):
+        self.added = 0
+        self.skipped = 0
+        self.course_ids = set()
+        chunks = {USER_LEARNING_STYLES_RECORD: [], USER_LESSONS_COMPLETED_RECORD: []}
+        source = sys.stdin if options['input'] == '-' else open(options['input'])
+        try:
+            for line_number, line in enumerate(source, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    model = record.pop('model')
+                    chunk = chunks[model]
+                except (ValueError, KeyError, AttributeError, TypeError):
+                    raise CommandError("Line " + str(line_number) + " is not a progress record.")
+                if not RECORD_VALIDATORS[model](record):
+                    self.stderr.write("Line " + str(line_number) + " is missing a field of a " + model +
+                                      " record, skipped.")
+                    self.skipped = self.skipped + 1
+                    continue
+                chunk.append(record)
+                if len(chunk) >= options['chunk_size']:
+                    self.import_chunk(chunks)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+        self.import_chunk(chunks)
+        for course in Courses.objects.filter(id__in=self.course_ids).iterator():
+            rebuild_course_progress(course)
+        self.stdout.write("Imported " + str(self.added) + " record(s), skipped " + str(self.skipped) + ".")
+
+    def import_chunk(self, chunks: dict):
+        with transaction.atomic():
+            if chunks[USER_LEARNING_STYLES_RECORD]:
+                added, skipped = add_portable_user_learning_styles(chunks[USER_LEARNING_STYLES_RECORD])
+                self.added = self.added + added
+                self.skipped = self.skipped + skipped
+            if chunks[USER_LESSONS_COMPLETED_RECORD]:
+                added, skipped, course_ids = add_portable_completed_lessons(chunks[USER_LESSONS_COMPLETED_RECORD])
+                self.added = self.added + added
+                self.skipped = self.skipped + skipped
+                self.course_ids.update(course_ids)
+        for chunk in chunks.values():
+            del chunk[:]
@@ -0,0 +1,30 @@
+"""
+Rebuilds the UserCourseProgress summaries from UserLessonsCompleted save data. Summaries are maintained as progress is
+made so this is only needed to repair them (for instance after restoring save data directly into the database).
+
+Usage: python manage.py reconcile_course_progress [--course <id> ...]
+"""
+
+from django.core.management.base import BaseCommand
+
+from courses.manage.usercourseprogress import rebuild_course_progress
+from courses.models import Courses
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per-user course progress summaries from lesson save data.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', dest='course_ids',
+                            help='The id of a course to reconcile (may be repeated). Defaults to every course.')
+
+    def handle(self, *args, **options):
+        courses = Courses.objects.order_by('id')
+        if options['course_ids']:
+            courses = courses.filter(id__in=options['course_ids'])
+        reconciled = 0
+        # Each course is rebuilt in bulk (one read of its save data and one bulk insert).
+        for course in courses.iterator():
+            rebuild_course_progress(course)
+            reconciled = reconciled + 1
+        self.stdout.write("Reconciled progress for " + str(reconciled) + " course(s).")
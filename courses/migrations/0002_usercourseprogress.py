@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 02:13
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def summarise_existing_progress(apps, schema_editor):
+    """
+    Builds a progress summary for every user with save data so existing progress is not lost when reads move over to
+    the summary table.
+    """
+    Lessons = apps.get_model('courses', 'Lessons')
+    UserLessonsCompleted = apps.get_model('courses', 'UserLessonsCompleted')
+    UserCourseProgress = apps.get_model('courses', 'UserCourseProgress')
+    lesson_ids = {}
+    for lesson_id, course_id, sequence_number in Lessons.objects.values_list('id', 'course_id', 'sequence_number'):
+        lesson_ids[(course_id, sequence_number)] = lesson_id
+    completed_sequence_numbers = {}
+    for user_id, course_id, sequence_number in UserLessonsCompleted.objects.values_list(
+            'user_id', 'lesson__course_id', 'lesson__sequence_number'):
+        completed_sequence_numbers.setdefault((user_id, course_id), set()).add(sequence_number)
+    progress = []
+    for (user_id, course_id), sequence_numbers in completed_sequence_numbers.items():
+        contiguous_sequence_number = 0
+        while contiguous_sequence_number + 1 in sequence_numbers:
+            contiguous_sequence_number += 1
+        progress.append(UserCourseProgress(user_id=user_id, course_id=course_id,
+                                           completed_count=len(sequence_numbers),
+                                           contiguous_sequence_number=contiguous_sequence_number,
+                                           next_lesson_id=lesson_ids.get((course_id, contiguous_sequence_number + 1))))
+    UserCourseProgress.objects.bulk_create(progress, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('courses', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCourseProgress',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('contiguous_sequence_number', models.PositiveIntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='courses.Courses')),
+                ('next_lesson', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='courses.Lessons')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Course Progress Summaries',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='usercourseprogress',
+            unique_together=set([('user', 'course')]),
+        ),
+        migrations.RunPython(summarise_existing_progress, migrations.RunPython.noop),
+    ]
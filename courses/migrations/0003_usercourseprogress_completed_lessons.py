@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 02:15
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def encode_existing_progress(apps, schema_editor):
+    """
+    Encodes the completed lessons of every existing progress summary as a bitmap.
+    """
+    UserLessonsCompleted = apps.get_model('courses', 'UserLessonsCompleted')
+    UserCourseProgress = apps.get_model('courses', 'UserCourseProgress')
+    bitmaps = {}
+    for user_id, course_id, sequence_number in UserLessonsCompleted.objects.values_list(
+            'user_id', 'lesson__course_id', 'lesson__sequence_number'):
+        bitmaps[(user_id, course_id)] = bitmaps.get((user_id, course_id), 0) | (1 << (sequence_number - 1))
+    for progress in UserCourseProgress.objects.all():
+        bitmap = bitmaps.get((progress.user_id, progress.course_id), 0)
+        progress.completed_lessons = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+        progress.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_usercourseprogress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usercourseprogress',
+            name='completed_lessons',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.RunPython(encode_existing_progress, migrations.RunPython.noop),
+    ]
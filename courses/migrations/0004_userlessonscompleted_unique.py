@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 03:05
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Min
+
+
+def remove_duplicate_completed_lessons(apps, schema_editor):
+    """
+    Removes duplicate save data so the uniqueness constraint can be applied, keeping the earliest row of each pair.
+    """
+    UserLessonsCompleted = apps.get_model('courses', 'UserLessonsCompleted')
+    earliest_ids = UserLessonsCompleted.objects.values('user_id', 'lesson_id').annotate(
+        earliest_id=Min('id')).values_list('earliest_id', flat=True)
+    UserLessonsCompleted.objects.exclude(id__in=earliest_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('courses', '0003_usercourseprogress_completed_lessons'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_completed_lessons, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='userlessonscompleted',
+            unique_together=set([('user', 'lesson')]),
+        ),
+    ]
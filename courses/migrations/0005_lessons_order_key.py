@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 06:12
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import F
+
+# Matches courses.manage.lessons.ORDER_KEY_SPACING at the time of the migration.
+ORDER_KEY_SPACING = 1 << 20
+
+
+def populate_order_keys(apps, schema_editor):
+    """
+    Spaces the ordering keys of existing lessons out by their sequence numbers.
+    """
+    Lessons = apps.get_model('courses', 'Lessons')
+    Lessons.objects.update(order_key=F('sequence_number') * ORDER_KEY_SPACING)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_userlessonscompleted_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='courses',
+            name='lessons_order_stale',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='lessons',
+            name='order_key',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_order_keys, migrations.RunPython.noop),
+        migrations.AlterIndexTogether(
+            name='lessons',
+            index_together=set([('course', 'order_key')]),
+        ),
+    ]
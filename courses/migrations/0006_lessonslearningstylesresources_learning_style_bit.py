@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 03:00
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def populate_learning_style_bits(apps, schema_editor):
+    """
+    Sets the learning style bit of existing learning resources from their learning styles' signature bits.
+    """
+    LearningStyles = apps.get_model('learning_styles', 'LearningStyles')
+    LessonsLearningStylesResources = apps.get_model('courses', 'LessonsLearningStylesResources')
+    for learning_style_id, signature_bit in LearningStyles.objects.exclude(signature_bit=None).values_list(
+            'id', 'signature_bit'):
+        LessonsLearningStylesResources.objects.filter(learning_style_id=learning_style_id).update(
+            learning_style_bit=1 << signature_bit)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_lessons_order_key'),
+        ('learning_styles', '0002_learning_styles_signatures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonslearningstylesresources',
+            name='learning_style_bit',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_learning_style_bits, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 14:20
+from __future__ import unicode_literals
+
+import uuid
+
+from django.db import migrations, models
+
+
+def populate_course_keys(apps, schema_editor):
+    """
+    Gives every existing course a key of its own.
+    """
+    Courses = apps.get_model('courses', 'Courses')
+    for course_id in Courses.objects.values_list('id', flat=True):
+        Courses.objects.filter(id=course_id).update(key=uuid.uuid4())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_lessonslearningstylesresources_learning_style_bit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='courses',
+            name='key',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.RunPython(populate_course_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='courses',
+            name='key',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+    ]
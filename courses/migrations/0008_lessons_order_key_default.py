@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 03:20
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import F
+
+# Matches courses.manage.lessons.ORDER_KEY_SPACING at the time of the migration.
+ORDER_KEY_SPACING = 1 << 20
+
+
+def populate_missing_order_keys(apps, schema_editor):
+    """
+    Places lessons which were saved without an ordering key by their sequence numbers. A key of 0 can only have been
+    allocated in a course which has not been compacted since, so only the lessons of compacted courses are placed.
+    """
+    Lessons = apps.get_model('courses', 'Lessons')
+    Lessons.objects.filter(order_key=0, course__lessons_order_stale=False).update(
+        order_key=F('sequence_number') * ORDER_KEY_SPACING)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0007_courses_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lessons',
+            name='order_key',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(populate_missing_order_keys, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.contrib.auth.models import User
 from django.core.validators import MaxLengthValidator, MinValueValidator
 from django.db import models
@@ -16,6 +18,11 @@ class Courses(models.Model):
     title = models.CharField(max_length=100, validators=[MaxLengthValidator(100)])
     description = models.CharField(max_length=100, validators=[MaxLengthValidator(100)], default="")
     logo = models.OneToOneField(Resources, on_delete=models.CASCADE, null=True, blank=True)
+    # Set when a lesson has been placed by its ordering key since the sequence numbers were last derived (see the
+    # LESSON_ORDERING_MODE setting).
+    lessons_order_stale = models.BooleanField(default=False)
+    # A key identifying the course across databases (unlike its primary key), e.g. in exported progress.
+    key = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
 
     class Meta:
         verbose_name_plural = "Courses"
@@ -31,6 +38,12 @@ class Lessons(models.Model):
     course = models.ForeignKey(Courses, on_delete=models.CASCADE)
     # The sequence number determines any ordering of lessons as well as serving as a candidate primary key.
     sequence_number = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    # A sparse ordering key so that a lesson can be placed between two others by updating its own row. When lessons
+    # are ordered by key the sequence number is derived from it when the course is compacted. A lesson inserted without
+    # one (e.g. in bulk or from a fixture) is ordered by the key of its sequence number (see
+    # courses.manage.lessons.LESSON_ORDER_KEY) and given it when its course is compacted, a lesson saved without one is
+    # given it at once (see courses.signals).
+    order_key = models.BigIntegerField(null=True, blank=True)
     title = models.CharField(max_length=100, validators=[MaxLengthValidator(100)])
     description = models.CharField(max_length=100, validators=[MaxLengthValidator(100)], default="")
     resources = models.ManyToManyField(LearningStyles, through='LessonsLearningStylesResources', max_length=500,
@@ -40,6 +53,7 @@ class Lessons(models.Model):
     class Meta:
         verbose_name_plural = "Lessons"
         unique_together = ("course", "sequence_number")
+        index_together = ("course", "order_key")
 
     def __str__(self):
         course = str(self.course)
@@ -59,6 +73,7 @@ class UserLessonsCompleted(models.Model):
 
     class Meta:
         verbose_name_plural = "Course Progress"
+        unique_together = ("user", "lesson")
 
     def __str__(self):
         user = str(self.user)
@@ -67,12 +82,42 @@ class UserLessonsCompleted(models.Model):
         return string
 
 
+class UserCourseProgress(models.Model):
+    """
+    UserCourseProgress. Defines a summary of the lessons a user has completed for a course. This is maintained
+    alongside UserLessonsCompleted so reading a user's progress is a single lookup rather than a walk of their save data.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    course = models.ForeignKey(Courses, on_delete=models.CASCADE)
+    completed_count = models.PositiveIntegerField(default=0)
+    # A bitmap of the completed lessons indexed by sequence number (bit 0 is lesson 1) as little-endian bytes.
+    completed_lessons = models.BinaryField(default=b'')
+    # The highest sequence number for which every lesson up to and including it has been completed (0 if none).
+    contiguous_sequence_number = models.PositiveIntegerField(default=0)
+    # The lesson following the contiguous run of completed lessons (null once the course has been completed).
+    next_lesson = models.ForeignKey(Lessons, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    class Meta:
+        verbose_name_plural = "Course Progress Summaries"
+        unique_together = ("user", "course")
+
+    def __str__(self):
+        user = str(self.user)
+        course = str(self.course)
+        string = "Course Progress Summary for " + user + ": " + course
+        return string
+
+
 class LessonsLearningStylesResources(models.Model):
     """
     Lesson Learning Style Resources Many to Many. Defines all the resources accessible for each lesson based on LearningStyle
     """
     lesson = models.ForeignKey(Lessons, on_delete=models.CASCADE)
     learning_style = models.ForeignKey(LearningStyles, on_delete=models.CASCADE)
+    # The bit of the learning style in learning style signatures (see learning_styles.manage.learningstyles), so the
+    # resources of a lesson for a signature are found with a single predicate (a bitwise and, which no index serves,
+    # over the lesson's resources).
+    learning_style_bit = models.BigIntegerField(default=0, editable=False)
     resource = models.OneToOneField(Resources, on_delete=models.CASCADE)
     title = models.CharField(max_length=100, validators=[MaxLengthValidator(100)])
     description = models.CharField(max_length=100, validators=[MaxLengthValidator(100)], default="")
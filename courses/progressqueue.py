@@ -0,0 +1,310 @@
+"""ProgressQueue provides a durable, file-backed queue of lesson completions awaiting a write to the database. It backs
+the write-behind mode enabled by the PROGRESS_WRITE_BEHIND setting, in which completions are validated in-request and
+appended to the queue rather than written, so a burst of students completing lessons does not contend on the
+database's writer. The flush_progress_queue management command applies the queue in batched transactions.
+
+Each user has their own append-only file of pending completions (one JSON object per line) so that reading a user's
+pending completions does not require reading everybody's. A flush renames a file out of the pending directory before
+applying it and only deletes it once its transaction has committed, so completions remain visible to reads and are
+replayed after a crash (applying a completion is idempotent). Files are locked whilst they are written, discarded from
+or flushed, so a flush applies the completions of a file as they are when it is locked and a discard either happens
+before the flush reads the file or after the flush has committed (when the purge which follows it removes the written
+completions). A line left partially written by a crash (never acknowledged) is cut from its file before the next
+append.
+"""
+
+import fcntl
+import glob
+import json
+import os
+import uuid
+from collections import Iterable
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from courses.manage.userlessonscompleted import add_user_completed_lessons
+from courses.models import Lessons, Courses
+
+__version__ = '1.0'
+__author__ = 'Callum Dempsey Leach'
+
+PENDING_DIRECTORY = 'pending'
+FLUSHING_DIRECTORY = 'flushing'
+
+# The queue directories which have been created by the process.
+created_queue_directories = set()
+
+
+def is_write_behind_enabled() -> bool:
+    """
+    Identifies whether lesson completions are to be queued rather than written in-request.
+
+    :return: Returns true if the PROGRESS_WRITE_BEHIND setting is enabled otherwise returns false.
+    """
+    return getattr(settings, 'PROGRESS_WRITE_BEHIND', False)
+
+
+def get_queue_directory(name: str) -> str:
+    """
+    Returns a directory of the queue, creating it the first time the process uses it.
+
+    :param name: The name of the directory, either PENDING_DIRECTORY or FLUSHING_DIRECTORY.
+    :return: Returns the path of the directory.
+    """
+    directory = os.path.join(settings.PROGRESS_QUEUE_DIR, name)
+    if directory not in created_queue_directories:
+        os.makedirs(directory, exist_ok=True)
+        created_queue_directories.add(directory)
+    return directory
+
+
+def is_queue_file_current(queue_file, path: str) -> bool:
+    """
+    Identifies whether an open queue file is still the file at its path, i.e. it was not taken for flushing or
+    flushed whilst waiting on its lock.
+
+    :param queue_file: The open file.
+    :param path: The path the file was opened at.
+    :return: Returns true if the file is at the path otherwise returns false.
+    """
+    try:
+        return os.fstat(queue_file.fileno()).st_ino == os.stat(path).st_ino
+    except FileNotFoundError:
+        return False
+
+
+def repair_queue_file(queue_file) -> None:
+    """
+    Cuts a partially written last line (left by a crash whilst appending) from a locked queue file, so the next
+    append starts on a line of its own.
+
+    :param queue_file: The file, open for reading and appending.
+    """
+    size = os.fstat(queue_file.fileno()).st_size
+    if not size or os.pread(queue_file.fileno(), 1, size - 1) == b'\n':
+        return
+    queue_file.seek(0)
+    contents = queue_file.read()
+    queue_file.truncate(contents.rfind('\n') + 1)
+
+
+def enqueue_completed_lessons(user: User, lessons: Iterable) -> None:
+    """
+    Durably appends completed lessons of a user to the queue in a single write.
+
+    :param user: The User object.
+    :param lessons: An iterable of Lessons objects.
+    """
+    path = os.path.join(get_queue_directory(PENDING_DIRECTORY), str(user.id) + '.jsonl')
+    lines = ''.join(json.dumps({'user_id': user.id, 'lesson_id': lesson.id, 'course_id': lesson.course_id}) + '\n'
+                    for lesson in lessons)
+    while True:
+        with open(path, 'a+') as queue_file:
+            fcntl.flock(queue_file, fcntl.LOCK_EX)
+            # The file may have been taken for flushing whilst waiting on the lock, if so append to its replacement.
+            if not is_queue_file_current(queue_file, path):
+                continue
+            repair_queue_file(queue_file)
+            queue_file.write(lines)
+            queue_file.flush()
+            os.fsync(queue_file.fileno())
+            return
+
+
+def enqueue_completed_lesson(user: User, lesson: Lessons) -> None:
+    """
+    Durably appends a completed lesson of a user to the queue.
+
+    :param user: The User object.
+    :param lesson: The Lessons object.
+    """
+    enqueue_completed_lessons(user, [lesson])
+
+
+def read_queue_events(queue_file) -> list:
+    """
+    Reads the completed lessons of an open queue file from its start.
+
+    :param queue_file: The open file.
+    :return: Returns a list of dictionaries of user_id, lesson_id and course_id.
+    """
+    events = []
+    queue_file.seek(0)
+    for line in queue_file:
+        try:
+            events.append(json.loads(line))
+        except ValueError:
+            # A partially written line left by a crash, the completion was never acknowledged.
+            continue
+    return events
+
+
+def read_queue_file(path: str) -> list:
+    """
+    Reads the completed lessons of a queue file.
+
+    :param path: The path of the queue file.
+    :return: Returns a list of dictionaries of user_id, lesson_id and course_id (an empty list if the file has
+    already been flushed).
+    """
+    try:
+        with open(path) as queue_file:
+            return read_queue_events(queue_file)
+    except FileNotFoundError:
+        return []
+
+
+def get_pending_completed_lessons(user: User, course: Courses = None) -> list:
+    """
+    Returns the completed lessons of a user which are queued but may not yet have been written.
+
+    :param user: The User object.
+    :param course: The Courses object, if provided only completed lessons of the course are returned.
+    :return: Returns a list of lesson ids.
+    """
+    paths = [os.path.join(get_queue_directory(PENDING_DIRECTORY), str(user.id) + '.jsonl')]
+    paths.extend(glob.glob(os.path.join(get_queue_directory(FLUSHING_DIRECTORY), str(user.id) + '-*.jsonl')))
+    lesson_ids = []
+    for path in paths:
+        for event in read_queue_file(path):
+            if course is None or event['course_id'] == course.id:
+                lesson_ids.append(event['lesson_id'])
+    return lesson_ids
+
+
+def discard_queue_file_lessons(path: str, course: Courses = None) -> bool:
+    """
+    Discards the completed lessons of a queue file, reading them from the file once it is locked.
+
+    :param path: The path of the queue file.
+    :param course: The Courses object, if provided only completed lessons of the course are discarded.
+    :return: Returns true if the file was discarded from, or false if it was not at its path once locked (it was
+    taken for flushing or flushed whilst waiting on its lock).
+    """
+    try:
+        queue_file = open(path, 'r+')
+    except FileNotFoundError:
+        return True
+    with queue_file:
+        fcntl.flock(queue_file, fcntl.LOCK_EX)
+        if not is_queue_file_current(queue_file, path):
+            return False
+        kept = [event for event in read_queue_events(queue_file)
+                if course is not None and event['course_id'] != course.id]
+        queue_file.seek(0)
+        queue_file.truncate()
+        queue_file.writelines(json.dumps(event) + '\n' for event in kept)
+        queue_file.flush()
+        os.fsync(queue_file.fileno())
+    return True
+
+
+def discard_pending_completed_lessons(user: User, course: Courses = None) -> None:
+    """
+    Discards the queued completed lessons of a user, e.g. when their progress is purged, so that a later flush does
+    not restore them. The pending file is discarded from first, so a file taken for flushing whilst waiting on its lock
+    is found amongst the flushing files.
+
+    :param user: The User object.
+    :param course: The Courses object, if provided only completed lessons of the course are discarded.
+    """
+    path = os.path.join(get_queue_directory(PENDING_DIRECTORY), str(user.id) + '.jsonl')
+    # The pending file may have been taken for flushing whilst waiting on its lock, if so discard from its replacement.
+    while not discard_queue_file_lessons(path, course):
+        continue
+    for path in glob.glob(os.path.join(get_queue_directory(FLUSHING_DIRECTORY), str(user.id) + '-*.jsonl')):
+        # A flushing file which is no longer at its path once locked has been flushed, and its completions purged.
+        discard_queue_file_lessons(path, course)
+
+
+def take_pending_queue_files() -> None:
+    """
+    Moves every pending queue file to the flushing directory so that new completions start a new file.
+    """
+    pending_directory = get_queue_directory(PENDING_DIRECTORY)
+    flushing_directory = get_queue_directory(FLUSHING_DIRECTORY)
+    for name in os.listdir(pending_directory):
+        path = os.path.join(pending_directory, name)
+        try:
+            queue_file = open(path)
+        except FileNotFoundError:
+            continue
+        with queue_file:
+            fcntl.flock(queue_file, fcntl.LOCK_EX)
+            user_id = os.path.splitext(name)[0]
+            os.rename(path, os.path.join(flushing_directory, user_id + '-' + uuid.uuid4().hex + '.jsonl'))
+
+
+def apply_completed_lessons(events: list) -> int:
+    """
+    Writes a batch of queued completed lessons in a single transaction. Completions of users or lessons which have
+    since been deleted are discarded.
+
+    :param events: A list of dictionaries of user_id, lesson_id and course_id.
+    :return: Returns the number of completed lessons which were added.
+    """
+    users = User.objects.in_bulk({event['user_id'] for event in events})
+    lessons = Lessons.objects.in_bulk({event['lesson_id'] for event in events})
+    user_lessons = {}
+    for event in events:
+        if event['user_id'] in users and event['lesson_id'] in lessons:
+            user_lessons.setdefault(event['user_id'], {})[event['lesson_id']] = lessons[event['lesson_id']]
+    added = 0
+    with transaction.atomic():
+        for user_id, completed_lessons in user_lessons.items():
+            added = added + add_user_completed_lessons(users[user_id], completed_lessons.values())
+    return added
+
+
+def flush_queue_files(queue_files: list) -> int:
+    """
+    Writes the completed lessons of a batch of locked queue files in a single transaction, then deletes the files
+    (before they are unlocked, so a discard waiting on one of them finds it flushed).
+
+    :param queue_files: A list of (path, open and locked file) tuples.
+    :return: Returns the number of completed lessons which were added.
+    """
+    try:
+        added = apply_completed_lessons([event for path, queue_file in queue_files for event in read_queue_file(path)])
+        for path, queue_file in queue_files:
+            os.remove(path)
+    finally:
+        for path, queue_file in queue_files:
+            queue_file.close()
+    return added
+
+
+def flush_progress_queue(batch_size: int = 500) -> int:
+    """
+    Writes every queued completed lesson to the database in batched transactions. Queue files left by an interrupted
+    flush are written first. Each file is locked before it is read and until it is deleted.
+
+    :param batch_size: The approximate number of completed lessons written per transaction.
+    :return: Returns the number of completed lessons which were added.
+    """
+    take_pending_queue_files()
+    added = 0
+    queue_files = []
+    batch_lines = 0
+    # Files are locked in the order of their paths, so concurrent flushes do not wait on each other's locks.
+    for path in sorted(glob.glob(os.path.join(get_queue_directory(FLUSHING_DIRECTORY), '*.jsonl'))):
+        try:
+            queue_file = open(path)
+        except FileNotFoundError:
+            continue
+        fcntl.flock(queue_file, fcntl.LOCK_EX)
+        # The file may have been flushed by another flush whilst waiting on the lock.
+        if not is_queue_file_current(queue_file, path):
+            queue_file.close()
+            continue
+        queue_files.append((path, queue_file))
+        batch_lines = batch_lines + sum(1 for line in queue_file)
+        if batch_lines >= batch_size:
+            added = added + flush_queue_files(queue_files)
+            queue_files = []
+            batch_lines = 0
+    if queue_files:
+        added = added + flush_queue_files(queue_files)
+    return added
@@ -0,0 +1,59 @@
+"""
+Django signals are dispatched whenever conditions are met across the whole application
+https://docs.djangoproject.com/en/1.11/ref/signals
+
+Signals for courses invalidate the cached course trees and catalog (see courses.manage.coursetrees) as courses, lessons
+and learning resources are saved or deleted, sequence the lessons (and so rebuild the progress) of a course whose
+lessons are deleted, give lessons saved without one an ordering key and keep the learning style bit of learning
+resources current.
+"""
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from courses.manage.coursetrees import invalidate_course_tree, invalidate_lesson_course_tree
+from courses.manage.lessons import schedule_lessons_sequencing, ORDER_KEY_SPACING
+from courses.models import Courses, Lessons, LessonsLearningStylesResources
+from learning_styles.manage.learningstyles import get_learning_style_bit
+
+
+@receiver(post_save, sender=Courses)
+@receiver(post_delete, sender=Courses)
+def invalidate_course_handler(sender, instance, **kwargs):
+    invalidate_course_tree(instance.id, catalog=True)
+
+
+@receiver(post_save, sender=Lessons)
+@receiver(post_delete, sender=Lessons)
+def invalidate_lesson_handler(sender, instance, **kwargs):
+    invalidate_course_tree(instance.course_id)
+
+
+@receiver(pre_save, sender=Lessons)
+def set_lesson_order_key_handler(sender, instance, **kwargs):
+    # Lessons saved outside courses.manage.lessons (e.g. from the admin or a fixture) are placed by their sequence
+    # number, as they are when a course is compacted.
+    if instance.order_key is None:
+        instance.order_key = instance.sequence_number * ORDER_KEY_SPACING
+
+
+@receiver(post_delete, sender=Lessons)
+def sequence_lessons_handler(sender, instance, **kwargs):
+    # Progress is indexed by sequence number and refers to the next lesson, so the lessons are sequenced (and the
+    # progress rebuilt) once the deletion commits.
+    schedule_lessons_sequencing(instance.course_id)
+
+
+@receiver(post_save, sender=LessonsLearningStylesResources)
+@receiver(post_delete, sender=LessonsLearningStylesResources)
+def invalidate_resource_handler(sender, instance, **kwargs):
+    # The lesson is not loaded when a resource is deleted along with its lesson or course, rather than reading it for
+    # each resource the courses of the lessons of the transaction are read at once when it commits.
+    if LessonsLearningStylesResources.lesson.is_cached(instance):
+        invalidate_course_tree(instance.lesson.course_id)
+    else:
+        invalidate_lesson_course_tree(instance.lesson_id)
+
+
+@receiver(pre_save, sender=LessonsLearningStylesResources)
+def set_resource_learning_style_bit_handler(sender, instance, **kwargs):
+    instance.learning_style_bit = get_learning_style_bit(instance.learning_style_id)
@@ -1,18 +1,49 @@
 # Create your tests here.
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from io import StringIO, BytesIO
+from unittest import mock
+
 from django.contrib.auth.models import User
-from django.core.exceptions import ObjectDoesNotExist
-from django.test import TestCase
-from courses.manage.courses import get_all, get_courses_from_user, has_user_course, has_course_lesson, \
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.core.management import call_command, CommandError
+from django.db import IntegrityError, transaction, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from courses.manage.coursearchives import prepare_course_archive
+from courses.manage.coursetrees import get_course_tree, get_catalog_page, invalidate_lessons_course_trees
+from courses.manage.courses import get_all, get_courses_from_user, split_keyset_page, has_user_course, has_course_lesson, \
     get_course_from_id, generate_next_lesson_sequence_number, has_course_sequence_number, \
     get_course_lesson_from_sequence_number, remove_courses_ids_from_user
 from courses.manage.lessons import get_lesson_from_id, get_next_lesson, has_next_lesson, \
-    remove_lessons_ids_from_course, sequence_lessons
+    remove_lessons_ids_from_course, sequence_lessons, move_lesson, reorder_lessons, insert_lesson, \
+    compact_lesson_order, append_lessons, ORDER_KEY_SPACING
+from courses.manage.resourceranking import get_learning_style_vector, rank_course_tree_lesson_resources, \
+    score_learning_style
 from courses.manage.lessonslearningstylesresources import remove_lessonlearningstyleresources_ids_from_lesson, \
-    get_excluded_learning_styles_lesson_resources
-from courses.manage.userlessonscompleted import add_user_completed_lesson, get_user_course_completion_percentages
-from courses.models import Courses, Lessons, LessonsLearningStylesResources
-from learning_styles.models import LearningStyles
+    get_excluded_learning_styles_lesson_resources, get_signature_lesson_resources
+from courses.manage.userlessonscompleted import add_user_completed_lesson, get_user_course_completion_percentages, \
+    get_users_course_completion_percentages, purge_user_course_progress, purge_user_progress
+from courses.manage.usercourseprogress import get_user_course_progress, get_course_progress_bitmaps, \
+    merge_user_course_progress_lessons, decode_completed_lessons, encode_completed_lessons, has_bitmap_sequence_number, \
+    get_bitmap_contiguous_sequence_number, get_bitmap_completed_count, get_bitmap_completion_percentage
+from courses.progressqueue import enqueue_completed_lesson, get_pending_completed_lessons, flush_progress_queue, \
+    discard_pending_completed_lessons, take_pending_queue_files, PENDING_DIRECTORY
+from courses.progressqueue import apply_completed_lessons as progressqueue_apply_completed_lessons
+from courses.models import Courses, Lessons, LessonsLearningStylesResources, UserCourseProgress, UserLessonsCompleted
+import learning_styles.manage.learningstyles
+from learning_styles.manage.learningstyles import get_learning_style_ids_signature, get_all_learning_styles, \
+    get_learning_style
+from learning_styles.manage.userlearningstyles import set_user_userlearningstyles
+from learning_styles.models import LearningStyles, UserLearningStyles
 from resources.models import Resources
+from static_containers import tasks
+from static_containers.models import DockerContainers
 
 
 class CoursesManagerTest(TestCase):
@@ -45,6 +76,21 @@ class CoursesManagerTest(TestCase):
         # Test that the QuerySet object contains the valid author defined in setup.
         self.assertTrue(courses.filter(author=self.test_author).exists())
 
+    def test_courses_get_all_pages(self):
+        """
+        Tests the get_all function returns every course once when read a page at a time.
+        """
+        for i in range(5):
+            Courses.objects.create(author=self.test_author, title="", description="")
+        course_ids = []
+        after = None
+        while True:
+            courses, after = split_keyset_page(get_all(after=after, limit=3), 2, 'id')
+            course_ids.extend(course.id for course in courses)
+            if after is None:
+                break
+        self.assertEqual(course_ids, list(Courses.objects.order_by('id').values_list('id', flat=True)))
+
     def test_invalid_courses_getall(self):
         # Get all courses.
         courses = get_all()
@@ -230,6 +276,228 @@ class CoursesManagerRemoveCoursesTest(TestCase):
         self.fail()
 
 
+class CoursesManagerRemoveCoursesContainersTest(TestCase):
+    """
+    Tests the containers of removed courses are removed from the Docker engine after the removal commits.
+    """
+
+    def setUp(self):
+        """
+        Create a course with learning resources (and so containers).
+        """
+        # Manual assignment of primary key.
+        self.test_author = User.objects.create_user(id=1,
+                                                    username='MrTest', email='test@test.com', password='test')
+        self.course = Courses.objects.create(author=self.test_author, title="", description="")
+        learning_style = LearningStyles.objects.create(name="Visual", spectrum_id=2)
+        for sequence_number in range(1, 4):
+            lesson = Lessons.objects.create(course=self.course, sequence_number=sequence_number, title="",
+                                            description="")
+            LessonsLearningStylesResources.objects.create(lesson=lesson, learning_style=learning_style,
+                                                          resource=Resources.objects.create(file="foo"), title="",
+                                                          description="")
+        self.container_names = set(DockerContainers.objects.values_list('unique_name', flat=True))
+
+    def run_on_commit_callbacks(self):
+        """
+        Runs the callbacks waiting for the test's transaction to commit (which it never does).
+        """
+        callbacks = [callback[1] for callback in connection.run_on_commit]
+        connection.run_on_commit = []
+        for callback in callbacks:
+            callback()
+
+    def test_remove_course_containers(self):
+        """
+        Tests removing a course removes its containers in one batch in the background (and no container is removed
+        when the removal is rolled back).
+        """
+        with mock.patch.object(tasks, 'get_container_names', return_value=self.container_names), \
+                mock.patch.object(tasks, 'force_remove_containers') as force_remove_containers:
+            try:
+                with transaction.atomic():
+                    remove_courses_ids_from_user(self.test_author, [self.course.id])
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+            self.run_on_commit_callbacks()
+            tasks.wait_for_tasks()
+            force_remove_containers.assert_not_called()
+            remove_courses_ids_from_user(self.test_author, [self.course.id])
+            self.run_on_commit_callbacks()
+            tasks.wait_for_tasks()
+        self.assertEqual(force_remove_containers.call_count, 1)
+        self.assertEqual(force_remove_containers.call_args[0][0], self.container_names)
+        self.assertFalse(DockerContainers.objects.exists())
+
+    def test_remove_containers_rolled_back_savepoint(self):
+        """
+        Tests the containers whose deletion is rolled back with a savepoint are kept when the rest of the transaction
+        commits.
+        """
+        resource = LessonsLearningStylesResources.objects.order_by('id').first()
+        container_name = DockerContainers.objects.get(resource=resource).unique_name
+        with mock.patch.object(tasks, 'get_container_names', return_value=self.container_names), \
+                mock.patch.object(tasks, 'force_remove_containers') as force_remove_containers:
+            with transaction.atomic():
+                resource.delete()
+                try:
+                    with transaction.atomic():
+                        remove_courses_ids_from_user(self.test_author, [self.course.id])
+                        raise IntegrityError
+                except IntegrityError:
+                    pass
+            self.run_on_commit_callbacks()
+            tasks.wait_for_tasks()
+        self.assertEqual(force_remove_containers.call_count, 1)
+        self.assertEqual(force_remove_containers.call_args[0][0], {container_name})
+        self.assertEqual(DockerContainers.objects.count(), 2)
+
+
+class CourseTreesManagerTest(TestCase):
+    """
+    Tests for the cached trees of courses.
+    """
+
+    def setUp(self):
+        """
+        Create a course with lessons and learning resources of two learning styles.
+        """
+        # Manual assignment of primary key.
+        self.test_author = User.objects.create_user(id=1,
+                                                    username='MrTest', email='test@test.com', password='test')
+        self.course = Courses.objects.create(author=self.test_author, title="Astronomy", description="")
+        self.lessons = [Lessons.objects.create(course=self.course, sequence_number=sequence_number, title="",
+                                               description="") for sequence_number in range(1, 4)]
+        self.visual_style = LearningStyles.objects.create(name="Visual", spectrum_id=2)
+        self.verbal_style = LearningStyles.objects.create(name="Verbal", spectrum_id=2)
+        self.resources = [LessonsLearningStylesResources.objects.create(
+            lesson=self.lessons[0], learning_style=learning_style, resource=Resources.objects.create(file="foo"),
+            title="", description="") for learning_style in (self.visual_style, self.verbal_style)]
+
+    def get_sequence(self):
+        return [lesson.id for lesson in get_course_tree(self.course.id)['lessons']]
+
+    def test_get_course_tree(self):
+        """
+        Tests a course's tree is read once and then from the cache, and groups resources by learning style.
+        """
+        with self.assertNumQueries(3):
+            tree = get_course_tree(self.course.id)
+        with self.assertNumQueries(0):
+            tree = get_course_tree(self.course.id)
+            self.assertEqual(tree['course'], self.course)
+            self.assertEqual(tree['lessons'], self.lessons)
+            self.assertEqual(tree['lessons'][0].course.title, "Astronomy")
+            self.assertEqual(tree['resources'][self.lessons[0].id],
+                             {self.visual_style.id: [self.resources[0]], self.verbal_style.id: [self.resources[1]]})
+            self.assertEqual(tree['resources'].get(self.lessons[1].id, {}), {})
+        with self.assertRaises(ObjectDoesNotExist):
+            get_course_tree(self.course.id + 1)
+
+    def test_course_tree_invalidation(self):
+        """
+        Tests a course's cached tree is replaced when its course, lessons or resources are saved, deleted or bulk
+        updated.
+        """
+        self.assertEqual(self.get_sequence(), [lesson.id for lesson in self.lessons])
+        move_lesson(self.lessons[2], 1)
+        self.assertEqual(self.get_sequence(), [self.lessons[2].id, self.lessons[0].id, self.lessons[1].id])
+        lesson = Lessons(course=self.course, sequence_number=4, title="", description="")
+        insert_lesson(lesson)
+        self.assertEqual(self.get_sequence()[-1], lesson.id)
+        self.resources[0].delete()
+        self.assertEqual(get_course_tree(self.course.id)['resources'][self.lessons[0].id],
+                         {self.verbal_style.id: [self.resources[1]]})
+        self.course.title = "Astrophysics"
+        self.course.save()
+        self.assertEqual(get_course_tree(self.course.id)['course'].title, "Astrophysics")
+
+    def test_resources_deleted_without_lessons_loaded(self):
+        """
+        Tests resources deleted without their lessons loaded invalidate their course's tree in a single callback (and
+        a single read of their lessons' courses) once the deletion commits.
+        """
+        get_course_tree(self.course.id)
+        connection.run_on_commit = []
+        with CaptureQueriesContext(connection) as queries:
+            LessonsLearningStylesResources.objects.filter(lesson=self.lessons[0]).delete()
+        self.assertFalse([query for query in queries if 'FROM "courses_lessons"' in query['sql']])
+        batches = [callback[1] for callback in connection.run_on_commit
+                   if getattr(callback[1], 'work', None) is invalidate_lessons_course_trees]
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(batches[0].items, {self.lessons[0].id})
+        self.assertEqual(get_course_tree(self.course.id)['resources'][self.lessons[0].id],
+                         {self.visual_style.id: [self.resources[0]], self.verbal_style.id: [self.resources[1]]})
+        connection.run_on_commit = []
+        with self.assertNumQueries(1):
+            batches[0]()
+        self.assertEqual(get_course_tree(self.course.id)['resources'][self.lessons[0].id], {})
+
+    def test_get_catalog_page(self):
+        """
+        Tests pages of the catalog are cached until a course is saved.
+        """
+        self.assertEqual(get_catalog_page(page_size=1), ([self.course], None))
+        with self.assertNumQueries(0):
+            get_catalog_page(page_size=1)
+        course = Courses.objects.create(author=self.test_author, title="", description="")
+        self.assertEqual(get_catalog_page(page_size=1), ([self.course], self.course.id))
+        self.assertEqual(get_catalog_page(after=self.course.id, page_size=1), ([course], None))
+
+
+class ResourceRankingManagerTest(TestCase):
+    """
+    Tests for ranking the learning resources of a lesson against a student's learning styles.
+    """
+
+    def setUp(self):
+        """
+        Create a lesson with learning resources for learning styles on two spectra.
+        """
+        # Manual assignment of primary key.
+        self.test_author = User.objects.create_user(id=1,
+                                                    username='MrTest', email='test@test.com', password='test')
+        self.course = Courses.objects.create(author=self.test_author, title="", description="")
+        self.lesson = Lessons.objects.create(course=self.course, sequence_number=1, title="", description="")
+        self.active_style = LearningStyles.objects.create(name="Active", spectrum_id=0)
+        self.reflective_style = LearningStyles.objects.create(name="Reflective", spectrum_id=0)
+        self.visual_style = LearningStyles.objects.create(name="Visual", spectrum_id=2)
+        self.verbal_style = LearningStyles.objects.create(name="Verbal", spectrum_id=2)
+        self.global_style = LearningStyles.objects.create(name="Global", spectrum_id=1)
+        self.resources = {learning_style.name: LessonsLearningStylesResources.objects.create(
+            lesson=self.lesson, learning_style=learning_style, resource=Resources.objects.create(file="foo"),
+            title="", description="") for learning_style in (self.verbal_style, self.global_style,
+                                                              self.reflective_style, self.visual_style,
+                                                              self.active_style)}
+
+    def rank(self, learning_styles, **kwargs):
+        tree = get_course_tree(self.course.id)
+        return [(resource.learning_style.name, score) for resource, score in rank_course_tree_lesson_resources(
+            tree, self.lesson, get_learning_style_vector(learning_styles, **kwargs))]
+
+    def test_rank_lesson_resources(self):
+        """
+        Tests resources for the student's learning styles rank first, then those of spectra the student is not placed
+        on and then those of the opposite learning styles, without querying once the course's tree is cached.
+        """
+        get_course_tree(self.course.id)
+        with self.assertNumQueries(0):
+            ranked = self.rank([self.active_style, self.visual_style])
+        self.assertEqual(ranked, [("Visual", 1.0), ("Active", 1.0), ("Global", 0.0), ("Verbal", -1.0),
+                                  ("Reflective", -1.0)])
+
+    def test_rank_lesson_resources_strengths(self):
+        """
+        Tests stronger preferences and more heavily weighted spectra rank first.
+        """
+        self.assertEqual(self.rank([self.active_style, self.visual_style],
+                                   strengths={self.active_style.id: 3.0})[:2], [("Active", 3.0), ("Visual", 1.0)])
+        vector = get_learning_style_vector([self.active_style, self.visual_style])
+        self.assertEqual(score_learning_style(self.verbal_style, vector, spectrum_weights={2: 2.0}), -2.0)
+        self.assertEqual(score_learning_style(self.global_style, vector), 0.0)
+
+
 class LessonsManagerTest(TestCase):
     """
     Generic Lessons Manager Tests
@@ -414,6 +682,209 @@ class LessonsManagerSequencingTest(TestCase):
         self.assertEqual(self.lesson3.sequence_number, 2)
 
 
+    def test_sequence_lessons_touches_moved_lessons(self):
+        """
+        Tests whether the sequence_lessons method renumbers a long course in a bounded number of statements and only
+        updates the lessons after the first gap.
+        """
+        self.course = Courses.objects.create(author=self.test_author, title="", description="")
+        Lessons.objects.bulk_create([Lessons(course=self.course, sequence_number=sequence_number, title="",
+                                             description="") for sequence_number in range(1, 1001) if
+                                     sequence_number != 10])
+        lesson9 = Lessons.objects.get(course=self.course, sequence_number=9)
+        # One read, one shift and four batches of renumbering, then the progress rebuild (two reads and a delete) with
+        # the savepoints of the two transactions.
+        with self.assertNumQueries(13):
+            sequence_lessons(self.course)
+        self.assertEqual(list(Lessons.objects.filter(course=self.course).order_by('sequence_number').values_list(
+            'sequence_number', flat=True)), list(range(1, 1000)))
+        self.assertEqual(Lessons.objects.get(id=lesson9.id).sequence_number, 9)
+
+
+    def test_append_lessons(self):
+        """
+        Tests whether the append_lessons method allocates the sequence numbers after the last lesson, one at a time or
+        in bulk.
+        """
+        lesson = Lessons(title="", description="")
+        append_lessons(self.course, [lesson])
+        self.assertEqual(Lessons.objects.get(id=lesson.id).sequence_number, 5)
+        lessons = [Lessons(title=str(i), description="") for i in range(3)]
+        append_lessons(self.course, lessons)
+        self.assertEqual([(Lessons.objects.get(id=lesson.id).title, lesson.sequence_number) for lesson in lessons],
+                         [("0", 6), ("1", 7), ("2", 8)])
+        self.assertEqual(Lessons.objects.get(id=lessons[2].id).order_key, 8 * ORDER_KEY_SPACING)
+
+    def test_insert_lesson_taken_sequence_number(self):
+        """
+        Tests whether a lesson being added after the last lesson is added after it if another lesson took its sequence
+        number first, and whether taking any other sequence number fails.
+        """
+        lesson = Lessons(course=self.course, sequence_number=4, title="", description="")
+        insert_lesson(lesson)
+        self.assertEqual(Lessons.objects.get(id=lesson.id).sequence_number, 5)
+        with self.assertRaises(IntegrityError):
+            insert_lesson(Lessons(course=self.course, sequence_number=2, title="", description=""))
+
+    def get_sequence(self, course: Courses) -> list:
+        return list(Lessons.objects.filter(course=course).order_by('sequence_number').values_list('id', flat=True))
+
+    def test_move_lesson(self):
+        """
+        Tests whether the move_lesson method moves a lesson in both directions, shifting only the lessons in between,
+        and updates progress summaries with it.
+        """
+        self.course = Courses.objects.create(author=self.test_author, title="", description="")
+        lessons = [Lessons.objects.create(course=self.course, sequence_number=sequence_number, title="",
+                                          description="") for sequence_number in range(1, 6)]
+        add_user_completed_lesson(self.test_author, lessons[0])
+        move_lesson(lessons[1], 4)
+        self.assertEqual(self.get_sequence(self.course),
+                         [lessons[0].id, lessons[2].id, lessons[3].id, lessons[1].id, lessons[4].id])
+        self.assertEqual(get_user_course_progress(self.test_author, self.course).next_lesson, lessons[2])
+        move_lesson(lessons[4], 1)
+        self.assertEqual(self.get_sequence(self.course),
+                         [lessons[4].id, lessons[0].id, lessons[2].id, lessons[3].id, lessons[1].id])
+        progress = get_user_course_progress(self.test_author, self.course)
+        self.assertEqual(progress.contiguous_sequence_number, 0)
+        self.assertEqual(progress.next_lesson, lessons[4])
+        with self.assertRaises(AssertionError):
+            move_lesson(lessons[0], 6)
+
+    def test_reorder_lessons(self):
+        """
+        Tests whether the reorder_lessons method applies a full permutation and only updates the affected range.
+        """
+        self.course = Courses.objects.create(author=self.test_author, title="", description="")
+        lessons = [Lessons.objects.create(course=self.course, sequence_number=sequence_number, title="",
+                                          description="") for sequence_number in range(1, 7)]
+        order = [lessons[0].id, lessons[3].id, lessons[2].id, lessons[1].id, lessons[4].id, lessons[5].id]
+        reorder_lessons(self.course, order)
+        self.assertEqual(self.get_sequence(self.course), order)
+        order = list(reversed(order))
+        reorder_lessons(self.course, order)
+        self.assertEqual(self.get_sequence(self.course), order)
+        with self.assertRaises(AssertionError):
+            reorder_lessons(self.course, order[1:])
+
+
+@override_settings(LESSON_ORDERING_MODE='gapped')
+class LessonsManagerOrderKeyTest(TestCase):
+    """
+    Tests for the Lesson Managers ordering keys
+    """
+
+    def setUp(self):
+        """
+        Create a compacted course of five lessons placed by ordering key.
+        """
+        # Manual assignment of primary key.
+        self.test_author = User.objects.create_user(id=1,
+                                                    username='MrTest', email='test@test.com', password='test')
+        self.course = Courses.objects.create(author=self.test_author, title="", description="")
+        self.lessons = []
+        for sequence_number in range(1, 6):
+            lesson = Lessons(course=self.course, sequence_number=sequence_number, title="", description="")
+            insert_lesson(lesson)
+            self.lessons.append(lesson)
+        compact_lesson_order()
+
+    def get_rows(self) -> list:
+        return list(Lessons.objects.filter(course=self.course).order_by('id').values_list(
+            'id', 'sequence_number', 'order_key'))
+
+    def get_sequence(self) -> list:
+        return list(Lessons.objects.filter(course=self.course).order_by('sequence_number').values_list('id',
+                                                                                                       flat=True))
+
+    def assertCompacted(self, order: list):
+        self.assertEqual(list(Lessons.objects.filter(course=self.course).order_by('sequence_number').values_list(
+            'id', 'sequence_number', 'order_key')),
+            [(lesson_id, i, i * ORDER_KEY_SPACING) for i, lesson_id in enumerate(order, 1)])
+        self.assertFalse(Courses.objects.get(id=self.course.id).lessons_order_stale)
+
+    def test_move_lesson_updates_one_row(self):
+        """
+        Tests whether moving a lesson only updates its own row until the course is compacted.
+        """
+        rows = self.get_rows()
+        move_lesson(self.lessons[4], 1)
+        moved_rows = self.get_rows()
+        self.assertEqual([row for row in moved_rows if row[0] != self.lessons[4].id],
+                         [row for row in rows if row[0] != self.lessons[4].id])
+        self.assertEqual(Lessons.objects.get(id=self.lessons[4].id).sequence_number, 5)
+        self.assertTrue(Courses.objects.get(id=self.course.id).lessons_order_stale)
+        self.assertEqual(compact_lesson_order(), 1)
+        self.assertCompacted([self.lessons[i].id for i in (4, 0, 1, 2, 3)])
+        self.assertEqual(compact_lesson_order(), 0)
+
+    def test_insert_lesson(self):
+        """
+        Tests whether inserting a lesson before others only writes its own row and that compacting the course places
+        it in sequence and updates progress summaries with it.
+        """
+        add_user_completed_lesson(self.test_author, self.lessons[0])
+        add_user_completed_lesson(self.test_author, self.lessons[1])
+        rows = self.get_rows()
+        lesson = Lessons(course=self.course, sequence_number=2, title="", description="")
+        insert_lesson(lesson)
+        self.assertEqual([row for row in self.get_rows() if row[0] != lesson.id], rows)
+        self.assertEqual(lesson.sequence_number, 6)
+        call_command('compact_lesson_order', stdout=StringIO())
+        self.assertCompacted([self.lessons[0].id, lesson.id] + [self.lessons[i].id for i in range(1, 5)])
+        progress = get_user_course_progress(self.test_author, self.course)
+        self.assertEqual(progress.contiguous_sequence_number, 1)
+        self.assertEqual(progress.next_lesson, lesson)
+
+    def test_lesson_created_without_order_key(self):
+        """
+        Tests whether a lesson created outside the lessons manager (e.g. from the admin) is placed by its sequence
+        number rather than before every other lesson.
+        """
+        lesson = Lessons.objects.create(course=self.course, sequence_number=6, title="", description="")
+        self.assertEqual(lesson.order_key, 6 * ORDER_KEY_SPACING)
+        Courses.objects.filter(id=self.course.id).update(lessons_order_stale=True)
+        compact_lesson_order()
+        self.assertCompacted([lesson.id for lesson in self.lessons] + [lesson.id])
+
+    def test_lessons_inserted_without_order_key(self):
+        """
+        Tests whether lessons inserted without ordering keys (e.g. in bulk or from a fixture) are ordered by their
+        sequence numbers and given their keys when the course is compacted.
+        """
+        Lessons.objects.bulk_create([Lessons(course=self.course, sequence_number=sequence_number, title="",
+                                             description="") for sequence_number in (6, 7)])
+        lesson6, lesson7 = Lessons.objects.filter(course=self.course, sequence_number__gt=5).order_by('sequence_number')
+        self.assertIsNone(lesson7.order_key)
+        move_lesson(lesson7, 1)
+        insert_lesson(Lessons(course=self.course, sequence_number=8, title="", description=""))
+        last = Lessons.objects.get(course=self.course, sequence_number=8)
+        self.assertEqual(last.order_key, 7 * ORDER_KEY_SPACING)
+        compact_lesson_order()
+        self.assertCompacted([lesson7.id] + [lesson.id for lesson in self.lessons] + [lesson6.id, last.id])
+
+    def test_move_lesson_without_room(self):
+        """
+        Tests whether a course is compacted when there is no room between the ordering keys of a lesson's new
+        neighbours.
+        """
+        Lessons.objects.filter(id=self.lessons[0].id).update(order_key=1)
+        Lessons.objects.filter(id=self.lessons[1].id).update(order_key=2)
+        move_lesson(self.lessons[4], 2)
+        self.assertEqual(self.get_sequence(), [self.lessons[i].id for i in range(0, 5)])
+        compact_lesson_order()
+        self.assertCompacted([self.lessons[i].id for i in (0, 4, 1, 2, 3)])
+
+    @override_settings(LESSON_ORDERING_MODE='dense')
+    def test_dense_move_lesson(self):
+        """
+        Tests whether moving a lesson by sequence number keeps the ordering keys in step with the sequence numbers.
+        """
+        move_lesson(self.lessons[1], 4)
+        reorder_lessons(self.course, [self.lessons[i].id for i in (4, 0, 2, 3, 1)])
+        self.assertCompacted([self.lessons[i].id for i in (4, 0, 2, 3, 1)])
+
+
 class LessonsLearningStyleResourcesManagerTest(TestCase):
     """
     Tests for the LessonsLearningStyleResourcesManager
@@ -516,6 +987,45 @@ class LessonsLearningStyleResourcesManagerTest(TestCase):
         # Check its equal to the expected value
         self.assertEqual(resources.count(), 1)
 
+    def test_signature_lesson_resources(self):
+        """
+        Tests resources are matched to a learning style signature in a single query, and the bit of a deleted learning
+        style is reused.
+        """
+        LessonsLearningStylesResources.objects.create(lesson=self.lesson, learning_style=self.reflective_style,
+                                                      resource=Resources.objects.create(file=self.file), title="",
+                                                      description="")
+        visual_style = LearningStyles.objects.create(name="Visual")
+        self.assertEqual(len({self.active_style.signature_bit, self.reflective_style.signature_bit,
+                              visual_style.signature_bit}), 3)
+        signature = get_learning_style_ids_signature([self.active_style.id, visual_style.id])
+        with self.assertNumQueries(1):
+            resources = list(get_signature_lesson_resources(signature, self.lesson))
+        self.assertEqual(resources, [self.lessonslearningstyleresources])
+        self.assertEqual([resource.learning_style for resource in get_signature_lesson_resources(
+            signature, self.lesson, excluded=True)], [self.reflective_style])
+        self.assertEqual(list(get_excluded_learning_styles_lesson_resources([self.reflective_style], self.lesson)),
+                         [self.lessonslearningstyleresources])
+        self.active_style.delete()
+        self.assertEqual(LearningStyles.objects.create(name="Verbal").signature_bit, self.active_style.signature_bit)
+
+    @mock.patch('learning_styles.manage.learningstyles.connection', in_atomic_block=False)
+    def test_resource_learning_style_bit_read_from_database(self, connection):
+        """
+        Tests the learning style bit stored on a resource is read from the database, not from a process's stale cache of
+        the learning styles (as when a learning style is created by another process).
+        """
+        self.addCleanup(setattr, learning_styles.manage.learningstyles, 'reference_learning_styles', (None, None, None))
+        get_all_learning_styles()
+        # Inserted without the signals which invalidate the cache, as though by another process.
+        LearningStyles.objects.bulk_create([LearningStyles(name="Visual", signature_bit=40)])
+        visual_style = LearningStyles.objects.get(name="Visual")
+        self.assertIsNone(get_learning_style(visual_style.id))
+        resource = LessonsLearningStylesResources.objects.create(
+            lesson=self.lesson, learning_style=visual_style, resource=Resources.objects.create(file=self.file),
+            title="", description="")
+        self.assertEqual(resource.learning_style_bit, 1 << 40)
+
 
 class UsersLessonsCompletedManagerTest(TestCase):
     """
@@ -566,4 +1076,475 @@ class UsersLessonsCompletedManagerTest(TestCase):
         percentages = get_user_course_completion_percentages(self.test_user, courses)
         self.assertEqual(percentages.get(1), (5/5)*100)
 
+    def test_get_users_course_completion_percentages(self):
+        """
+        Tests the batched completion percentages for many users and courses are computed in a single query.
+        """
+        test_user2 = User.objects.create_user(id=2, username='MrTest2', email='test2@test.com', password='test')
+        course2 = Courses.objects.create(author=self.test_user, title="", description="")
+        empty_course = Courses.objects.create(author=self.test_user, title="", description="")
+        course2_lesson = Lessons.objects.create(course=course2, sequence_number=1, title="", description="")
+        Lessons.objects.create(course=course2, sequence_number=2, title="", description="")
+        add_user_completed_lesson(self.test_user, self.lesson)
+        add_user_completed_lesson(self.test_user, course2_lesson)
+        add_user_completed_lesson(test_user2, self.lesson)
+        add_user_completed_lesson(test_user2, self.lesson2)
+        courses = [self.course, course2, empty_course]
+        with self.assertNumQueries(1):
+            percentages = get_users_course_completion_percentages([self.test_user, test_user2], courses)
+        self.assertEqual(percentages.get(self.test_user.id), {self.course.id: 20, course2.id: 50, empty_course.id: 0})
+        self.assertEqual(percentages.get(test_user2.id), {self.course.id: 40, course2.id: 0, empty_course.id: 0})
+
 
+class UserCourseProgressManagerTest(TestCase):
+    """
+    Tests for the maintenance of UserCourseProgress summaries.
+    """
+
+    def setUp(self):
+        """
+        Create a series of test cases.
+        """
+        # Manual assignment of primary key.
+        self.test_user = User.objects.create_user(id=1,
+                                                  username='MrTest', email='test@test.com', password='test')
+        self.course = Courses.objects.create(author=self.test_user, title="", description="")
+        self.lesson = Lessons.objects.create(course=self.course, sequence_number=1, title="", description="")
+        self.lesson2 = Lessons.objects.create(course=self.course, sequence_number=2, title="", description="")
+        self.lesson3 = Lessons.objects.create(course=self.course, sequence_number=3, title="", description="")
+
+    def test_add_user_completed_lesson_updates_progress(self):
+        """
+        Tests the summary follows lessons being completed.
+        """
+        add_user_completed_lesson(self.test_user, self.lesson)
+        add_user_completed_lesson(self.test_user, self.lesson3)
+        progress = get_user_course_progress(self.test_user, self.course)
+        self.assertEqual(progress.completed_count, 2)
+        self.assertEqual(progress.contiguous_sequence_number, 1)
+        self.assertEqual(progress.next_lesson, self.lesson2)
+        add_user_completed_lesson(self.test_user, self.lesson2)
+        progress = get_user_course_progress(self.test_user, self.course)
+        self.assertEqual(progress.contiguous_sequence_number, 3)
+        self.assertIsNone(progress.next_lesson)
+
+    def test_remove_lessons_updates_progress(self):
+        """
+        Tests the summary follows lessons being removed and re-sequenced.
+        """
+        add_user_completed_lesson(self.test_user, self.lesson)
+        add_user_completed_lesson(self.test_user, self.lesson3)
+        remove_lessons_ids_from_course(self.course, [self.lesson2.id])
+        progress = get_user_course_progress(self.test_user, self.course)
+        # Lesson 3 has become lesson 2 so the whole course is complete.
+        self.assertEqual(progress.completed_count, 2)
+        self.assertEqual(progress.contiguous_sequence_number, 2)
+        self.assertIsNone(progress.next_lesson)
+
+    def test_delete_lesson_sequences_progress(self):
+        """
+        Tests a lesson deleted outside the lessons manager (e.g. from the admin) is sequenced out of the summaries
+        once the deletion commits, rather than leaving a summary which reads as the course being complete.
+        """
+        add_user_completed_lesson(self.test_user, self.lesson)
+        self.lesson2.delete()
+        self.assertIsNone(get_user_course_progress(self.test_user, self.course).next_lesson)
+        callbacks = [callback[1] for callback in connection.run_on_commit]
+        connection.run_on_commit = []
+        for callback in callbacks:
+            callback()
+        progress = get_user_course_progress(self.test_user, self.course)
+        self.assertEqual(progress.next_lesson, self.lesson3)
+        self.assertEqual(Lessons.objects.get(id=self.lesson3.id).sequence_number, 2)
+        # Lessons removed through the manager are sequenced inline and not again once the deletion commits.
+        remove_lessons_ids_from_course(self.course, [self.lesson3.id])
+        with mock.patch('courses.manage.lessons.sequence_lessons') as sequence_lessons:
+            for callback in [callback[1] for callback in connection.run_on_commit]:
+                callback()
+        sequence_lessons.assert_not_called()
+
+    def test_purge_removes_progress(self):
+        """
+        Tests purging save data also removes the summaries.
+        """
+        add_user_completed_lesson(self.test_user, self.lesson)
+        purge_user_course_progress(self.test_user, self.course)
+        self.assertFalse(UserCourseProgress.objects.filter(user=self.test_user).exists())
+        add_user_completed_lesson(self.test_user, self.lesson)
+        purge_user_progress(self.test_user)
+        self.assertFalse(UserCourseProgress.objects.filter(user=self.test_user).exists())
+
+    def test_reconcile_course_progress(self):
+        """
+        Tests the reconcile command rebuilds summaries from save data.
+        """
+        UserLessonsCompleted.objects.create(user=self.test_user, lesson=self.lesson)
+        UserLessonsCompleted.objects.create(user=self.test_user, lesson=self.lesson2)
+        self.assertFalse(UserCourseProgress.objects.filter(user=self.test_user).exists())
+        call_command('reconcile_course_progress', stdout=StringIO())
+        progress = get_user_course_progress(self.test_user, self.course)
+        self.assertEqual(progress.completed_count, 2)
+        self.assertEqual(progress.next_lesson, self.lesson3)
+
+    def test_completed_lessons_bitmap(self):
+        """
+        Tests the bitmap of completed lessons follows lessons being completed and re-sequenced.
+        """
+        add_user_completed_lesson(self.test_user, self.lesson)
+        add_user_completed_lesson(self.test_user, self.lesson3)
+        bitmap = decode_completed_lessons(get_user_course_progress(self.test_user, self.course).completed_lessons)
+        self.assertEqual(bitmap, 0b101)
+        self.assertTrue(has_bitmap_sequence_number(bitmap, 3))
+        self.assertFalse(has_bitmap_sequence_number(bitmap, 2))
+        remove_lessons_ids_from_course(self.course, [self.lesson2.id])
+        bitmap = decode_completed_lessons(get_user_course_progress(self.test_user, self.course).completed_lessons)
+        self.assertEqual(bitmap, 0b11)
+
+    def test_bitmap_operations(self):
+        """
+        Tests the bit operations used to answer progress questions.
+        """
+        self.assertEqual(decode_completed_lessons(encode_completed_lessons(0)), 0)
+        self.assertEqual(decode_completed_lessons(encode_completed_lessons(1 << 200 | 1)), 1 << 200 | 1)
+        self.assertEqual(get_bitmap_contiguous_sequence_number(0), 0)
+        self.assertEqual(get_bitmap_contiguous_sequence_number(0b1011), 2)
+        self.assertEqual(get_bitmap_contiguous_sequence_number(0b1111), 4)
+        self.assertEqual(get_bitmap_completed_count(0b1011), 3)
+        self.assertEqual(get_bitmap_completion_percentage(0b1011, 4), 75)
+        self.assertEqual(get_bitmap_completion_percentage(0b1011, 0), 0)
+
+    def test_get_course_progress_bitmaps(self):
+        """
+        Tests a cohort's bitmaps are read at once.
+        """
+        test_user2 = User.objects.create_user(id=2, username='MrTest2', email='test2@test.com', password='test')
+        add_user_completed_lesson(self.test_user, self.lesson)
+        add_user_completed_lesson(test_user2, self.lesson2)
+        with self.assertNumQueries(1):
+            bitmaps = get_course_progress_bitmaps(self.course, users=[self.test_user, test_user2])
+        self.assertEqual(bitmaps, {self.test_user.id: 0b1, test_user2.id: 0b10})
+
+    def test_add_user_completed_lesson_is_idempotent(self):
+        """
+        Tests completing a lesson twice leaves a single row of save data and an unchanged summary.
+        """
+        self.assertTrue(add_user_completed_lesson(self.test_user, self.lesson))
+        self.assertFalse(add_user_completed_lesson(self.test_user, self.lesson))
+        self.assertEqual(UserLessonsCompleted.objects.filter(user=self.test_user, lesson=self.lesson).count(), 1)
+        self.assertEqual(get_user_course_progress(self.test_user, self.course).completed_count, 1)
+        with self.assertRaises(IntegrityError):
+            UserLessonsCompleted.objects.create(user=self.test_user, lesson=self.lesson)
+
+
+class ProgressQueueTest(TestCase):
+    """
+    Tests for the write-behind queue of lesson completions.
+    """
+
+    def setUp(self):
+        """
+        Create a series of test cases and an empty queue.
+        """
+        self.queue_directory = tempfile.mkdtemp()
+        self.settings_override = override_settings(PROGRESS_WRITE_BEHIND=True, PROGRESS_QUEUE_DIR=self.queue_directory)
+        self.settings_override.enable()
+        # Manual assignment of primary key.
+        self.test_user = User.objects.create_user(id=1,
+                                                  username='MrTest', email='test@test.com', password='test')
+        self.course = Courses.objects.create(author=self.test_user, title="", description="")
+        self.lesson = Lessons.objects.create(course=self.course, sequence_number=1, title="", description="")
+        self.lesson2 = Lessons.objects.create(course=self.course, sequence_number=2, title="", description="")
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.queue_directory)
+
+    def test_enqueue_and_flush(self):
+        """
+        Tests queued completions are readable before they are written and are written once by a flush.
+        """
+        enqueue_completed_lesson(self.test_user, self.lesson)
+        enqueue_completed_lesson(self.test_user, self.lesson)
+        self.assertEqual(get_pending_completed_lessons(self.test_user, self.course), [self.lesson.id, self.lesson.id])
+        self.assertFalse(UserLessonsCompleted.objects.filter(user=self.test_user).exists())
+        self.assertEqual(flush_progress_queue(), 1)
+        self.assertEqual(get_pending_completed_lessons(self.test_user), [])
+        self.assertEqual(get_user_course_progress(self.test_user, self.course).next_lesson, self.lesson2)
+        self.assertEqual(flush_progress_queue(), 0)
+
+    def test_merge_pending_completed_lessons(self):
+        """
+        Tests queued completions are merged into the progress summary without writing it.
+        """
+        enqueue_completed_lesson(self.test_user, self.lesson)
+        progress = merge_user_course_progress_lessons(UserCourseProgress(user=self.test_user, course=self.course),
+                                                      get_pending_completed_lessons(self.test_user, self.course))
+        self.assertEqual(progress.contiguous_sequence_number, 1)
+        self.assertEqual(progress.next_lesson, self.lesson2)
+        self.assertFalse(UserCourseProgress.objects.exists())
+
+    def test_discard_pending_completed_lessons(self):
+        """
+        Tests discarded completions are not written by a later flush.
+        """
+        enqueue_completed_lesson(self.test_user, self.lesson)
+        discard_pending_completed_lessons(self.test_user, self.course)
+        self.assertEqual(flush_progress_queue(), 0)
+        self.assertFalse(UserLessonsCompleted.objects.exists())
+
+    def test_enqueue_after_partial_line(self):
+        """
+        Tests a line left partially written by a crash is cut before the next append rather than joined onto it.
+        """
+        enqueue_completed_lesson(self.test_user, self.lesson)
+        path = os.path.join(self.queue_directory, PENDING_DIRECTORY, str(self.test_user.id) + '.jsonl')
+        with open(path, 'a') as queue_file:
+            queue_file.write('{"user_id": 1, "lesson')
+        enqueue_completed_lesson(self.test_user, self.lesson2)
+        self.assertEqual(get_pending_completed_lessons(self.test_user), [self.lesson.id, self.lesson2.id])
+        self.assertEqual(flush_progress_queue(), 2)
+
+    def test_discard_waits_for_flush(self):
+        """
+        Tests a discard of a file being flushed waits until the flush has written and deleted it.
+        """
+        enqueue_completed_lesson(self.test_user, self.lesson)
+        discard = threading.Thread(target=discard_pending_completed_lessons, args=(self.test_user,))
+
+        def apply_completed_lessons(events):
+            discard.start()
+            discard.join(0.2)
+            self.assertTrue(discard.is_alive())
+            return progressqueue_apply_completed_lessons(events)
+
+        with mock.patch('courses.progressqueue.apply_completed_lessons', apply_completed_lessons):
+            self.assertEqual(flush_progress_queue(), 1)
+        discard.join()
+        self.assertEqual(get_pending_completed_lessons(self.test_user), [])
+
+    def test_discard_taken_whilst_waiting(self):
+        """
+        Tests a discard of a pending file taken for flushing whilst waiting on its lock discards from the taken file,
+        keeping the completions of other courses.
+        """
+        other_course = Courses.objects.create(author=self.test_user, title="", description="")
+        other_lesson = Lessons.objects.create(course=other_course, sequence_number=1, title="", description="")
+        enqueue_completed_lesson(self.test_user, self.lesson)
+        enqueue_completed_lesson(self.test_user, other_lesson)
+        flock = fcntl.flock
+        taken = []
+
+        def take_before_flock(queue_file, operation):
+            if not taken:
+                taken.append(True)
+                take_pending_queue_files()
+            flock(queue_file, operation)
+
+        with mock.patch('courses.progressqueue.fcntl.flock', take_before_flock):
+            discard_pending_completed_lessons(self.test_user, self.course)
+        self.assertEqual(get_pending_completed_lessons(self.test_user), [other_lesson.id])
+        self.assertEqual(flush_progress_queue(), 1)
+        self.assertEqual(set(UserLessonsCompleted.objects.values_list('lesson_id', flat=True)), {other_lesson.id})
+
+    def test_flush_progress_queue_command(self):
+        """
+        Tests the flush command writes the queue.
+        """
+        enqueue_completed_lesson(self.test_user, self.lesson)
+        call_command('flush_progress_queue', stdout=StringIO())
+        self.assertTrue(UserLessonsCompleted.objects.filter(user=self.test_user, lesson=self.lesson).exists())
+
+
+class ProgressImportExportTest(TestCase):
+    """
+    Tests for the streaming progress export and import commands.
+    """
+
+    def setUp(self):
+        """
+        Create a series of test cases.
+        """
+        # Manual assignment of primary key.
+        self.test_user = User.objects.create_user(id=1,
+                                                  username='MrTest', email='test@test.com', password='test')
+        self.course = Courses.objects.create(author=self.test_user, title="", description="")
+        self.lesson = Lessons.objects.create(course=self.course, sequence_number=1, title="", description="")
+        self.lesson2 = Lessons.objects.create(course=self.course, sequence_number=2, title="", description="")
+        self.learning_style = LearningStyles.objects.create(name="Global", spectrum_id=1)
+        UserLearningStyles.objects.create(user=self.test_user, learning_style=self.learning_style)
+        add_user_completed_lesson(self.test_user, self.lesson)
+        add_user_completed_lesson(self.test_user, self.lesson2)
+
+    def test_export_import_progress(self):
+        """
+        Tests exported progress is restored by an import (and that importing twice adds nothing).
+        """
+        output = StringIO()
+        call_command('export_progress', chunk_size=1, stdout=output, stderr=StringIO())
+        lines = output.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        purge_user_progress(self.test_user)
+        UserLearningStyles.objects.all().delete()
+        path = os.path.join(tempfile.mkdtemp(), 'progress.jsonl')
+        with open(path, 'w') as export_file:
+            export_file.write(output.getvalue())
+        call_command('import_progress', path, chunk_size=2, stdout=StringIO())
+        self.assertEqual(set(UserLessonsCompleted.objects.values_list('user_id', 'lesson_id')),
+                         {(self.test_user.id, self.lesson.id), (self.test_user.id, self.lesson2.id)})
+        self.assertTrue(UserLearningStyles.objects.filter(user=self.test_user,
+                                                          learning_style=self.learning_style).exists())
+        self.assertEqual(get_user_course_progress(self.test_user, self.course).completed_count, 2)
+        call_command('import_progress', path, stdout=StringIO())
+        self.assertEqual(UserLessonsCompleted.objects.count(), 2)
+        self.assertEqual(UserLearningStyles.objects.count(), 1)
+        shutil.rmtree(os.path.dirname(path))
+
+    def test_import_progress_records(self):
+        """
+        Tests lessons are found by their course's key, records missing a field are reported and skipped, and imported
+        learning styles replace the user's learning styles on their spectrum only.
+        """
+        sequential_style = LearningStyles.objects.create(name="Sequential", spectrum_id=1)
+        visual_style = LearningStyles.objects.create(name="Visual", spectrum_id=2)
+        set_user_userlearningstyles(self.test_user, [sequential_style, visual_style])
+        purge_user_progress(self.test_user)
+        records = [{'model': 'userlearningstyles', 'username': 'MrTest', 'learning_style': "Global"},
+                   {'model': 'userlessonscompleted', 'username': 'MrTest', 'course_key': str(self.course.key),
+                    'sequence_number': 2},
+                   {'model': 'userlessonscompleted', 'username': 'MrTest', 'course_id': self.course.id,
+                    'sequence_number': 1},
+                   {'model': 'userlearningstyles', 'username': 'MrTest'}]
+        path = os.path.join(tempfile.mkdtemp(), 'progress.jsonl')
+        with open(path, 'w') as export_file:
+            export_file.writelines(json.dumps(record) + '\n' for record in records)
+        output, errors = StringIO(), StringIO()
+        call_command('import_progress', path, stdout=output, stderr=errors)
+        shutil.rmtree(os.path.dirname(path))
+        self.assertIn("skipped 2", output.getvalue())
+        self.assertIn("Line 3", errors.getvalue())
+        self.assertIn("Line 4", errors.getvalue())
+        self.assertEqual(set(UserLessonsCompleted.objects.values_list('lesson_id', flat=True)), {self.lesson2.id})
+        self.assertEqual(set(UserLearningStyles.objects.filter(user=self.test_user).values_list(
+            'learning_style__name', flat=True)), {"Global", "Visual"})
+
+
+def write_course_archive(path: str, manifest: dict, files: dict) -> str:
+    """
+    Writes a course archive of a manifest and files (a dictionary of names to contents) for the course archive tests.
+    """
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('manifest.json', json.dumps(manifest))
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return path
+
+
+def get_resource_zip(files: tuple = ('index.html',)) -> bytes:
+    """
+    Returns the contents of a resource zip file of the files named.
+    """
+    output = BytesIO()
+    with zipfile.ZipFile(output, 'w') as resource_zip:
+        for name in files:
+            resource_zip.writestr(name, '<html></html>')
+    return output.getvalue()
+
+
+class CourseArchivesManagerTest(TestCase):
+    """
+    Tests for importing courses from course archives.
+    """
+
+    def setUp(self):
+        """
+        Create a leader, learning styles and a course archive of two lessons (in a temporary media root).
+        """
+        # Manual assignment of primary key.
+        self.test_user = User.objects.create_user(id=1,
+                                                  username='MrTest', email='test@test.com', password='test')
+        LearningStyles.objects.create(name="Visual", spectrum_id=2)
+        LearningStyles.objects.create(name="Verbal", spectrum_id=2)
+        self.directory = tempfile.mkdtemp()
+        self.media_root = override_settings(MEDIA_ROOT=os.path.join(self.directory, 'media'))
+        self.media_root.enable()
+        self.manifest = {'title': "Astronomy", 'description': "The night sky", 'logo': 'logo.png',
+                         'lessons': [{'title': "Telescopes", 'resources': [
+                             {'learning_style': "Visual", 'title': "Lenses", 'file': 'telescopes/visual.zip'},
+                             {'learning_style': "Verbal", 'title': "Mirrors", 'file': 'telescopes/verbal.zip'}]},
+                             {'title': "Planets", 'description': "", 'resources': [
+                                 {'learning_style': "Visual", 'title': "Orbits", 'file': 'telescopes/visual.zip'}]}]}
+        self.files = {'logo.png': b'logo', 'telescopes/visual.zip': get_resource_zip(),
+                      'telescopes/verbal.zip': get_resource_zip()}
+
+    def tearDown(self):
+        self.media_root.disable()
+        shutil.rmtree(self.directory)
+
+    def test_import_course_archive(self):
+        """
+        Tests a course archive is imported with its lessons in order and its resources (which share files named
+        twice) and containers flagged to be built.
+        """
+        path = write_course_archive(os.path.join(self.directory, 'course.zip'), self.manifest, self.files)
+        call_command('import_course_archive', path, author='MrTest', stdout=StringIO())
+        course = Courses.objects.get()
+        self.assertEqual((course.author, course.title, course.description), (self.test_user, "Astronomy",
+                                                                             "The night sky"))
+        self.assertTrue(course.logo.file.name.endswith('.png'))
+        self.assertEqual(list(Lessons.objects.filter(course=course).order_by('sequence_number').values_list(
+            'sequence_number', 'order_key', 'title')),
+            [(1, ORDER_KEY_SPACING, "Telescopes"), (2, 2 * ORDER_KEY_SPACING, "Planets")])
+        resources = list(LessonsLearningStylesResources.objects.filter(lesson__course=course).order_by('id'))
+        self.assertEqual([(resource.lesson.sequence_number, resource.learning_style.name, resource.title)
+                          for resource in resources],
+                         [(1, "Visual", "Lenses"), (1, "Verbal", "Mirrors"), (2, "Visual", "Orbits")])
+        self.assertEqual(resources[0].resource.file.name, resources[2].resource.file.name)
+        self.assertNotEqual(resources[0].resource.file.name, resources[1].resource.file.name)
+        self.assertTrue(all(os.path.isfile(resource.resource.file.path) for resource in resources))
+        containers = DockerContainers.objects.filter(resource__in=resources)
+        self.assertEqual(len({container.host_port for container in containers}), 3)
+        self.assertTrue(all(container.build for container in containers))
+
+    def test_import_invalid_course_archive(self):
+        """
+        Tests an archive with an invalid resource zip, an unknown learning style or a missing file creates and stores
+        nothing.
+        """
+        self.files['telescopes/verbal.zip'] = get_resource_zip(files=('page.html',))
+        path = write_course_archive(os.path.join(self.directory, 'course.zip'), self.manifest, self.files)
+        with self.assertRaisesRegex(ValidationError, "telescopes/verbal.zip"):
+            prepare_course_archive(path)
+        self.manifest['lessons'][0]['resources'][1]['learning_style'] = "Auditory"
+        path = write_course_archive(os.path.join(self.directory, 'course.zip'), self.manifest, self.files)
+        with self.assertRaisesRegex(CommandError, "Auditory"):
+            call_command('import_course_archive', path, author='MrTest', stdout=StringIO())
+        del self.files['logo.png']
+        path = write_course_archive(os.path.join(self.directory, 'course.zip'), self.manifest, self.files)
+        with self.assertRaisesRegex(ValidationError, "logo.png"):
+            prepare_course_archive(path)
+        self.manifest['logo'] = ["logo.png"]
+        path = write_course_archive(os.path.join(self.directory, 'course.zip'), self.manifest, self.files)
+        with self.assertRaisesRegex(ValidationError, "logo"):
+            prepare_course_archive(path)
+        del self.manifest['logo']
+        self.manifest['lessons'][0]['resources'][0]['file'] = {"name": "telescopes/visual.zip"}
+        path = write_course_archive(os.path.join(self.directory, 'course.zip'), self.manifest, self.files)
+        with self.assertRaisesRegex(ValidationError, "file"):
+            prepare_course_archive(path)
+        self.manifest['lessons'][0]['resources'][0]['file'] = "telescopes/visual.zip"
+        self.manifest['lessons'][0]['resources'][1]['learning_style'] = "Verbal"
+        path = write_course_archive(os.path.join(self.directory, 'course.zip'), self.manifest, self.files)
+        # A corrupt archive, one of whose files no longer matches its checksum.
+        with zipfile.ZipFile(path) as archive:
+            info = archive.getinfo('telescopes/visual.zip')
+        with open(path, 'r+b') as archive:
+            archive.seek(info.header_offset + 30 + len(info.filename))
+            byte = archive.read(1)
+            archive.seek(-1, os.SEEK_CUR)
+            archive.write(bytes([byte[0] ^ 0xff]))
+        with self.assertRaisesRegex(ValidationError, "could not be read"):
+            prepare_course_archive(path)
+        self.assertFalse(Courses.objects.exists())
+        self.assertFalse(Resources.objects.exists())
+        self.assertFalse(os.path.isdir(os.path.join(self.directory, 'media')) and
+                         any(files for root, dirs, files in os.walk(os.path.join(self.directory, 'media'))))
@@ -1 +1,289 @@
-# Create your tests here.
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from io import BytesIO
+from unittest import skipIf
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from courses.models import Courses, Lessons, LessonsLearningStylesResources, UserLessonsCompleted
+from leaders_interfaces.views import lessons_page_size
+from learning_styles.manage.questionnaire import QUESTIONNAIRE_ITEMS
+from learning_styles.models import LearningStyles, UserLearningStyles
+from resources.models import Resources
+from roles.models import UserRoles
+from search.manage.searchindex import search_index
+from static_containers.models import DockerContainers
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class LessonsReorderViewTest(TestCase):
+    def setUp(self):
+        """
+        Create a leader with a course of lessons to reorder.
+        """
+        # Manual assignment of primary key.
+        self.test_leader = User.objects.create_user(id=1,
+                                                    username='MrTest', email='test@test.com', password='test')
+        UserRoles.objects.create(user=self.test_leader, role='leader')
+        self.course = Courses.objects.create(author=self.test_leader, title="", description="")
+        self.lessons = [Lessons.objects.create(course=self.course, sequence_number=sequence_number, title="",
+                                               description="") for sequence_number in range(1, 5)]
+        self.client.login(username='MrTest', password='test')
+
+    def get_sequence(self):
+        return list(Lessons.objects.filter(course=self.course).order_by('sequence_number').values_list('id', flat=True))
+
+    def test_reorder_lessons(self):
+        """
+        Tests the lessons of a course are reordered by a permutation and incomplete permutations are rejected.
+        """
+        order = [self.lessons[3].id, self.lessons[1].id, self.lessons[2].id, self.lessons[0].id]
+        response = self.client.post('/leaders/courses/' + str(self.course.id) + '/lessons/reorder',
+                                    json.dumps({'lesson_ids': order}), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_sequence(), order)
+        response = self.client.post('/leaders/courses/' + str(self.course.id) + '/lessons/reorder',
+                                    json.dumps({'lesson_ids': order[:2]}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.get_sequence(), order)
+
+    def test_move_lesson(self):
+        """
+        Tests a lesson is moved to a new place and places outside the course are rejected.
+        """
+        response = self.client.post('/leaders/courses/' + str(self.course.id) + '/lessons/' +
+                                    str(self.lessons[0].id) + '/move', {'sequence_number': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_sequence(), [self.lessons[1].id, self.lessons[2].id, self.lessons[0].id,
+                                               self.lessons[3].id])
+        response = self.client.post('/leaders/courses/' + str(self.course.id) + '/lessons/' +
+                                    str(self.lessons[0].id) + '/move', {'sequence_number': 5})
+        self.assertEqual(response.status_code, 400)
+
+
+class CoursesLessonsViewTest(TestCase):
+    def setUp(self):
+        """
+        Create a leader with a course of more lessons than fit on a page.
+        """
+        # Manual assignment of primary key.
+        self.test_leader = User.objects.create_user(id=1,
+                                                    username='MrTest', email='test@test.com', password='test')
+        UserRoles.objects.create(user=self.test_leader, role='leader')
+        self.course = Courses.objects.create(author=self.test_leader, title="", description="")
+        Lessons.objects.bulk_create([Lessons(course=self.course, sequence_number=sequence_number, title="",
+                                             description="") for sequence_number in range(lessons_page_size + 1, 0,
+                                                                                          -1)])
+        self.client.login(username='MrTest', password='test')
+
+    def test_lessons_pages(self):
+        """
+        Tests the lessons of a course are listed a page at a time in sequence order.
+        """
+        response = self.client.get('/leaders/courses/' + str(self.course.id))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([lesson.sequence_number for lesson in response.context['lessons']],
+                         list(range(1, lessons_page_size + 1)))
+        self.assertEqual(response.context['next_cursor'], lessons_page_size)
+        response = self.client.get('/leaders/courses/' + str(self.course.id), {'after': lessons_page_size})
+        self.assertEqual([lesson.sequence_number for lesson in response.context['lessons']],
+                         [lessons_page_size + 1])
+        self.assertIsNone(response.context['next_cursor'])
+        # A cursor of 0 is a page of its own rather than the first page.
+        response = self.client.get('/leaders/courses/' + str(self.course.id), {'after': 0})
+        self.assertEqual(response.context['cursor'], 0)
+        self.assertContains(response, 'First page')
+
+
+class CoursesCloneViewTest(TestCase):
+    def setUp(self):
+        """
+        Create a leader with a course of lessons with learning resources, one of which has been built.
+        """
+        # Manual assignment of primary key.
+        self.test_leader = User.objects.create_user(id=1,
+                                                    username='MrTest', email='test@test.com', password='test')
+        UserRoles.objects.create(user=self.test_leader, role='leader')
+        logo = Resources.objects.create(file='18102026logo000000/18102026logo000000.png')
+        self.course = Courses.objects.create(author=self.test_leader, title="Astronomy", description="", logo=logo)
+        learning_style = LearningStyles.objects.create(name="Visual", spectrum_id=2)
+        self.lessons = [Lessons.objects.create(course=self.course, sequence_number=sequence_number,
+                                               title="Lesson " + str(sequence_number), description="")
+                        for sequence_number in range(1, 4)]
+        self.resources = [LessonsLearningStylesResources.objects.create(
+            lesson=lesson, learning_style=learning_style, title="Telescopes", description="",
+            resource=Resources.objects.create(file='18102026resource' + str(i) + '0/18102026resource' + str(i) +
+                                                   '0.zip')) for i, lesson in enumerate(self.lessons)]
+        DockerContainers.objects.filter(resource=self.resources[0]).update(build=False, image_name='18102026resource00')
+        self.client.login(username='MrTest', password='test')
+
+    def test_clone_course(self):
+        """
+        Tests a course is copied with its lessons and learning resources, which share the original files and images.
+        """
+        response = self.client.post('/leaders/courses/' + str(self.course.id) + '/clone', {'title': 'Astronomy 2'})
+        clone = Courses.objects.exclude(id=self.course.id).get()
+        self.assertRedirects(response, '/leaders/courses/' + str(clone.id), fetch_redirect_response=False)
+        self.assertEqual(clone.title, 'Astronomy 2')
+        self.assertEqual(clone.logo.file.name, self.course.logo.file.name)
+        self.assertNotEqual(clone.logo_id, self.course.logo_id)
+        self.assertEqual(list(Lessons.objects.filter(course=clone).order_by('sequence_number').values_list(
+            'sequence_number', 'title')), [(lesson.sequence_number, lesson.title) for lesson in self.lessons])
+        clone_resources = list(LessonsLearningStylesResources.objects.filter(lesson__course=clone).order_by(
+            'lesson__sequence_number'))
+        self.assertEqual([(resource.lesson.sequence_number, resource.resource.file.name)
+                          for resource in clone_resources],
+                         [(resource.lesson.sequence_number, resource.resource.file.name)
+                          for resource in self.resources])
+        containers = [DockerContainers.objects.get(resource=resource) for resource in self.resources]
+        clone_containers = [DockerContainers.objects.get(resource=resource) for resource in clone_resources]
+        # The built resource's copy runs its image, the others are built when first rendered.
+        self.assertEqual([(container.image_name, container.build) for container in clone_containers],
+                         [('18102026resource00', False), ('', True), ('', True)])
+        self.assertEqual(len({container.host_port for container in containers + clone_containers}), 6)
+        self.assertEqual(len({container.unique_name for container in containers + clone_containers}), 6)
+        self.assertEqual(len([result for result in search_index("telescopes") if result['course_id'] == clone.id]),
+                         3)
+
+
+class CoursesImportViewTest(TestCase):
+    def setUp(self):
+        """
+        Create a leader and a learning style (with a temporary media root for the imported files).
+        """
+        # Manual assignment of primary key.
+        self.test_leader = User.objects.create_user(id=1,
+                                                    username='MrTest', email='test@test.com', password='test')
+        UserRoles.objects.create(user=self.test_leader, role='leader')
+        LearningStyles.objects.create(name="Visual", spectrum_id=2)
+        self.directory = tempfile.mkdtemp()
+        self.media_root = override_settings(MEDIA_ROOT=self.directory)
+        self.media_root.enable()
+        self.client.login(username='MrTest', password='test')
+
+    def tearDown(self):
+        self.media_root.disable()
+        shutil.rmtree(self.directory)
+
+    def get_archive(self, resource_files: tuple) -> SimpleUploadedFile:
+        resource = BytesIO()
+        with zipfile.ZipFile(resource, 'w') as resource_zip:
+            for name in resource_files:
+                resource_zip.writestr(name, '<html></html>')
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, 'w') as archive_zip:
+            archive_zip.writestr('manifest.json', json.dumps(
+                {'title': "Astronomy", 'lessons': [{'title': "Telescopes", 'resources': [
+                    {'learning_style': "Visual", 'title': "Lenses", 'file': 'visual.zip'}]}]}))
+            archive_zip.writestr('visual.zip', resource.getvalue())
+        return SimpleUploadedFile('course.zip', archive.getvalue(), content_type='application/zip')
+
+    def test_import_course(self):
+        """
+        Tests an uploaded archive is imported for the leader and can be found by searching.
+        """
+        response = self.client.post('/leaders/courses/import', {'archive': self.get_archive(('index.html',))})
+        course = Courses.objects.get()
+        self.assertRedirects(response, '/leaders/courses/' + str(course.id), fetch_redirect_response=False)
+        self.assertEqual(course.author, self.test_leader)
+        resource = LessonsLearningStylesResources.objects.get(lesson__course=course)
+        self.assertTrue(os.path.isfile(resource.resource.file.path))
+        self.assertTrue(DockerContainers.objects.get(resource=resource).build)
+        self.assertEqual([result['document'] for result in search_index("lenses")], ['resource'])
+
+    def test_import_invalid_course(self):
+        """
+        Tests an invalid archive is reported on the form and nothing is imported.
+        """
+        response = self.client.post('/leaders/courses/import', {'archive': self.get_archive(('page.html',))})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('visual.zip', str(response.context['courses_import_form'].errors['archive']))
+        self.assertFalse(Courses.objects.exists())
+
+
+@skipIf(numpy is None, "Scoring the questionnaire requires numpy.")
+class LearningStylesQuestionnaireImportViewTest(TestCase):
+    def setUp(self):
+        """
+        Create a leader, a student with some progress and the learning styles of the questionnaire.
+        """
+        # Manual assignment of primary key.
+        self.test_leader = User.objects.create_user(id=1,
+                                                    username='MrTest', email='test@test.com', password='test')
+        UserRoles.objects.create(user=self.test_leader, role='leader')
+        self.test_student = User.objects.create_user(id=2,
+                                                     username='MrStudent', email='student@test.com', password='test')
+        for spectrum_id, names in enumerate((("Active", "Reflective"), ("Sequential", "Global"),
+                                             ("Visual", "Verbal"), ("Sensing", "Intuitive"))):
+            for name in names:
+                LearningStyles.objects.create(name=name, spectrum_id=spectrum_id)
+        course = Courses.objects.create(title="Astronomy", author=self.test_leader)
+        lesson = Lessons.objects.create(title="Telescopes", course=course, sequence_number=1)
+        UserLessonsCompleted.objects.create(user=self.test_student, lesson=lesson)
+        self.client.login(username='MrTest', password='test')
+
+    def get_responses(self, answer: str, username: str = 'MrStudent') -> SimpleUploadedFile:
+        return SimpleUploadedFile('responses.csv', (username + ',' + ','.join([answer] * QUESTIONNAIRE_ITEMS)).encode(),
+                                  content_type='text/csv')
+
+    def test_import_questionnaire_responses(self):
+        """
+        Tests the uploaded responses replace the student's learning styles and purge their progress when asked.
+        """
+        response = self.client.post('/leaders/learning_styles/import', {'responses': self.get_responses('b'),
+                                                                         'purge_progress': True})
+        self.assertRedirects(response, '/leaders', fetch_redirect_response=False)
+        self.assertEqual(set(UserLearningStyles.objects.filter(user=self.test_student)
+                             .values_list('learning_style__name', flat=True)),
+                         {"Reflective", "Global", "Verbal", "Intuitive"})
+        self.assertFalse(UserLessonsCompleted.objects.filter(user=self.test_student).exists())
+
+    def test_import_questionnaire_responses_keeps_progress(self):
+        """
+        Tests the student's progress is kept unless its deletion is asked for.
+        """
+        response = self.client.post('/leaders/learning_styles/import', {'responses': self.get_responses('b')})
+        self.assertRedirects(response, '/leaders', fetch_redirect_response=False)
+        self.assertEqual(UserLearningStyles.objects.filter(user=self.test_student).count(), 4)
+        self.assertTrue(UserLessonsCompleted.objects.filter(user=self.test_student).exists())
+
+    def test_import_new_student_responses(self):
+        """
+        Tests the responses of a new student, who has not yet taken a lesson, are imported.
+        """
+        new_student = User.objects.create_user(id=3, username='MrNew', email='new@test.com', password='test')
+        response = self.client.post('/leaders/learning_styles/import', {'responses': self.get_responses('b', 'MrNew')})
+        self.assertRedirects(response, '/leaders', fetch_redirect_response=False)
+        self.assertEqual(UserLearningStyles.objects.filter(user=new_student).count(), 4)
+
+    def test_import_leaders_responses(self):
+        """
+        Tests the responses of a user who is not a student (another leader) are rejected and no learning styles are
+        changed.
+        """
+        other_leader = User.objects.create_user(id=3, username='MrOther', email='other@test.com', password='test')
+        UserRoles.objects.create(user=other_leader, role='leader')
+        response = self.client.post('/leaders/learning_styles/import', {'responses': self.get_responses('b', 'MrOther'),
+                                                                         'purge_progress': True})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('MrOther', str(response.context['questionnaire_import_form'].errors['responses']))
+        self.assertFalse(UserLearningStyles.objects.exists())
+
+    def test_import_invalid_questionnaire_responses(self):
+        """
+        Tests invalid responses are reported on the form and no learning styles are changed.
+        """
+        response = self.client.post('/leaders/learning_styles/import', {'responses': self.get_responses('c')})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('rows 1', str(response.context['questionnaire_import_form'].errors['responses']))
+        self.assertFalse(UserLearningStyles.objects.exists())
+        self.assertTrue(UserLessonsCompleted.objects.filter(user=self.test_student).exists())
@@ -15,6 +15,10 @@ urlpatterns = [
 
                   url(r'^leaders/courses/create/?$', views.CoursesCreateView.as_view(),
                       name="courses_create"),
+                  url(r'^leaders/courses/import/?$', views.CoursesImportView.as_view(),
+                      name="courses_import"),
+                  url(r'^leaders/learning_styles/import/?$', views.LearningStylesQuestionnaireImportView.as_view(),
+                      name="learning_styles_questionnaire_import"),
                   url(r'^leaders/courses/delete/?$', views.CoursesDeleteView.as_view(),
                       name="courses_delete"),
 
@@ -22,12 +26,17 @@ urlpatterns = [
                       name='courses_lessons'),
                   url(r'^leaders/courses/(?P<course_id>[0-9]+)/edit/?$', views.CoursesEditView.as_view(),
                       name='courses_edit'),
+                  url(r'^leaders/courses/(?P<course_id>[0-9]+)/clone/?$', views.CoursesCloneView.as_view(),
+                      name='courses_clone'),
                   url(r'^leaders/courses/(?P<course_id>[0-9]+)/lesson/create/?$', views.LessonCreateView.as_view(),
                       name='lesson_create'),
 
                   url(r'^leaders/courses/(?P<course_id>[0-9]+)/lessons/delete/?$', views.LessonsDeleteView.as_view(),
                       name='lessons_delete'),
 
+                  url(r'^leaders/courses/(?P<course_id>[0-9]+)/lessons/reorder/?$', views.LessonsReorderView.as_view(),
+                      name='lessons_reorder'),
+
                   url(r'^leaders/courses/(?P<course_id>[0-9]+)/lessons/(?P<lesson_id>[0-9]+)/?$',
                       views.LessonsResourcesView.as_view(),
                       name='lessons_resources'),
@@ -36,6 +45,10 @@ urlpatterns = [
                       views.LessonsEditView.as_view(),
                       name='lessons_edit'),
 
+                  url(r'^leaders/courses/(?P<course_id>[0-9]+)/lessons/(?P<lesson_id>[0-9]+)/move/?$',
+                      views.LessonsMoveView.as_view(),
+                      name='lessons_move'),
+
                   url(r'^leaders/courses/(?P<course_id>[0-9]+)/lessons/(?P<lesson_id>[0-9]+)/resources/create/?$',
                       views.LessonsResourceCreateView.as_view(),
                       name='lessons_resources_create'),
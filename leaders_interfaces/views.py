@@ -1,22 +1,31 @@
+import json
+
 from django.contrib import messages
+from django.http import JsonResponse
 from django.shortcuts import render, redirect
 from django.views import View
 
-from communicate.exceptions.courses_exceptions import CourseNotFoundException
+from bark.pagination import get_page_cursor
+from communicate.exceptions.courses_exceptions import CourseNotFoundException, InvalidCourseArchiveException
 from communicate.exceptions.learning_resources_exceptions import LearningResourceNotFoundException
-from communicate.exceptions.lessons_exceptions import LessonNotFoundException
+from communicate.exceptions.learning_styles_exceptions import InvalidQuestionnaireResponsesException
+from communicate.exceptions.lessons_exceptions import LessonNotFoundException, InvalidLessonSequenceException
 from communicate.leaders import get_leaders_course, remove_courses_list, \
     remove_lessons_list, \
     remove_learning_resources_list, get_leaders_learning_resource, get_leaders_lesson, \
-    get_maximum_lesson_sequence_number
-from courses.forms import CoursesCreateForm, CoursesEditForm, LessonsCreateForm, LessonsEditForm
+    get_maximum_lesson_sequence_number, move_leaders_lesson, reorder_leaders_lessons, get_leaders_courses_page, \
+    get_leaders_course_lessons_page, clone_leaders_course, import_leaders_course, \
+    import_leaders_questionnaire_responses
+from courses.forms import CoursesCreateForm, CoursesEditForm, CoursesImportForm, LessonsCreateForm, LessonsEditForm
 from courses.forms import LessonsLearningStylesResourcesCreateForm, LessonsLearningStylesResourcesEditForm
+from learning_styles.forms import LearningStylesQuestionnaireImportForm
 
 # Static Templates #
 # Courses Goals #
 courses_template = 'leaders/courses.html'
 courses_delete_template = 'leaders/courses_delete.html'
 courses_create_template = 'leaders/courses_create.html'
+courses_import_template = 'leaders/courses_import.html'
 courses_edit_template = 'leaders/courses_edit.html'
 courses_lessons_template = 'leaders/courses_lessons.html'
 # Lessons Goals
@@ -28,6 +37,11 @@ lessons_resources_template = 'leaders/lessons_resources.html'
 lessons_resources_create_template = 'leaders/resources_create.html'
 resources_delete_template = 'leaders/resources_delete.html'
 lessons_resources_edit_template = 'leaders/resources_edit.html'
+# Learning styles goals #
+learning_styles_questionnaire_import_template = 'leaders/learning_styles_questionnaire_import.html'
+# Page sizes #
+courses_page_size = 50
+lessons_page_size = 100
 
 
 # Views #
@@ -47,15 +61,16 @@ class CoursesView(View):
         # Validation
         # Get the user object.
         leader = request.user
-        # Get all the courses objects associated with the user objects.
-        courses = leader.courses.all()
+        # Get a page of the courses objects associated with the user objects.
+        after = get_page_cursor(request)
+        courses, next_cursor = get_leaders_courses_page(leader, after=after, page_size=courses_page_size)
         # If there are no lessons pass a message.
-        if not courses:
+        if not courses and after is None:
             messages.error(request,
                            'It looks like there are no courses for us to display (^・x・^). Please populate '
                            'courses so students have something to see!')
 
-        return render(request, courses_template, {'courses': courses})
+        return render(request, courses_template, {'courses': courses, 'cursor': after, 'next_cursor': next_cursor})
 
 
 class CoursesDeleteView(View):
@@ -173,12 +188,110 @@ class CoursesLessonsView(View):
                            'An error has occurred (^・x・^). We cannot find the course you asked for! Sorry about that.')
             return redirect("leaders_interfaces:courses")
 
-        # Render the courses_lessons_template with the course object specified.
+        # Render the courses_lessons_template with the course object specified and a page of its lessons.
+        after = get_page_cursor(request)
+        lessons, next_cursor = get_leaders_course_lessons_page(course, after=after, page_size=lessons_page_size)
         return render(request, courses_lessons_template,
                       {'course': course,
+                       'lessons': lessons,
+                       'cursor': after,
+                       'next_cursor': next_cursor,
                        })
 
 
+class CoursesImportView(View):
+    """
+    The Courses Import View is responsible for providing an interface which allows users to create a course along with
+    its lessons and learning resources by uploading a single course archive. This is facilitated by rendering the
+    courses_import_template specified.
+    """
+
+    def get(self, request):
+        """
+        The get method of the leaders courses import view is responsible for providing the user interface to HTTP get
+        requests to import courses.
+        """
+        return render(request, courses_import_template, {'courses_import_form': CoursesImportForm()})
+
+    def post(self, request):
+        """
+        The post method of the leaders courses import view imports the uploaded archive and redirects to the new
+        course. An invalid archive is reported on the form (and nothing is created).
+        """
+        leader = request.user
+        import_form = CoursesImportForm(request.POST, request.FILES)
+        if import_form.is_valid():
+            try:
+                course = import_leaders_course(leader, import_form.cleaned_data['archive'])
+            except InvalidCourseArchiveException as e:
+                import_form.add_error('archive', str(e))
+            else:
+                messages.success(request, 'The course has been imported, its learning resources are being built.')
+                return redirect("leaders_interfaces:courses_lessons", course.id)
+        return render(request, courses_import_template, {'courses_import_form': import_form})
+
+
+class LearningStylesQuestionnaireImportView(View):
+    """
+    The Learning Styles Questionnaire Import View is responsible for providing an interface which allows users to
+    assign the learning styles of a cohort of students by uploading their responses to the learning styles
+    questionnaire. This is facilitated by rendering the learning_styles_questionnaire_import_template specified.
+    """
+
+    def get(self, request):
+        """
+        The get method of the leaders learning styles questionnaire import view is responsible for providing the user
+        interface to HTTP get requests to import questionnaire responses.
+        """
+        return render(request, learning_styles_questionnaire_import_template,
+                      {'questionnaire_import_form': LearningStylesQuestionnaireImportForm()})
+
+    def post(self, request):
+        """
+        The post method of the leaders learning styles questionnaire import view scores the uploaded responses and
+        redirects to the courses. Invalid responses are reported on the form (and no learning styles are changed).
+        """
+        import_form = LearningStylesQuestionnaireImportForm(request.POST, request.FILES)
+        if import_form.is_valid():
+            try:
+                scored, changed = import_leaders_questionnaire_responses(
+                    request.user, import_form.cleaned_data['responses'],
+                    purge_progress=import_form.cleaned_data['purge_progress'])
+            except InvalidQuestionnaireResponsesException as e:
+                import_form.add_error('responses', str(e))
+            else:
+                messages.success(request, str(scored) + ' responses have been scored, the learning styles of ' +
+                                 str(changed) + ' students have changed.')
+                return redirect("leaders_interfaces:courses")
+        return render(request, learning_styles_questionnaire_import_template,
+                      {'questionnaire_import_form': import_form})
+
+
+class CoursesCloneView(View):
+    """
+    The Courses Clone View is responsible for copying a course (e.g. for a new term) along with its lessons and
+    learning resources. The copy shares the course's uploaded resources rather than requiring them to be uploaded again.
+    """
+
+    def post(self, request, course_id):
+        """
+        The post method of the courses clone view copies the course and redirects to the copy. The title of the copy
+        may be passed as "title", otherwise the copy is titled after the course.
+        """
+        # Validation
+        leader = request.user
+        try:
+            course = get_leaders_course(course_id, leader)
+        except CourseNotFoundException:
+            messages.error(request,
+                           'An error has occurred (^・x・^). We cannot find the course you asked for! Sorry about that.')
+            return redirect("leaders_interfaces:courses")
+        title = request.POST.get('title', '').strip() or (course.title + " (Copy)")
+        clone = clone_leaders_course(course, title=title[:100])
+        messages.success(request, 'The course has been copied.')
+        return redirect("leaders_interfaces:courses_lessons", clone.id)
+
+
 class CoursesEditView(View):
     """
     The Courses Edit View is responsible for providing an interface which allows users to create new
@@ -462,6 +575,63 @@ class LessonsEditView(View):
                               , 'lesson': lesson})
 
 
+class LessonsReorderView(View):
+    """
+    The Lessons Reorder View is responsible for reordering every lesson of a course at once. The ids of all of the
+    course's lessons are sent in their new order as a JSON body {"lesson_ids": [...]} or as repeated lesson_ids form
+    fields, and the outcome is returned as JSON. The lessons are reordered in a single transaction.
+    """
+
+    def post(self, request, course_id):
+        leader = request.user
+        try:
+            course = get_leaders_course(course_id, leader)
+        except CourseNotFoundException:
+            return JsonResponse({'error': 'The course does not exist.'}, status=404)
+        try:
+            if request.content_type == 'application/json':
+                lesson_ids = json.loads(request.body.decode('utf-8'))['lesson_ids']
+            else:
+                lesson_ids = request.POST.getlist('lesson_ids')
+            reorder_leaders_lessons(course, lesson_ids)
+        except (ValueError, TypeError, KeyError):
+            return JsonResponse({'error': 'Expected a list of lesson ids.'}, status=400)
+        except InvalidLessonSequenceException:
+            return JsonResponse({'error': 'Expected the ids of every lesson of the course exactly once.'}, status=400)
+        return JsonResponse({'lesson_ids': list(course.lessons_set.order_by('sequence_number').values_list(
+            'id', flat=True))})
+
+
+class LessonsMoveView(View):
+    """
+    The Lessons Move View is responsible for moving a single lesson to a new place in its course, shifting the lessons
+    in between. The new place is sent as a JSON body {"sequence_number": n} or as a sequence_number form field, and the
+    outcome is returned as JSON.
+    """
+
+    def post(self, request, course_id, lesson_id):
+        leader = request.user
+        try:
+            course = get_leaders_course(course_id, leader)
+            lesson = get_leaders_lesson(lesson_id, course, leader)
+        except CourseNotFoundException:
+            return JsonResponse({'error': 'The course does not exist.'}, status=404)
+        except LessonNotFoundException:
+            return JsonResponse({'error': 'The lesson does not exist in the course.'}, status=404)
+        try:
+            if request.content_type == 'application/json':
+                sequence_number = json.loads(request.body.decode('utf-8'))['sequence_number']
+            else:
+                sequence_number = request.POST['sequence_number']
+            move_leaders_lesson(lesson, sequence_number)
+        except (ValueError, TypeError, KeyError):
+            return JsonResponse({'error': 'Expected a sequence number.'}, status=400)
+        except InvalidLessonSequenceException:
+            return JsonResponse({'error': 'The sequence number is outside the course.'}, status=400)
+        return JsonResponse({'lesson_ids': list(course.lessons_set.order_by('sequence_number').values_list(
+            'id', flat=True))})
+
+
 class LessonsResourcesView(View):
     """
     The  Lessons Resources View is responsible for providing an interface which allows users to view existing
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class LearningStylesConfig(AppConfig):
     name = 'learning_styles'
+
+    def ready(self):
+        import learning_styles.signals
@@ -11,7 +11,30 @@ from django import forms
 from django.contrib.auth.models import User
 from django.forms import ModelForm
 
-from learning_styles.models import LearningStyles
+from learning_styles.manage.learningstyles import get_all_learning_styles, get_spectrum_learning_styles, \
+    get_learning_style
+
+
+class LearningStyleChoiceField(forms.TypedChoiceField):
+    """
+    A choice of learning style (of a spectrum, or of every learning style) whose choices are read from the cached
+    learning styles (see learning_styles.manage.learningstyles) rather than queried for every form. The cleaned value
+    is the LearningStyles object chosen.
+    """
+
+    def __init__(self, spectrum_id: int = None, **kwargs):
+        self.spectrum_id = spectrum_id
+        super().__init__(coerce=lambda value: get_learning_style(int(value)), **kwargs)
+
+    def refresh_choices(self):
+        """
+        Reads the choices from the cached learning styles, called as each form is constructed.
+        """
+        if self.spectrum_id is None:
+            learning_styles = get_all_learning_styles()
+        else:
+            learning_styles = get_spectrum_learning_styles(self.spectrum_id)
+        self.choices = [(learning_style.id, learning_style.name) for learning_style in learning_styles]
 
 
 class LearningStylesConfigurationForm(ModelForm):
@@ -20,29 +43,25 @@ class LearningStylesConfigurationForm(ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # Construct the form with empty labels. Labels are determined by the database and not the fields.
-        self.fields['active_reflective'].label = ""
-        self.fields['visual_verbal'].label = ""
-        self.fields['sensing_intuitive'].label = ""
-        self.fields['sequential_global'].label = ""
-
-    active_reflective = forms.ModelChoiceField(
-        queryset=LearningStyles.objects.filter(spectrum_id__exact=0),
-        widget=forms.RadioSelect,
-        required=True, initial=0)
-    sequential_global = forms.ModelChoiceField(
-        queryset=LearningStyles.objects.filter(spectrum_id__exact=1),
-        widget=forms.RadioSelect,
-        required=True, initial=0)
-    visual_verbal = forms.ModelChoiceField(
-        queryset=LearningStyles.objects.filter(spectrum_id__exact=2),
-        widget=forms.RadioSelect,
-        required=True, initial=0)
-    sensing_intuitive = forms.ModelChoiceField(
-        queryset=LearningStyles.objects.filter(spectrum_id__exact=3),
-        widget=forms.RadioSelect,
-        required=True, initial=0)
+        for field in ('active_reflective', 'visual_verbal', 'sensing_intuitive', 'sequential_global'):
+            self.fields[field].label = ""
+            self.fields[field].refresh_choices()
+
+    active_reflective = LearningStyleChoiceField(spectrum_id=0, widget=forms.RadioSelect, required=True)
+    sequential_global = LearningStyleChoiceField(spectrum_id=1, widget=forms.RadioSelect, required=True)
+    visual_verbal = LearningStyleChoiceField(spectrum_id=2, widget=forms.RadioSelect, required=True)
+    sensing_intuitive = LearningStyleChoiceField(spectrum_id=3, widget=forms.RadioSelect, required=True)
 
     class Meta:
         model = User
         # Registration of each of the Felder-Silverman Learning Styles on the form
         fields = ('active_reflective', 'visual_verbal', 'sensing_intuitive', 'sequential_global')
+
+
+class LearningStylesQuestionnaireImportForm(forms.Form):
+    responses = forms.FileField(label='Please specify a CSV file of usernames and their answers to the questionnaire',
+                                required=True,
+                                )
+    purge_progress = forms.BooleanField(label='Delete the progress of the students whose learning styles change',
+                                        required=False,
+                                        )
@@ -0,0 +1,165 @@
+"""LearningStyles provides an interface of subroutines for the reference data of learning styles, which almost never
+changes but is read by every settings form and many pages. Operations in this module refer to operations which are
+performable on the learning styles themselves (rather than the learning styles of users).
+
+Each learning style is assigned a signature bit when it is created, so a set of learning styles (such as a user's) is
+summarised as a signature, the bitmask of their bits. A signature holds at most MAXIMUM_SIGNATURE_BITS learning styles
+(so it fits a signed 64 bit column), learning styles created beyond that have no bit and are in no signature.
+
+Learning styles are held in a process-wide cache, read in a single query on first use and read again whenever their
+version (a counter in the Django cache, see bark.cacheversions) is bumped by the signals in learning_styles.signals as
+a learning style is saved or deleted, or after REFERENCE_DATA_TIMEOUT seconds. Only the processes which share the
+Django cache see a bumped version, others (such as those of a local memory cache) see the change once their learning
+styles time out. Learning styles read inside a transaction are not cached, as the transaction may yet be rolled back.
+"""
+
+import time
+from collections import OrderedDict, Iterable
+
+from django.db import connection, transaction
+
+from bark.cacheversions import get_cache_version, bump_cache_version, is_reference_data_current
+from learning_styles.models import LearningStyles
+
+__version__ = '1.0'
+__author__ = 'Callum Dempsey Leach'
+
+LEARNING_STYLES_VERSION_KEY = 'learning_styles_reference_version'
+# The number of bits of a learning style signature.
+MAXIMUM_SIGNATURE_BITS = 63
+
+# The version, time read and learning styles cached by the process, replaced (never changed) as a whole so threads
+# reading them at once need no lock.
+reference_learning_styles = (None, None, None)
+
+
+def load_learning_styles() -> dict:
+    """
+    Reads every learning style in a single query.
+
+    :return: Returns a dictionary of 'by_id' (an ordered dictionary of ids to LearningStyles objects in id order) and
+    'by_spectrum' (a dictionary of spectrum ids to lists of LearningStyles objects in id order).
+    """
+    by_id = OrderedDict((learning_style.id, learning_style) for learning_style in
+                        LearningStyles.objects.order_by('id'))
+    by_spectrum = {}
+    for learning_style in by_id.values():
+        by_spectrum.setdefault(learning_style.spectrum_id, []).append(learning_style)
+    return {'by_id': by_id, 'by_spectrum': by_spectrum}
+
+
+def get_reference_learning_styles() -> dict:
+    """
+    Returns every learning style from the process-wide cache, reading them if they are not cached, have changed or
+    have timed out.
+
+    :return: Returns the learning styles as the dictionary returned by load_learning_styles().
+    """
+    global reference_learning_styles
+    if connection.in_atomic_block:
+        return load_learning_styles()
+    version = get_cache_version(LEARNING_STYLES_VERSION_KEY)
+    cached_version, loaded_at, learning_styles = reference_learning_styles
+    if not is_reference_data_current(cached_version, loaded_at, version):
+        learning_styles = load_learning_styles()
+        reference_learning_styles = (version, time.monotonic(), learning_styles)
+    return learning_styles
+
+
+def get_all_learning_styles() -> list:
+    """
+    Returns every learning style.
+
+    :return: Returns a list of the LearningStyles objects in id order.
+    """
+    return list(get_reference_learning_styles()['by_id'].values())
+
+
+def get_spectrum_learning_styles(spectrum_id: int) -> list:
+    """
+    Returns the learning styles of a spectrum.
+
+    :param spectrum_id: The id of the spectrum.
+    :return: Returns a list of the LearningStyles objects in id order (empty if the spectrum has none).
+    """
+    return list(get_reference_learning_styles()['by_spectrum'].get(spectrum_id, []))
+
+
+def get_learning_style(learning_style_id: int) -> LearningStyles:
+    """
+    Returns a learning style by its id.
+
+    :param learning_style_id: The id of the learning style.
+    :return: Returns the LearningStyles object, or None if it does not exist.
+    """
+    return get_reference_learning_styles()['by_id'].get(learning_style_id)
+
+
+def invalidate_learning_styles() -> None:
+    """
+    Invalidates the cached learning styles when one is changed and again once the change commits, so learning styles
+    read before the change commits are not cached under the current version.
+    """
+    bump_cache_version(LEARNING_STYLES_VERSION_KEY)
+    transaction.on_commit(lambda: bump_cache_version(LEARNING_STYLES_VERSION_KEY))
+
+
+def allocate_signature_bit() -> int:
+    """
+    Returns the lowest signature bit not assigned to a learning style, for a new learning style.
+
+    :return: Returns the position of the bit, or None if every bit is assigned.
+    """
+    assigned = set(LearningStyles.objects.exclude(signature_bit=None).values_list('signature_bit', flat=True))
+    return next((bit for bit in range(MAXIMUM_SIGNATURE_BITS) if bit not in assigned), None)
+
+
+def read_learning_style_bits(learning_style_ids: Iterable) -> dict:
+    """
+    Reads the bits of learning styles in learning style signatures from the database rather than the process-wide
+    cache (which may be stale), for bits which are stored.
+
+    :param learning_style_ids: The ids of the learning styles.
+    :return: Returns a dictionary of the ids of the learning styles with a bit to their bits.
+    """
+    return {learning_style_id: 1 << signature_bit
+            for learning_style_id, signature_bit in LearningStyles.objects.filter(id__in=set(learning_style_ids))
+            .exclude(signature_bit=None).values_list('id', 'signature_bit')}
+
+
+def get_learning_style_bit(learning_style_id: int) -> int:
+    """
+    Reads the bit of a learning style in learning style signatures from the database, for a bit which is stored.
+
+    :param learning_style_id: The id of the learning style.
+    :return: Returns the bit as an integer (0 if the learning style does not exist or has no bit).
+    """
+    return read_learning_style_bits([learning_style_id]).get(learning_style_id, 0)
+
+
+def get_learning_style_bits() -> dict:
+    """
+    Returns the bit of every learning style with one in learning style signatures.
+
+    :return: Returns a dictionary of learning style ids to their bits.
+    """
+    return {learning_style.id: 1 << learning_style.signature_bit
+            for learning_style in get_reference_learning_styles()['by_id'].values()
+            if learning_style.signature_bit is not None}
+
+
+def get_learning_style_ids_signature(learning_style_ids: Iterable, learning_style_bits: dict = None) -> int:
+    """
+    Returns the signature of a set of learning styles.
+
+    :param learning_style_ids: The ids of the learning styles.
+    :param learning_style_bits: The bits of the learning styles returned by get_learning_style_bits(), read if not
+    provided (pass them when computing many signatures at once).
+    :return: Returns the bitmask of the learning styles' bits as an integer.
+    """
+    if learning_style_bits is None:
+        learning_style_bits = get_learning_style_bits()
+    signature = 0
+    for learning_style_id in learning_style_ids:
+        signature = signature | learning_style_bits.get(learning_style_id, 0)
+    return signature
@@ -0,0 +1,215 @@
+"""Questionnaire provides an interface of subroutines for scoring the Index of Learning Styles (ILS), the 44 item
+questionnaire of the Felder-Silverman model, for whole cohorts of students at once. Operations in this module refer to
+operations which are performable on questionnaire responses or are within reason to do with the domain of assessing
+learning styles.
+
+The text of the questionnaire is not part of the application (it belongs to its authors), students answer it elsewhere
+and each of its items is answered 'a' or 'b'. Item n (counting from 1) measures dimension (n - 1) % 4 of
+QUESTIONNAIRE_DIMENSIONS, so each dimension is measured by 11 items. A dimension's score is the number of its items
+answered 'a' less the number answered 'b', an odd number from -11 to 11, and the student holds the learning style of
+the dimension answered by 'a' if it is positive (otherwise the learning style answered by 'b').
+
+Responses are scored as a matrix: each response is encoded as a row of 1 ('a') and -1 ('b') and multiplied by a matrix
+of the dimension each item measures, so a cohort is scored in a single matrix product. Scoring requires numpy, which
+is imported when responses are scored (so the rest of the application runs without it).
+
+Cohorts are read from CSV files of a username followed by the answers to the 44 items on each row (in item order):
+
+    username,1,2,3,...,44
+    ada,a,b,a,...,b
+
+The header row is optional (a row whose first cell is 'username' is skipped).
+"""
+
+import csv
+import io
+from typing import TYPE_CHECKING
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+
+from learning_styles.manage.learningstyles import get_all_learning_styles
+from learning_styles.manage.userlearningstyles import BATCH_SIZE
+
+if TYPE_CHECKING:
+    import numpy
+
+__version__ = '1.0'
+__author__ = 'Callum Dempsey Leach'
+
+QUESTIONNAIRE_ITEMS = 44
+# The dimensions in the order their items repeat, as (spectrum id, learning style answered by 'a', learning style
+# answered by 'b') with learning styles referred to by name.
+QUESTIONNAIRE_DIMENSIONS = ((0, "Active", "Reflective"),
+                            (3, "Sensing", "Intuitive"),
+                            (2, "Visual", "Verbal"),
+                            (1, "Sequential", "Global"))
+# The most students read from a single file.
+MAXIMUM_COHORT_SIZE = 20000
+# The most invalid rows reported at once.
+MAXIMUM_REPORTED_ERRORS = 10
+
+
+def import_numpy():
+    """
+    Imports numpy, which only scoring the questionnaire requires.
+
+    :return: Returns the numpy module.
+    :raises: Raises a ValidationError if numpy is not installed.
+    """
+    try:
+        import numpy
+    except ImportError:
+        raise ValidationError("Scoring the questionnaire requires numpy, which is not installed.")
+    return numpy
+
+
+def get_questionnaire_dimension_matrix() -> 'numpy.ndarray':
+    """
+    Returns the matrix of the dimension each item of the questionnaire measures.
+
+    :return: Returns a (QUESTIONNAIRE_ITEMS, number of dimensions) array of 1 where an item measures a dimension and 0
+    elsewhere.
+    """
+    numpy = import_numpy()
+    dimensions = len(QUESTIONNAIRE_DIMENSIONS)
+    matrix = numpy.zeros((QUESTIONNAIRE_ITEMS, dimensions), dtype=numpy.int16)
+    matrix[numpy.arange(QUESTIONNAIRE_ITEMS), numpy.arange(QUESTIONNAIRE_ITEMS) % dimensions] = 1
+    return matrix
+
+
+def encode_questionnaire_answers(answers: list) -> 'numpy.ndarray':
+    """
+    Encodes the answers of many students to the questionnaire.
+
+    :param answers: A list of lists of the answers ('a' or 'b', in any case and spacing) of each student in item
+    order.
+    :return: Returns a (students, QUESTIONNAIRE_ITEMS) array of 1 for 'a', -1 for 'b' and 0 for an invalid answer.
+    :raises: Raises a ValidationError if a student did not answer every item (or numpy is not installed).
+    """
+    numpy = import_numpy()
+    if not answers:
+        return numpy.zeros((0, QUESTIONNAIRE_ITEMS), dtype=numpy.int16)
+    for i, student_answers in enumerate(answers):
+        if len(student_answers) != QUESTIONNAIRE_ITEMS:
+            raise ValidationError("Response " + str(i + 1) + " has " + str(len(student_answers)) +
+                                  " answers rather than " + str(QUESTIONNAIRE_ITEMS) + ".")
+    answers = numpy.char.lower(numpy.char.strip(numpy.array(answers, dtype=str)))
+    return (answers == 'a').astype(numpy.int16) - (answers == 'b').astype(numpy.int16)
+
+
+def score_questionnaire_responses(responses: 'numpy.ndarray') -> 'numpy.ndarray':
+    """
+    Scores the encoded responses of many students to the questionnaire in a single matrix product.
+
+    :param responses: The array returned by encode_questionnaire_answers().
+    :return: Returns a (students, number of dimensions) array of the score of each student on each dimension.
+    """
+    return responses.dot(get_questionnaire_dimension_matrix())
+
+
+def get_questionnaire_learning_styles() -> list:
+    """
+    Returns the learning styles each dimension of the questionnaire places students in.
+
+    :return: Returns a list of (LearningStyles object answered by 'a', LearningStyles object answered by 'b') tuples
+    in the order of QUESTIONNAIRE_DIMENSIONS.
+    :raises: Raises a ValidationError if a learning style does not exist.
+    """
+    learning_styles = {(learning_style.spectrum_id, learning_style.name): learning_style
+                       for learning_style in get_all_learning_styles()}
+    dimensions = []
+    for spectrum_id, a_name, b_name in QUESTIONNAIRE_DIMENSIONS:
+        for name in (a_name, b_name):
+            if (spectrum_id, name) not in learning_styles:
+                raise ValidationError("The learning style '" + name + "' does not exist.")
+        dimensions.append((learning_styles[(spectrum_id, a_name)], learning_styles[(spectrum_id, b_name)]))
+    return dimensions
+
+
+def get_scores_learning_styles(scores: 'numpy.ndarray') -> list:
+    """
+    Places students in learning styles by their scores.
+
+    :param scores: The array returned by score_questionnaire_responses().
+    :return: Returns a list of lists of the LearningStyles objects of each student (one per dimension).
+    :raises: Raises a ValidationError if a learning style does not exist.
+    """
+    numpy = import_numpy()
+    dimensions = get_questionnaire_learning_styles()
+    choices = numpy.array(dimensions, dtype=object)
+    # The index of each student's learning style in each dimension's (a, b) pair, 0 where the score is positive.
+    chosen = (scores <= 0).astype(numpy.intp)
+    return choices[numpy.arange(len(dimensions)), chosen].tolist()
+
+
+def read_questionnaire_responses_csv(csv_file) -> tuple:
+    """
+    Reads and validates a CSV file of the responses of a cohort of students.
+
+    :param csv_file: The file, opened in binary or text mode.
+    :return: Returns a tuple of the list of usernames and the array of their encoded responses (see
+    encode_questionnaire_answers()).
+    :raises: Raises a ValidationError describing the first invalid rows if any row is invalid, a username is repeated
+    or the file holds no responses.
+    """
+    try:
+        text = csv_file.read()
+        if isinstance(text, bytes):
+            text = text.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise ValidationError("Please upload a CSV file encoded as UTF-8.")
+    usernames, answers = [], []
+    for row in csv.reader(io.StringIO(text)):
+        if not row or (not usernames and row[0].strip().lower() == 'username'):
+            continue
+        if len(row) != QUESTIONNAIRE_ITEMS + 1:
+            raise ValidationError("Row " + str(len(usernames) + 1) + " has " + str(len(row) - 1) +
+                                  " answers rather than " + str(QUESTIONNAIRE_ITEMS) + ".")
+        usernames.append(row[0].strip())
+        answers.append(row[1:])
+        if len(usernames) > MAXIMUM_COHORT_SIZE:
+            raise ValidationError("Please upload at most " + str(MAXIMUM_COHORT_SIZE) + " responses at once.")
+    if not usernames:
+        raise ValidationError("The file does not contain any responses.")
+    if len(set(usernames)) != len(usernames):
+        raise ValidationError("Each student may only have one response.")
+    responses = encode_questionnaire_answers(answers)
+    invalid_rows = import_numpy().flatnonzero((responses == 0).any(axis=1))
+    if len(invalid_rows):
+        raise ValidationError("Every answer must be 'a' or 'b' (see rows " +
+                              ", ".join(str(row + 1) for row in invalid_rows[:MAXIMUM_REPORTED_ERRORS]) + ").")
+    return usernames, responses
+
+
+def get_questionnaire_students(usernames: list) -> list:
+    """
+    Reads the students who answered the questionnaire, in batches.
+
+    :param usernames: The usernames of the students.
+    :return: Returns a list of the User objects in the order of their usernames.
+    :raises: Raises a ValidationError listing the first usernames of students who do not exist.
+    """
+    students = {}
+    for i in range(0, len(usernames), BATCH_SIZE):
+        students.update((student.username, student)
+                        for student in User.objects.filter(username__in=usernames[i:i + BATCH_SIZE]))
+    unknown = [username for username in usernames if username not in students]
+    if unknown:
+        raise ValidationError("The following students do not exist: " +
+                              ", ".join(unknown[:MAXIMUM_REPORTED_ERRORS]) + ".")
+    return [students[username] for username in usernames]
+
+
+def score_questionnaire_responses_csv(csv_file) -> dict:
+    """
+    Scores a CSV file of the responses of a cohort of students.
+
+    :param csv_file: The file, opened in binary or text mode.
+    :return: Returns a dictionary of the User objects of the students to lists of their LearningStyles objects.
+    :raises: Raises a ValidationError if the file is invalid, a student does not exist or a learning style does not
+    exist.
+    """
+    usernames, responses = read_questionnaire_responses_csv(csv_file)
+    learning_styles = get_scores_learning_styles(score_questionnaire_responses(responses))
+    return dict(zip(get_questionnaire_students(usernames), learning_styles))
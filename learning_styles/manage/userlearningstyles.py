@@ -1,12 +1,17 @@
 from collections import Iterable
 
 from django.contrib.auth.models import User
+from django.db import transaction
 
+from learning_styles.manage.learningstyles import get_all_learning_styles
 from learning_styles.models import UserLearningStyles, LearningStyles
 
 __version__ = '1.0'
 __author__ = 'Callum Dempsey Leach'
 
+# The number of users read, rows deleted and rows inserted per statement (within SQLite's limit of query parameters).
+BATCH_SIZE = 500
+
 
 def add_to_user_userlearningstyles_collection(user: User, learning_styles: Iterable):
     """
@@ -38,15 +43,138 @@ def purge_user_userlearningstyles(user: User):
     UserLearningStyles.objects.filter(user=user).delete()
 
 
+def set_users_userlearningstyles(users_learning_styles: dict) -> set:
+    """
+    Sets the learning styles of many users (e.g. a cohort) in a single transaction, applying only the differences from
+    their current learning styles: the current rows of the users are read, the added rows are inserted in bulk and the
+    removed rows are deleted, each in a single statement per batch of users. Rows of learning styles a user keeps are
+    left as they are.
+
+    :param users_learning_styles: A dictionary of User objects to iterables of their new LearningStyles objects.
+    :return: Returns the set of ids of the users whose learning styles changed.
+    """
+    new_learning_style_ids = {user.id: {learning_style.id for learning_style in learning_styles}
+                              for user, learning_styles in users_learning_styles.items()}
+    with transaction.atomic():
+        current_learning_style_ids = {user_id: set() for user_id in new_learning_style_ids}
+        removed_ids = []
+        user_ids = sorted(new_learning_style_ids)
+        for i in range(0, len(user_ids), BATCH_SIZE):
+            for row_id, user_id, learning_style_id in UserLearningStyles.objects.filter(
+                    user_id__in=user_ids[i:i + BATCH_SIZE]).values_list('id', 'user_id', 'learning_style_id'):
+                # Duplicate rows of a learning style are removed along with the rows of learning styles which are not
+                # kept.
+                if learning_style_id in current_learning_style_ids[user_id] or \
+                        learning_style_id not in new_learning_style_ids[user_id]:
+                    removed_ids.append(row_id)
+                current_learning_style_ids[user_id].add(learning_style_id)
+        for i in range(0, len(removed_ids), BATCH_SIZE):
+            UserLearningStyles.objects.filter(id__in=removed_ids[i:i + BATCH_SIZE]).delete()
+        UserLearningStyles.objects.bulk_create([
+            UserLearningStyles(user_id=user_id, learning_style_id=learning_style_id) for user_id in user_ids
+            for learning_style_id in sorted(new_learning_style_ids[user_id] - current_learning_style_ids[user_id])],
+            batch_size=BATCH_SIZE)
+    return {user_id for user_id, learning_style_ids in new_learning_style_ids.items()
+            if learning_style_ids != current_learning_style_ids[user_id]}
+
+
+def set_user_userlearningstyles(user: User, learning_styles: Iterable) -> bool:
+    """
+    Sets the learning styles of a user, applying only the differences from their current learning styles (see
+    set_users_userlearningstyles()).
+
+    :param user: The User object.
+    :param learning_styles: The new LearningStyles objects as an iterable.
+    :return: Returns true if the user's learning styles changed otherwise returns false.
+    """
+    return bool(set_users_userlearningstyles({user: learning_styles}))
+
+
 def get_user_learning_styles_from_user(user: User) -> list:
     """
-    Return all of a User's learning styles.
+    Return all of a User's learning styles (in a single joined query).
     :param user: The User object
-    :return: Returns a list of their learning styles.
-    """
-    user_learning_styles = UserLearningStyles.objects.filter(user=user)
-    learning_styles = []
-    for user_learning_style in user_learning_styles:
-        # For each learning style of the user learning styles object.
-        learning_styles.append(user_learning_style.learning_style)
-    return learning_styles
+    :return: Returns a list of their learning styles in the order they were added.
+    """
+    user_learning_styles = UserLearningStyles.objects.filter(user=user).select_related('learning_style').order_by('id')
+    return [user_learning_style.learning_style for user_learning_style in user_learning_styles]
+
+
+def iterate_portable_user_learning_styles(chunk_size: int = 2000):
+    """
+    Iterates all users' learning styles in a portable form, identifying users by username and learning styles by name
+    rather than by primary key. Rows are read in chunks so memory use does not grow with the number of users.
+
+    :param chunk_size: The number of rows read per query.
+    :return: Returns a generator of dictionaries of username and learning_style.
+    """
+    last_id = 0
+    while True:
+        rows = list(UserLearningStyles.objects.filter(id__gt=last_id).order_by('id').values_list(
+            'id', 'user__username', 'learning_style__name')[:chunk_size].iterator())
+        for row_id, username, learning_style in rows:
+            yield {'username': username, 'learning_style': learning_style}
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][0]
+
+
+def is_portable_user_learning_style(record) -> bool:
+    """
+    Identifies whether a record is a user's learning style in the portable form produced by
+    iterate_portable_user_learning_styles().
+
+    :param record: The record.
+    :return: Returns true if the record has a username and a learning style otherwise returns false.
+    """
+    return isinstance(record, dict) and isinstance(record.get('username'), str) and \
+        isinstance(record.get('learning_style'), str)
+
+
+def add_portable_user_learning_styles(records: Iterable) -> tuple:
+    """
+    Applies a chunk of users' learning styles in the portable form produced by iterate_portable_user_learning_styles().
+    The learning styles of a user are replaced spectrum by spectrum: on each spectrum the chunk has records for, the
+    user's learning styles become those of the records (so a user is not left with two learning styles of a spectrum),
+    and their learning styles on other spectra are kept. Records of users or learning styles which do not exist, and
+    records which are not in the portable form, are skipped.
+
+    :param records: An iterable of dictionaries of username and learning_style.
+    :return: Returns a tuple of the number of learning styles added and the number of records skipped.
+    """
+    records = list(records)
+    valid_records = [record for record in records if is_portable_user_learning_style(record)]
+    users = {user.username: user for user in User.objects.filter(
+        username__in={record['username'] for record in valid_records})}
+    # Read once, as every read inside a transaction reads the learning styles again.
+    all_learning_styles = {learning_style.id: learning_style for learning_style in get_all_learning_styles()}
+    learning_styles = {}
+    for learning_style in all_learning_styles.values():
+        learning_styles.setdefault(learning_style.name, learning_style)
+    # The imported learning styles of each user by spectrum.
+    imported = {}
+    skipped = len(records) - len(valid_records)
+    for record in valid_records:
+        user = users.get(record['username'])
+        learning_style = learning_styles.get(record['learning_style'])
+        if user is None or learning_style is None:
+            skipped = skipped + 1
+            continue
+        imported.setdefault(user, {}).setdefault(learning_style.spectrum_id, set()).add(learning_style)
+    current = {}
+    user_ids = sorted(user.id for user in imported)
+    for i in range(0, len(user_ids), BATCH_SIZE):
+        for user_id, learning_style_id in UserLearningStyles.objects.filter(
+                user_id__in=user_ids[i:i + BATCH_SIZE]).values_list('user_id', 'learning_style_id'):
+            current.setdefault(user_id, set()).add(learning_style_id)
+    users_learning_styles = {}
+    added = 0
+    for user, spectra in imported.items():
+        kept = [learning_style for learning_style in map(all_learning_styles.get, current.get(user.id, ()))
+                if learning_style is not None and learning_style.spectrum_id not in spectra]
+        new_learning_styles = [learning_style for spectrum in spectra.values() for learning_style in spectrum]
+        added = added + len([learning_style for learning_style in new_learning_styles
+                             if learning_style.id not in current.get(user.id, ())])
+        users_learning_styles[user] = kept + new_learning_styles
+    set_users_userlearningstyles(users_learning_styles)
+    return added, skipped
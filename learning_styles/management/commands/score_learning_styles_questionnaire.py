@@ -0,0 +1,31 @@
+"""
+Scores the responses of a cohort of students to the learning styles questionnaire (a CSV file of usernames and their
+answers, see learning_styles.manage.questionnaire) and replaces their learning styles with the results. The progress
+of the students whose learning styles changed is only deleted if --purge-progress is passed.
+
+Usage: python manage.py score_learning_styles_questionnaire <responses> [--purge-progress]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from communicate.exceptions.learning_styles_exceptions import InvalidQuestionnaireResponsesException
+from communicate.leaders import import_leaders_questionnaire_responses
+
+
+class Command(BaseCommand):
+    help = 'Scores a CSV file of learning styles questionnaire responses.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('responses', help='The path of the CSV file of responses.')
+        parser.add_argument('--purge-progress', action='store_true', dest='purge_progress',
+                            help='Delete the progress of the students whose learning styles change.')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['responses'], 'rb') as responses_file:
+                scored, changed = import_leaders_questionnaire_responses(None, responses_file,
+                                                                         purge_progress=options['purge_progress'])
+        except (InvalidQuestionnaireResponsesException, OSError) as e:
+            raise CommandError(str(e))
+        self.stdout.write("Scored " + str(scored) + " responses, the learning styles of " + str(changed) +
+                          " students changed.")
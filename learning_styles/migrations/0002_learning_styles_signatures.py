@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 03:00
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+# Matches learning_styles.manage.learningstyles.MAXIMUM_SIGNATURE_BITS at the time of the migration.
+MAXIMUM_SIGNATURE_BITS = 63
+
+
+def populate_signature_bits(apps, schema_editor):
+    """
+    Assigns existing learning styles signature bits in id order.
+    """
+    LearningStyles = apps.get_model('learning_styles', 'LearningStyles')
+    for signature_bit, learning_style_id in enumerate(LearningStyles.objects.order_by('id').values_list(
+            'id', flat=True)[:MAXIMUM_SIGNATURE_BITS]):
+        LearningStyles.objects.filter(id=learning_style_id).update(signature_bit=signature_bit)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_styles', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='learningstyles',
+            name='signature_bit',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.RunPython(populate_signature_bits, migrations.RunPython.noop),
+    ]
@@ -10,6 +10,9 @@ class LearningStyles(models.Model):
     name = models.CharField(max_length=100, validators=[MaxLengthValidator(100)])
     # Identifies if the learning style is on the same spectrum
     spectrum_id = models.PositiveIntegerField(default=0)
+    # The position of the learning style's bit in learning style signatures (see learning_styles.manage.learningstyles),
+    # assigned when the learning style is created.
+    signature_bit = models.PositiveSmallIntegerField(null=True, blank=True, unique=True, editable=False)
     user = models.ManyToManyField(User, through='UserLearningStyles')
 
     class Meta:
@@ -0,0 +1,24 @@
+"""
+Django signals are dispatched whenever conditions are met across the whole application
+https://docs.djangoproject.com/en/1.11/ref/signals
+
+Signals for learning styles assign new learning styles their signature bit and invalidate the cached learning styles
+(see learning_styles.manage.learningstyles) as learning styles are saved or deleted.
+"""
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from learning_styles.manage.learningstyles import invalidate_learning_styles, allocate_signature_bit
+from learning_styles.models import LearningStyles
+
+
+@receiver(pre_save, sender=LearningStyles)
+def assign_learning_style_signature_bit_handler(sender, instance, **kwargs):
+    if instance.signature_bit is None:
+        instance.signature_bit = allocate_signature_bit()
+
+
+@receiver(post_save, sender=LearningStyles)
+@receiver(post_delete, sender=LearningStyles)
+def invalidate_learning_style_handler(sender, instance, **kwargs):
+    invalidate_learning_styles()
@@ -1,11 +1,25 @@
+from io import BytesIO
+from unittest import mock, skipIf
 
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.test import TestCase
 
+import learning_styles.manage.learningstyles
+from learning_styles.forms import LearningStylesConfigurationForm
+from learning_styles.manage.questionnaire import encode_questionnaire_answers, score_questionnaire_responses, \
+    read_questionnaire_responses_csv, score_questionnaire_responses_csv, QUESTIONNAIRE_ITEMS
+from learning_styles.manage.learningstyles import get_spectrum_learning_styles, get_learning_style, \
+    get_all_learning_styles
 from learning_styles.manage.userlearningstyles import add_to_user_userlearningstyles_collection, \
-    get_user_learning_styles_from_user
+    get_user_learning_styles_from_user, set_user_userlearningstyles, set_users_userlearningstyles
 from learning_styles.models import LearningStyles, UserLearningStyles
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 class UsersLearningStylesManagerTest(TestCase):
     """
@@ -44,4 +58,146 @@ class UsersLearningStylesManagerTest(TestCase):
         # Check if each item in styles is equal to the function
         add_to_user_userlearningstyles_collection(self.test_user, collection)
         # Get the collection back assuming its equal to the one passed.
-        self.assertEqual(get_user_learning_styles_from_user(self.test_user), collection)
\ No newline at end of file
+        self.assertEqual(get_user_learning_styles_from_user(self.test_user), collection)
+
+    def test_set_user_userlearningstyles(self):
+        """
+        Test setting a user's learning styles only applies the differences, keeping the rows of learning styles which
+        are kept.
+        """
+        visual_style = LearningStyles.objects.create(name="Visual")
+        add_to_user_userlearningstyles_collection(self.test_user, [self.active_style, self.reflective_style])
+        kept_row = UserLearningStyles.objects.get(user=self.test_user, learning_style=self.active_style)
+        self.assertTrue(set_user_userlearningstyles(self.test_user, [self.active_style, visual_style]))
+        self.assertEqual(get_user_learning_styles_from_user(self.test_user), [self.active_style, visual_style])
+        self.assertTrue(UserLearningStyles.objects.filter(id=kept_row.id).exists())
+        self.assertFalse(set_user_userlearningstyles(self.test_user, [visual_style, self.active_style]))
+
+    def test_set_users_userlearningstyles(self):
+        """
+        Test a cohort's learning styles are set in a fixed number of queries regardless of the number of users.
+        """
+        users = [User.objects.create_user(username='Student' + str(i), password='test') for i in range(20)]
+        for user in users[:10]:
+            add_to_user_userlearningstyles_collection(user, [self.active_style])
+        # A read, a delete and an insert (within the transaction's savepoint).
+        with self.assertNumQueries(5):
+            changed = set_users_userlearningstyles({user: [self.reflective_style] for user in users[5:]})
+        self.assertEqual(changed, {user.id for user in users[5:]})
+        self.assertEqual(UserLearningStyles.objects.filter(learning_style=self.reflective_style).count(), 15)
+        self.assertEqual(UserLearningStyles.objects.filter(learning_style=self.active_style).count(), 5)
+
+
+@mock.patch('learning_styles.manage.learningstyles.connection', in_atomic_block=False)
+class LearningStylesReferenceCacheTest(TestCase):
+    """
+    Tests for the process-wide cache of learning styles (which is bypassed inside the test's transaction unless
+    patched).
+    """
+
+    def setUp(self):
+        self.active_style = LearningStyles.objects.create(name="Active", spectrum_id=0)
+        self.reflective_style = LearningStyles.objects.create(name="Reflective", spectrum_id=0)
+        self.visual_style = LearningStyles.objects.create(name="Visual", spectrum_id=2)
+
+    def tearDown(self):
+        learning_styles.manage.learningstyles.reference_learning_styles = (None, None, None)
+
+    def test_learning_styles_cached_until_changed(self, connection):
+        self.assertEqual(get_spectrum_learning_styles(0), [self.active_style, self.reflective_style])
+        with self.assertNumQueries(0):
+            self.assertEqual(get_spectrum_learning_styles(2), [self.visual_style])
+            self.assertEqual(get_learning_style(self.visual_style.id).name, "Visual")
+            self.assertEqual(get_spectrum_learning_styles(1), [])
+        self.visual_style.spectrum_id = 1
+        self.visual_style.save()
+        self.assertEqual(get_spectrum_learning_styles(1), [self.visual_style])
+        self.reflective_style.delete()
+        self.assertEqual(get_all_learning_styles(), [self.active_style, self.visual_style])
+
+    def test_configuration_form(self, connection):
+        get_all_learning_styles()
+        with self.assertNumQueries(0):
+            form = LearningStylesConfigurationForm({'active_reflective': self.reflective_style.id,
+                                                    'sequential_global': self.visual_style.id,
+                                                    'visual_verbal': self.active_style.id,
+                                                    'sensing_intuitive': self.active_style.id})
+            self.assertEqual(form.fields['active_reflective'].choices,
+                             [(self.active_style.id, "Active"), (self.reflective_style.id, "Reflective")])
+            self.assertFalse(form.is_valid())
+        self.assertEqual(set(form.errors), {'sequential_global', 'visual_verbal', 'sensing_intuitive'})
+        form = LearningStylesConfigurationForm({'active_reflective': self.reflective_style.id,
+                                                'sequential_global': self.active_style.id,
+                                                'visual_verbal': self.visual_style.id,
+                                                'sensing_intuitive': self.active_style.id})
+        self.assertEqual(set(form.errors), {'sequential_global', 'sensing_intuitive'})
+        self.assertEqual(form.cleaned_data['active_reflective'], self.reflective_style)
+
+
+@skipIf(numpy is None, "Scoring the questionnaire requires numpy.")
+class LearningStylesQuestionnaireManagerTest(TestCase):
+    """
+    Tests for the scoring of the learning styles questionnaire.
+    """
+
+    def setUp(self):
+        """
+        Create the learning styles of the questionnaire and a cohort of students.
+        """
+        self.learning_styles = {name: LearningStyles.objects.create(name=name, spectrum_id=spectrum_id)
+                                for spectrum_id, names in enumerate((("Active", "Reflective"), ("Sequential", "Global"),
+                                                                     ("Visual", "Verbal"), ("Sensing", "Intuitive")))
+                                for name in names}
+        self.students = [User.objects.create_user(username='Student' + str(i), password='test') for i in range(3)]
+
+    @staticmethod
+    def get_responses_csv(rows: list) -> BytesIO:
+        lines = ['username,' + ','.join(str(item + 1) for item in range(QUESTIONNAIRE_ITEMS))]
+        lines.extend(username + ',' + ','.join(answers) for username, answers in rows)
+        return BytesIO('\n'.join(lines).encode('utf-8'))
+
+    def test_score_questionnaire_responses(self):
+        """
+        Test each dimension is scored by every fourth item, 'a' counting for and 'b' against its first learning style.
+        """
+        answers = [['a'] * QUESTIONNAIRE_ITEMS, ['b'] * QUESTIONNAIRE_ITEMS,
+                   # Items 1, 5, 9... (active/reflective) are answered 'a' six times and 'b' five times.
+                   [' A' if item % 4 != 0 or item < 24 else 'b' for item in range(QUESTIONNAIRE_ITEMS)]]
+        scores = score_questionnaire_responses(encode_questionnaire_answers(answers))
+        numpy.testing.assert_array_equal(scores, [[11, 11, 11, 11], [-11, -11, -11, -11], [1, 11, 11, 11]])
+
+    def test_score_questionnaire_responses_csv(self):
+        """
+        Test a cohort's responses are scored into their learning styles in a fixed number of queries.
+        """
+        # Items 2, 6, 10... (sensing/intuitive) and 4, 8, 12... (sequential/global) are answered 'b'.
+        mixed = ['a' if item % 2 == 0 else 'b' for item in range(QUESTIONNAIRE_ITEMS)]
+        responses = self.get_responses_csv([(self.students[0].username, ['a'] * QUESTIONNAIRE_ITEMS),
+                                            (self.students[1].username, mixed)])
+        # A read of the learning styles and a read of the students.
+        with self.assertNumQueries(2):
+            students_learning_styles = score_questionnaire_responses_csv(responses)
+        self.assertEqual({student: sorted(learning_style.name for learning_style in learning_styles)
+                          for student, learning_styles in students_learning_styles.items()},
+                         {self.students[0]: ["Active", "Sensing", "Sequential", "Visual"],
+                          self.students[1]: ["Active", "Global", "Intuitive", "Visual"]})
+
+    def test_invalid_questionnaire_responses(self):
+        """
+        Test invalid answers, rows, repeated students and unknown students are reported.
+        """
+        answers = ['a'] * QUESTIONNAIRE_ITEMS
+        invalid_files = {
+            "rows 2": [(self.students[0].username, answers), (self.students[1].username, ['c'] + answers[1:])],
+            "43 answers": [(self.students[0].username, answers[1:])],
+            "only have one response": [(self.students[0].username, answers), (self.students[0].username, answers)],
+            "Unknown": [(self.students[0].username, answers), ("Unknown", answers)],
+            "any responses": [],
+        }
+        for message, rows in invalid_files.items():
+            with self.assertRaises(ValidationError) as context:
+                score_questionnaire_responses_csv(self.get_responses_csv(rows))
+            self.assertIn(message, context.exception.messages[0])
+        usernames, responses = read_questionnaire_responses_csv(BytesIO(b'Student0,' + b','.join([b'b'] * 44)))
+        self.assertEqual(usernames, ['Student0'])
+        self.assertEqual(responses.shape, (1, QUESTIONNAIRE_ITEMS))
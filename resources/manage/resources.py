@@ -1,4 +1,10 @@
-from resources.models import Resources
+import zipfile
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+from resources.models import Resources, upload_to
 
 
 def create_resource(resource):
@@ -8,3 +14,31 @@ def create_resource(resource):
     :param resource: The resource passed.
     """
     return Resources.objects.create(file=resource)
+
+
+def validate_resource_zip(resource) -> None:
+    """
+    Validates a learning resource file is a zip file containing 'index.html' (at its root), which is served as the
+    resource's page.
+
+    :param resource: The resource file, as a path or file object.
+    :raises: Raises a ValidationError if the file is not a zip file or does not contain 'index.html'.
+    """
+    if not zipfile.is_zipfile(resource):
+        raise ValidationError("Please upload a zip file containing 'index.html'.")
+    with zipfile.ZipFile(resource) as zip_file:
+        if "index.html" not in zip_file.namelist():
+            raise ValidationError("Zip file does not contain 'index.html'.")
+
+
+def save_resource_file(path: str, filename: str) -> str:
+    """
+    Saves a file to storage under a unique upload name (as an uploaded resource is saved) without creating a resource
+    for it, so the resources of many files can be created in bulk.
+
+    :param path: The path of the file to save.
+    :param filename: The original name of the file (its extension is kept).
+    :return: Returns the name of the saved file in storage.
+    """
+    with open(path, 'rb') as file:
+        return default_storage.save(upload_to(None, filename), File(file))
@@ -1,11 +1,10 @@
-from roles.models import UserRoles
+from roles.manage.roles import get_user_roles
 
 
 def user_roles(request):
     user = request.user
     if user.is_authenticated():
-        user = request.user
-        roles = UserRoles.objects.filter(user=user).values_list('role', flat=True)
+        roles = sorted(get_user_roles(user))
     else:
         roles = []
     return {'roles': roles}
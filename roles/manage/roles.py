@@ -1,13 +1,57 @@
+"""Roles provides an interface of subroutines for the roles of users, which are assigned by administrators.
+
+A user's roles are read from the database whenever they are checked, so a role which is revoked takes effect at once
+in every process.
+"""
+
+from collections import Iterable
+
 from django.contrib.auth.models import User
+
 from roles.models import UserRoles
 
+__version__ = '1.0'
+__author__ = 'Callum Dempsey Leach'
+
+LEADER_ROLE = 'leader'
+# The number of users whose roles are read per query when reading the roles of many users.
+USERS_BATCH_SIZE = 500
+
+
+def get_user_roles(user: User) -> frozenset:
+    """
+    Returns the names of a user's roles.
+
+    :param user: The Users object (which may be anonymous).
+    :return: Returns the names as a frozenset (empty if the user has no roles).
+    """
+    if user.id is None:
+        return frozenset()
+    return frozenset(UserRoles.objects.filter(user_id=user.id).values_list('role', flat=True))
+
+
+def get_users_with_roles_ids(user_ids: Iterable) -> set:
+    """
+    Returns which of many users have any role, reading the users in batches.
+
+    :param user_ids: The ids of the users.
+    :return: Returns the set of ids of the users who have a role.
+    """
+    user_ids = sorted(set(user_ids))
+    users_with_roles_ids = set()
+    for i in range(0, len(user_ids), USERS_BATCH_SIZE):
+        users_with_roles_ids.update(UserRoles.objects.filter(user_id__in=user_ids[i:i + USERS_BATCH_SIZE])
+                                    .order_by().values_list('user_id', flat=True).distinct())
+    return users_with_roles_ids
+
 
 def has_user_leader_role(user: User):
     """
     Simple function of whether a user has a leader role.
 
-    :param user: The Users object.
+    :param user: The Users object (which may be anonymous).
     :return: Returns whether the user has a leader role.
     """
-    is_true = UserRoles.objects.filter(user=user, role='leader').exists()
-    return is_true
+    if user.id is None:
+        return False
+    return UserRoles.objects.filter(user_id=user.id, role=LEADER_ROLE).exists()
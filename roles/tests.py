@@ -1,7 +1,7 @@
-from django.contrib.auth.models import User
+from django.contrib.auth.models import User, AnonymousUser
 from django.test import TestCase
 
-from roles.manage.roles import has_user_leader_role
+from roles.manage.roles import has_user_leader_role, get_user_roles
 from roles.models import UserRoles
 
 
@@ -20,3 +20,16 @@ class RoleManagerTest(TestCase):
         self.assertFalse(has_user_leader_role(self.test_user))
         UserRoles.objects.create(user=self.test_user, role="leader")
         self.assertTrue(has_user_leader_role(self.test_user))
+
+    def test_user_roles_read_on_every_check(self):
+        """
+        Tests a revoked role takes effect at once, as a user's roles are not cached.
+        """
+        self.assertEqual(get_user_roles(AnonymousUser()), frozenset())
+        self.assertFalse(has_user_leader_role(AnonymousUser()))
+        UserRoles.objects.bulk_create([UserRoles(user=self.test_user, role="leader")])
+        self.assertTrue(has_user_leader_role(self.test_user))
+        self.assertEqual(get_user_roles(self.test_user), frozenset({"leader"}))
+        UserRoles.objects.filter(user=self.test_user).delete()
+        self.assertFalse(has_user_leader_role(self.test_user))
+        self.assertEqual(get_user_roles(self.test_user), frozenset())
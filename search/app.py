@@ -0,0 +1,13 @@
+# app.py specifies custom application configuration for the application.
+# To illustrate, since signals.py is an independently defined file, we need to load this manually.
+# For more see https://docs.djangoproject.com/en/dev/ref/applications/#application-configuration
+
+from django.apps import AppConfig
+
+
+# Defines a new class for the application configuration (name just refers to what the configuration does).
+class SearchConfig(AppConfig):
+    name = 'search'
+
+    def ready(self):
+        import search.signals
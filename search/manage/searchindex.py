@@ -0,0 +1,229 @@
+"""SearchIndex provides an interface of subroutines for the management of the search index, an SQLite FTS5 virtual table
+of the titles and descriptions of courses, lessons and learning resources. Operations in this module refer to
+operations which are performable on the search index or are within reason to do with the domain of searching.
+
+The index is kept up to date incrementally by the signals in search.signals as objects are saved or deleted. Bulk
+inserts and updates do not send signals, so after one the index should be rebuilt with the rebuild_search_index
+management command (which indexes the catalog in batches).
+
+The rowid of each document is derived from its type and primary key, so a document is replaced or removed with a rowid
+lookup rather than a scan of the index. The index requires SQLite (compiled with FTS5, as the Python distribution is),
+on other databases it is not created and is_search_index_enabled() returns false.
+"""
+
+import re
+from collections import Iterable
+
+from django.db import connection, transaction
+from django.db.models import F, Value, IntegerField
+
+from courses.models import Courses, Lessons, LessonsLearningStylesResources
+
+__version__ = '1.0'
+__author__ = 'Callum Dempsey Leach'
+
+# Document types, the rowid of a document is its primary key * DOCUMENT_TYPES + its document type.
+COURSE_DOCUMENT = 1
+LESSON_DOCUMENT = 2
+RESOURCE_DOCUMENT = 3
+DOCUMENT_TYPES = 4
+DOCUMENT_NAMES = {COURSE_DOCUMENT: 'course', LESSON_DOCUMENT: 'lesson', RESOURCE_DOCUMENT: 'resource'}
+# The number of documents read and indexed per statement when rebuilding the index.
+INDEX_BATCH_SIZE = 500
+# The most terms of a query which are matched (the rest are ignored).
+MAXIMUM_QUERY_TERMS = 10
+# The bm25 weights of the index's columns (title, description, course_id, lesson_id), a term in a title counts for
+# more than a term in a description.
+COLUMN_WEIGHTS = (10.0, 1.0, 0.0, 0.0)
+
+
+def is_search_index_enabled() -> bool:
+    """
+    Identifies whether the search index exists for the database in use.
+
+    :return: Returns true if the database is SQLite otherwise returns false.
+    """
+    return connection.vendor == 'sqlite'
+
+
+def get_document_rowid(document: int, id: int) -> int:
+    """
+    Returns the rowid of a document in the search index.
+
+    :param document: The document type (COURSE_DOCUMENT, LESSON_DOCUMENT or RESOURCE_DOCUMENT).
+    :param id: The primary key of the object.
+    :return: Returns the rowid as an integer.
+    """
+    return int(id) * DOCUMENT_TYPES + document
+
+
+def index_documents(rows: list) -> None:
+    """
+    Adds documents to the search index, replacing any already indexed.
+
+    :param rows: A list of (rowid, title, description, course id, lesson id) tuples.
+    """
+    if not rows or not is_search_index_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany("DELETE FROM search_index WHERE rowid = %s", [(row[0],) for row in rows])
+        cursor.executemany("INSERT INTO search_index (rowid, title, description, course_id, lesson_id) "
+                           "VALUES (%s, %s, %s, %s, %s)", rows)
+
+
+def remove_document(document: int, id: int) -> None:
+    """
+    Removes a document from the search index.
+
+    :param document: The document type (COURSE_DOCUMENT, LESSON_DOCUMENT or RESOURCE_DOCUMENT).
+    :param id: The primary key of the object.
+    """
+    if not is_search_index_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("DELETE FROM search_index WHERE rowid = %s", [get_document_rowid(document, id)])
+
+
+def index_course(course: Courses) -> None:
+    """
+    Adds a course to the search index, replacing it if it is already indexed.
+
+    :param course: The Courses object.
+    """
+    index_documents([(get_document_rowid(COURSE_DOCUMENT, course.id), course.title, course.description, course.id,
+                      None)])
+
+
+def index_lesson(lesson: Lessons) -> None:
+    """
+    Adds a lesson to the search index, replacing it if it is already indexed.
+
+    :param lesson: The Lessons object.
+    """
+    index_documents([(get_document_rowid(LESSON_DOCUMENT, lesson.id), lesson.title, lesson.description,
+                      lesson.course_id, lesson.id)])
+
+
+def index_lessons(lessons: Iterable) -> None:
+    """
+    Adds lessons to the search index in batches, e.g. after they have been bulk inserted.
+
+    :param lessons: An iterable of Lessons objects (with primary keys).
+    """
+    rows = [(get_document_rowid(LESSON_DOCUMENT, lesson.id), lesson.title, lesson.description, lesson.course_id,
+             lesson.id) for lesson in lessons]
+    for i in range(0, len(rows), INDEX_BATCH_SIZE):
+        index_documents(rows[i:i + INDEX_BATCH_SIZE])
+
+
+def index_resource(resource: LessonsLearningStylesResources) -> None:
+    """
+    Adds a learning resource to the search index, replacing it if it is already indexed.
+
+    :param resource: The LessonsLearningStylesResources object.
+    """
+    index_documents([(get_document_rowid(RESOURCE_DOCUMENT, resource.id), resource.title, resource.description,
+                      resource.lesson.course_id, resource.lesson_id)])
+
+
+def iterate_document_rows(document: int, batch_size: int = INDEX_BATCH_SIZE, course: Courses = None):
+    """
+    Reads every object of a document type in batches of index rows, in primary key order.
+
+    :param document: The document type (COURSE_DOCUMENT, LESSON_DOCUMENT or RESOURCE_DOCUMENT).
+    :param batch_size: The number of objects read per query.
+    :param course: The Courses object, if provided only the course or its lessons or resources are read.
+    :return: Yields lists of (rowid, title, description, course id, lesson id) tuples.
+    """
+    # Each document type is read as (id, title, description, course id, lesson id) rows.
+    if document == COURSE_DOCUMENT:
+        objects = Courses.objects.annotate(course_id=F('id'), lesson_id=Value(None, output_field=IntegerField()))
+    elif document == LESSON_DOCUMENT:
+        objects = Lessons.objects.annotate(lesson_id=F('id'))
+    else:
+        objects = LessonsLearningStylesResources.objects.annotate(course_id=F('lesson__course_id'))
+    if course is not None:
+        objects = objects.filter(course_id=course.id)
+    objects = objects.values_list('id', 'title', 'description', 'course_id', 'lesson_id')
+    last_id = 0
+    while True:
+        batch = list(objects.filter(id__gt=last_id).order_by('id')[:batch_size])
+        if not batch:
+            return
+        last_id = batch[-1][0]
+        yield [(get_document_rowid(document, row[0]),) + tuple(row[1:]) for row in batch]
+
+
+def index_course_documents(course: Courses, batch_size: int = INDEX_BATCH_SIZE) -> None:
+    """
+    Adds a course and its lessons and learning resources to the search index in batches, e.g. after they have been
+    bulk inserted.
+
+    :param course: The Courses object.
+    :param batch_size: The number of objects read and indexed per statement.
+    """
+    for document in (COURSE_DOCUMENT, LESSON_DOCUMENT, RESOURCE_DOCUMENT):
+        for rows in iterate_document_rows(document, batch_size, course=course):
+            index_documents(rows)
+
+
+def rebuild_search_index(batch_size: int = INDEX_BATCH_SIZE) -> int:
+    """
+    Rebuilds the search index from every course, lesson and learning resource in a single transaction, reading and
+    indexing them in batches so memory use does not grow with the catalog.
+
+    :param batch_size: The number of objects read and indexed per statement.
+    :return: Returns the number of documents indexed.
+    """
+    assert is_search_index_enabled()
+    indexed = 0
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM search_index")
+        for document in (COURSE_DOCUMENT, LESSON_DOCUMENT, RESOURCE_DOCUMENT):
+            for rows in iterate_document_rows(document, batch_size):
+                with connection.cursor() as cursor:
+                    cursor.executemany("INSERT INTO search_index (rowid, title, description, course_id, lesson_id) "
+                                       "VALUES (%s, %s, %s, %s, %s)", rows)
+                indexed = indexed + len(rows)
+    return indexed
+
+
+def get_search_match_expression(query: str) -> str:
+    """
+    Converts free text into an FTS5 match expression of its terms, so the text's punctuation cannot be interpreted as
+    query syntax. Every term must match and the last term may match as a prefix (as the user may still be typing it).
+
+    :param query: The text searched for.
+    :return: Returns the match expression (empty if the text has no terms).
+    """
+    terms = re.findall(r'\w+', query.lower())[:MAXIMUM_QUERY_TERMS]
+    if not terms:
+        return ''
+    return ' '.join('"' + term + '"' for term in terms) + '*'
+
+
+def search_index(query: str, offset: int = 0, limit: int = 20) -> list:
+    """
+    Searches the titles and descriptions of courses, lessons and learning resources, best matches first (ranked by
+    bm25, weighting titles above descriptions).
+
+    :param query: The text searched for (which must have at least one term).
+    :param offset: The number of results to skip. Every match must be ranked to return any page, so an offset costs
+    little more than the first page.
+    :param limit: The greatest number of results to return.
+    :return: Returns a list of dictionaries of the document (course, lesson or resource), id, title, description,
+    course_id and lesson_id of each result.
+    """
+    assert is_search_index_enabled()
+    match = get_search_match_expression(query)
+    assert match
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT rowid, title, description, course_id, lesson_id FROM search_index "
+                       "WHERE search_index MATCH %s ORDER BY bm25(search_index, " +
+                       ', '.join(str(weight) for weight in COLUMN_WEIGHTS) + "), rowid LIMIT %s OFFSET %s",
+                       [match, int(limit), int(offset)])
+        rows = cursor.fetchall()
+    return [{'document': DOCUMENT_NAMES[rowid % DOCUMENT_TYPES], 'id': rowid // DOCUMENT_TYPES, 'title': title,
+             'description': description, 'course_id': course_id, 'lesson_id': lesson_id}
+            for rowid, title, description, course_id, lesson_id in rows]
@@ -0,0 +1,25 @@
+"""
+Rebuilds the search index from every course, lesson and learning resource. The index is kept up to date as objects are
+saved or deleted, so this is needed after bulk changes (which do not send signals) or to build the index for an
+existing catalog.
+
+Usage: python manage.py rebuild_search_index [--batch-size <n>]
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from search.manage.searchindex import rebuild_search_index, is_search_index_enabled, INDEX_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the search index of courses, lessons and learning resources.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=INDEX_BATCH_SIZE, dest='batch_size',
+                            help='The number of objects read and indexed per statement.')
+
+    def handle(self, *args, **options):
+        if not is_search_index_enabled():
+            raise CommandError("The search index requires an SQLite database.")
+        indexed = rebuild_search_index(batch_size=options['batch_size'])
+        self.stdout.write("Indexed " + str(indexed) + " document(s).")
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 07:40
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """
+    Creates the FTS5 virtual table of the search index (SQLite only, see search.manage.searchindex).
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("CREATE VIRTUAL TABLE search_index USING fts5("
+                          "title, description, course_id UNINDEXED, lesson_id UNINDEXED, "
+                          "tokenize = 'porter unicode61')")
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS search_index")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0005_lessons_order_key'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, remove_search_index),
+    ]
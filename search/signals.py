@@ -0,0 +1,43 @@
+"""
+Django signals are dispatched whenever conditions are met across the whole application
+https://docs.djangoproject.com/en/1.11/ref/signals
+
+Signals for search keep the search index up to date as courses, lessons and learning resources are saved or deleted
+(in the same transaction as the change). Deleting a course sends these signals for its lessons and resources too.
+"""
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from courses.models import Courses, Lessons, LessonsLearningStylesResources
+from search.manage.searchindex import index_course, index_lesson, index_resource, remove_document, \
+    COURSE_DOCUMENT, LESSON_DOCUMENT, RESOURCE_DOCUMENT
+
+
+@receiver(post_save, sender=Courses)
+def index_course_handler(sender, instance, **kwargs):
+    index_course(instance)
+
+
+@receiver(post_save, sender=Lessons)
+def index_lesson_handler(sender, instance, **kwargs):
+    index_lesson(instance)
+
+
+@receiver(post_save, sender=LessonsLearningStylesResources)
+def index_resource_handler(sender, instance, **kwargs):
+    index_resource(instance)
+
+
+@receiver(post_delete, sender=Courses)
+def remove_course_handler(sender, instance, **kwargs):
+    remove_document(COURSE_DOCUMENT, instance.id)
+
+
+@receiver(post_delete, sender=Lessons)
+def remove_lesson_handler(sender, instance, **kwargs):
+    remove_document(LESSON_DOCUMENT, instance.id)
+
+
+@receiver(post_delete, sender=LessonsLearningStylesResources)
+def remove_resource_handler(sender, instance, **kwargs):
+    remove_document(RESOURCE_DOCUMENT, instance.id)
@@ -0,0 +1,72 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from courses.models import Courses, Lessons
+from search.manage.searchindex import search_index, get_search_match_expression, rebuild_search_index
+
+
+class SearchIndexTest(TestCase):
+    def setUp(self):
+        """
+        Create a course of lessons to search (indexed as they are saved).
+        """
+        # Manual assignment of primary key.
+        self.test_author = User.objects.create_user(id=1,
+                                                    username='MrTest', email='test@test.com', password='test')
+        self.course = Courses.objects.create(author=self.test_author, title="Astronomy",
+                                             description="Planets and telescopes")
+        self.lesson = Lessons.objects.create(course=self.course, sequence_number=1, title="Telescopes",
+                                             description="Choosing a telescope")
+        self.lesson2 = Lessons.objects.create(course=self.course, sequence_number=2, title="Comets",
+                                              description="Observing with binoculars")
+
+    def get_documents(self, query: str) -> list:
+        return [(result['document'], result['id']) for result in search_index(query)]
+
+    def test_search_ranks_titles_first(self):
+        """
+        Tests matches in a title rank above matches in a description and terms match by prefix and stem.
+        """
+        self.assertEqual(self.get_documents("telescope"), [('lesson', self.lesson.id), ('course', self.course.id)])
+        self.assertEqual(self.get_documents("binoc"), [('lesson', self.lesson2.id)])
+        result = search_index("comets")[0]
+        self.assertEqual((result['course_id'], result['lesson_id']), (self.course.id, self.lesson2.id))
+
+    def test_index_follows_changes(self):
+        """
+        Tests the index is updated as objects are saved and deleted (including cascaded deletes).
+        """
+        self.lesson2.title = "Meteors"
+        self.lesson2.save()
+        self.assertEqual(self.get_documents("comets"), [])
+        self.assertEqual(self.get_documents("meteors"), [('lesson', self.lesson2.id)])
+        self.lesson.delete()
+        self.assertEqual(self.get_documents("telescope"), [('course', self.course.id)])
+        self.course.delete()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM search_index")
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_rebuild_search_index(self):
+        """
+        Tests rebuilding the index in batches indexes objects which were inserted without signals.
+        """
+        Lessons.objects.bulk_create([Lessons(course=self.course, sequence_number=sequence_number, title="Nebula",
+                                             description="") for sequence_number in range(3, 8)])
+        self.assertEqual(self.get_documents("nebula"), [])
+        self.assertEqual(rebuild_search_index(batch_size=2), 8)
+        self.assertEqual(len(self.get_documents("nebula")), 5)
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.get_documents("telescopes")), 2)
+
+    def test_search_match_expression(self):
+        """
+        Tests query syntax in the text searched for is treated as terms.
+        """
+        self.assertEqual(get_search_match_expression('"tele* OR) -comets'), '"tele" "or" "comets"*')
+        self.assertEqual(get_search_match_expression(' *() '), '')
+        self.assertEqual(self.get_documents('telescope" OR'), [])
@@ -1,5 +1,6 @@
 import re
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 import docker
 from docker.errors import APIError
@@ -77,6 +78,44 @@ def force_remove_container(container_name: str):
         exit(-1)
 
 
+def get_container_names() -> set:
+    """
+    Lists the names of every container in the Docker Engine (with a single request).
+    :return: Returns a set of container names (without the `/` the Docker engine prepends).
+    """
+    client = docker.APIClient(base_url='unix://var/run/docker.sock')
+    return {name.lstrip("/") for container in client.containers(all=True) for name in container.get("Names")}
+
+
+def force_remove_containers(container_names: set, container_names_present: set, workers: int = 8) -> set:
+    """
+    Force removes many containers in parallel. Unlike force_remove_container() the containers which exist are passed
+    (see get_container_names()) rather than listed for each container, and an error removing one container does not
+    prevent the others being removed.
+    :param container_names: The names of the containers to force remove.
+    :param container_names_present: The names of the containers which exist.
+    :param workers: The greatest number of containers removed at once.
+    :return: Returns the set of names of the containers which were removed.
+    """
+
+    def remove(container_name: str) -> bool:
+        try:
+            docker.APIClient(base_url='unix://var/run/docker.sock').remove_container(container=container_name,
+                                                                                     force=True)
+            return True
+        except APIError:
+            # The container may have been removed in the meantime, it is left to be removed again if not.
+            traceback.print_exc()
+            return False
+
+    container_names = sorted(set(container_names) & set(container_names_present))
+    if not container_names:
+        return set()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        removed = list(executor.map(remove, container_names))
+    return {container_name for container_name, was_removed in zip(container_names, removed) if was_removed}
+
+
 def start_container(container: str):
     """
     Starts an exited container.
@@ -1,4 +1,12 @@
-from static_containers.models import DockerContainers
+import datetime
+import os
+
+from django.db import transaction
+from django.db.models import Max
+from django.db.models.fields.files import FieldFile
+
+from resources.models import create_secure_string
+from static_containers.models import DockerContainers, min_host_port_value
 
 
 def get_docker_container_from_resource(resource):
@@ -40,3 +48,55 @@ def flag_docker_container_for_rebuild(docker_container: DockerContainers, requir
     """
     docker_container.build = requires_rebuild
     docker_container.save()
+
+
+def get_resource_image_name(resource_file: FieldFile) -> str:
+    """
+    Given a resource file will return the name of the image built from it. Images are named after their resource file
+    (rather than their container) so resources which share a file share an image, and an edited resource (which has a
+    new file) does not replace the image others use.
+    :param resource_file: The resource file.
+    :return: Returns the image name as a string.
+    """
+    return os.path.splitext(os.path.basename(str(resource_file)))[0].lower()
+
+
+def generate_docker_container_unique_name() -> str:
+    """
+    Generates a name for a docker container in the same format as the names of uploaded resources.
+    :return: Returns the name as a string.
+    """
+    return datetime.datetime.now().strftime("%d%m%Y") + create_secure_string()
+
+
+def clone_docker_containers(resource_ids: dict) -> None:
+    """
+    Given copies of resources will give each copy a docker container of its own (on its own port) which runs the image
+    of the original's container, so copies are not rebuilt unless the original was waiting to be.
+    :param resource_ids: A dictionary of the ids of the original resources to the ids of their copies.
+    """
+    with transaction.atomic():
+        docker_containers = list(DockerContainers.objects.filter(resource_id__in=list(resource_ids)).order_by('id'))
+        # Ports are allocated after the largest in use, as when a container is created for a new resource.
+        port = DockerContainers.objects.aggregate(host_port=Max('host_port'))['host_port'] or min_host_port_value - 1
+        DockerContainers.objects.bulk_create([
+            DockerContainers(resource_id=resource_ids[docker_container.resource_id],
+                             unique_name=generate_docker_container_unique_name(), host_port=port + i,
+                             image_name=docker_container.image_name,
+                             build=docker_container.build or not docker_container.image_name)
+            for i, docker_container in enumerate(docker_containers, 1)], batch_size=500)
+
+
+def create_docker_containers(resources: list) -> None:
+    """
+    Given learning resources created with bulk inserts (which do not send the signals that create containers) will give
+    each a docker container (on its own port) which is flagged to be built.
+    :param resources: A list of LessonsLearningStylesResources objects (with primary keys).
+    """
+    with transaction.atomic():
+        # Ports are allocated after the largest in use, as when a container is created for a new resource.
+        port = DockerContainers.objects.aggregate(host_port=Max('host_port'))['host_port'] or min_host_port_value - 1
+        DockerContainers.objects.bulk_create([
+            DockerContainers(resource_id=resource.id, unique_name=generate_docker_container_unique_name(),
+                             host_port=port + i, build=True)
+            for i, resource in enumerate(resources, 1)], batch_size=500)
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.29 on 2026-10-18 08:25
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def populate_image_names(apps, schema_editor):
+    """
+    Existing containers were built from images named after the containers.
+    """
+    DockerContainers = apps.get_model('static_containers', 'DockerContainers')
+    DockerContainers.objects.update(image_name=F('unique_name'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('static_containers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dockercontainers',
+            name='image_name',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+        migrations.RunPython(populate_image_names, migrations.RunPython.noop),
+    ]
@@ -19,6 +19,9 @@ class DockerContainers(models.Model):
                                                         MaxLengthValidator(max_host_port_value)],
                                             null=False)
     build = models.BooleanField(default=True)
+    # The image the container was last built from. Images are tagged by their resource file, so copies of a resource
+    # which share its file (e.g. those of a cloned course) share its image rather than building their own.
+    image_name = models.CharField(max_length=500, default='', blank=True)
 
     class Meta:
         verbose_name_plural = "Docker Containers"
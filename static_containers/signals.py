@@ -5,14 +5,14 @@ https://docs.djangoproject.com/en/1.11/ref/signals
 Signals for static containers ensure atomic handling of creating and removing docker container entities in the database.
 """
 
-import os
 from django.db import transaction
 from django.db.models.signals import post_save, pre_delete
 from django.dispatch import receiver
 from courses.models import LessonsLearningStylesResources
-from static_containers.docker_api.container_utils import force_remove_container
-from static_containers.manage.dockercontainers import get_docker_container_from_resource
+from static_containers.manage.dockercontainers import get_docker_container_from_resource, \
+    generate_docker_container_unique_name
 from static_containers.models import DockerContainers, min_host_port_value
+from static_containers.tasks import schedule_container_removal
 
 
 @receiver(post_save, sender=LessonsLearningStylesResources)
@@ -32,8 +32,9 @@ def create_docker_container_from_learning_resource_handler(sender, instance, cre
         # isn't a key). We can do this by defining a critical section to enforce atomicity in the application.
         # BEGIN CRITICAL SECTION #
         #
-        resource_name_with_ext = os.path.basename(str(instance.resource.file))
-        resource_name_without_ext = os.path.splitext(resource_name_with_ext)[0]
+        # Containers are named uniquely rather than after their resource file, as resources may share a file (the
+        # image is named after the file, see get_resource_image_name()).
+        unique_name = generate_docker_container_unique_name()
         with transaction.atomic():
             if DockerContainers.objects.count() != 0:
                 # Order by host port descending then get the first.
@@ -41,25 +42,24 @@ def create_docker_container_from_learning_resource_handler(sender, instance, cre
                 port = current_largest_host_port.host_port
                 port = port + 1
                 docker_container = DockerContainers.objects.create(resource=instance, host_port=port, build=True,
-                                                                   unique_name=resource_name_without_ext)
+                                                                   unique_name=unique_name)
                 # Call the method defined in saving the resources dock instance to the database
             else:
                 docker_container = DockerContainers.objects.create(resource=instance, host_port=min_host_port_value,
                                                                    build=True,
-                                                                   unique_name=resource_name_without_ext)
+                                                                   unique_name=unique_name)
         docker_container.save()
         # END CRITICAL SECTION #
 
 
-@receiver(pre_delete, sender=LessonsLearningStylesResources)
+@receiver(pre_delete, sender=DockerContainers)
 def remove_docker_container_handler(sender, instance, *args, **kwargs):
     """
     Django signal implementation of removal of docker container and docker container in the Docker engine.
     """
     # We need to remove associated containers with old resources or it is possible for old ports on old containers (
     # that are active) to conflict with new assignments. This will crash Django - not good.
-    # Fortunately the solution to this is simple courtesy cleanup.
-    docker_container = get_docker_container_from_resource(instance)
-    print(docker_container.unique_name)
-    container_name = docker_container.unique_name
-    force_remove_container(container_name)
+    # Fortunately the solution to this is simple courtesy cleanup. The containers of deleted learning resources are
+    # deleted with them (and loaded together, so there is no query per container) and removed from the Docker engine
+    # in batches in the background once the deletion commits, rather than one at a time during the request.
+    schedule_container_removal(instance.unique_name)
@@ -0,0 +1,138 @@
+"""
+Tasks for static containers are Docker operations which are performed in the background rather than inline in a
+request (building an image can take far longer than a request should).
+
+Tasks run on a small pool of worker threads in the server process, and are scheduled with transaction.on_commit() so
+they only run once the rows they refer to are committed (and never for a transaction which is rolled back). A task
+which fails leaves its container as it was, e.g. an image which could not be built stays flagged to be built when its
+resource is first rendered.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, transaction
+
+from bark.transactions import add_to_commit_batch
+from static_containers.docker_api.container_utils import get_container_names, force_remove_containers
+from static_containers.docker_api.image_utils import prepare_nginx_dockerfile_for_resource, \
+    has_resource_file_dockerfile, get_dockerfile, create_image
+from static_containers.manage.dockercontainers import get_resource_image_name
+from static_containers.models import DockerContainers
+
+__version__ = '1.0'
+__author__ = 'Callum Dempsey Leach'
+
+logger = logging.getLogger(__name__)
+
+# The number of tasks performed at once.
+TASK_WORKERS = 2
+# The number of containers removed at once.
+REMOVAL_WORKERS = 8
+# The name of the commit batch of the containers deleted in a transaction (see bark.transactions).
+REMOVAL_BATCH = 'static_containers_removal'
+# The number of container names checked against their rows in a single query.
+REMOVAL_BATCH_SIZE = 500
+
+executor = ThreadPoolExecutor(max_workers=TASK_WORKERS)
+
+
+def run_task(task, *args) -> None:
+    """
+    Performs a task on a worker thread, logging (rather than raising) any error and closing the thread's database
+    connection when it is done.
+    :param task: The function to call.
+    :param args: The arguments of the function.
+    """
+    try:
+        task(*args)
+    except BaseException:
+        logger.exception("The static containers task %s failed.", getattr(task, '__name__', task))
+    finally:
+        connection.close()
+
+
+def schedule_task(task, *args) -> None:
+    """
+    Schedules a task to be performed in the background once the current transaction commits (or immediately if there
+    is no transaction).
+    :param task: The function to call.
+    :param args: The arguments of the function.
+    """
+    transaction.on_commit(lambda: executor.submit(run_task, task, *args))
+
+
+def wait_for_tasks() -> None:
+    """
+    Waits for every scheduled task (which has been submitted) to be performed, e.g. before a management command exits.
+    """
+    global executor
+    executor.shutdown(wait=True)
+    executor = ThreadPoolExecutor(max_workers=TASK_WORKERS)
+
+
+def build_docker_container_image(docker_container_id: int) -> None:
+    """
+    Builds the image of a docker container which is flagged to be built and clears the flag. Containers are started
+    from their image when their resource is first rendered.
+    :param docker_container_id: The id of the DockerContainers object.
+    """
+    docker_container = DockerContainers.objects.select_related('resource__resource').filter(
+        id=docker_container_id, build=True).first()
+    if docker_container is None:
+        return
+    resource_file = docker_container.resource.resource.file
+    if not has_resource_file_dockerfile(resource_file):
+        prepare_nginx_dockerfile_for_resource(resource_file)
+    image_name = get_resource_image_name(resource_file)
+    create_image(get_dockerfile(resource_file), image_name)
+    # The flag is only cleared if the container was not flagged again (with a new file) in the meantime.
+    DockerContainers.objects.filter(id=docker_container.id, build=True,
+                                    resource__resource=docker_container.resource.resource).update(
+        build=False, image_name=image_name)
+
+
+def schedule_docker_container_builds(resources: list) -> None:
+    """
+    Schedules the images of the docker containers of learning resources to be built in the background once the current
+    transaction commits.
+    :param resources: A list of LessonsLearningStylesResources objects.
+    """
+    docker_container_ids = DockerContainers.objects.filter(
+        resource_id__in=[resource.id for resource in resources], build=True).values_list('id', flat=True)
+    for docker_container_id in docker_container_ids:
+        schedule_task(build_docker_container_image, docker_container_id)
+
+
+def remove_containers(container_names: set) -> None:
+    """
+    Removes a batch of containers from the Docker engine in parallel, listing the containers of the engine once for
+    the whole batch.
+    :param container_names: The names of the containers.
+    """
+    force_remove_containers(container_names, get_container_names(), workers=REMOVAL_WORKERS)
+
+
+def submit_container_removals(container_names: set) -> None:
+    """
+    Submits the removal of the containers deleted in a transaction, once it commits, as a single task. A container
+    whose deletion was rolled back with a savepoint (of a transaction which committed) still has its row and is kept.
+    :param container_names: The names of the containers.
+    """
+    container_names = sorted(container_names)
+    kept_names = set()
+    for i in range(0, len(container_names), REMOVAL_BATCH_SIZE):
+        kept_names.update(DockerContainers.objects.filter(
+            unique_name__in=container_names[i:i + REMOVAL_BATCH_SIZE]).values_list('unique_name', flat=True))
+    removed_names = set(container_names) - kept_names
+    if removed_names:
+        executor.submit(run_task, remove_containers, removed_names)
+
+
+def schedule_container_removal(container_name: str) -> None:
+    """
+    Schedules a container to be removed in the background once the current transaction commits, along with the other
+    containers deleted in the transaction (a deletion which is rolled back leaves its containers in place).
+    :param container_name: The name of the container.
+    """
+    add_to_commit_batch(REMOVAL_BATCH, container_name, submit_container_removals)
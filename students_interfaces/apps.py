@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class StudentsInterfaceConfig(AppConfig):
     name = 'students_interfaces'
+
+    def ready(self):
+        from students_interfaces.registry import register_default_learning_styles
+        register_default_learning_styles()
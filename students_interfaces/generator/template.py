@@ -1,21 +1,17 @@
 from collections import Iterable
 
-from django.template import TemplateDoesNotExist
-
-from students_interfaces.generator.template_contexts import learning_styles_templates
+from students_interfaces.exceptions.template_exceptions import TemplateDoesNotExistException
+from students_interfaces.registry import get_learning_styles_rules
 
 
 def get_learning_styles_template(learning_styles: Iterable) -> str:
     """
-    Returns the template for a specific learning style based on the dict object in template_contexts.
-    :param learning_styles:
-    :return:
+    Returns the template for a set of learning styles based on the templates registered in the learning styles registry.
+    :param learning_styles: The LearningStyles objects of the student.
+    :return: Returns the template as a string.
+    :raises: Raises TemplateDoesNotExistException if none of the learning styles registers a template.
     """
-    template = ""
-    for learning_style in learning_styles:
-        # Get the appropriate learning styles template.
-        if learning_style.name in learning_styles_templates:
-            template = learning_styles_templates.get(learning_style.name)
-    if template == "":
-        raise TemplateDoesNotExist
+    template = get_learning_styles_rules(learning_styles).template
+    if template is None:
+        raise TemplateDoesNotExistException
     return template
@@ -0,0 +1,116 @@
+"""
+The learning styles registry maps learning styles to how their students are taught, the template a course's lessons
+are shown with (and the function building its context) and the rules which validate and update a student's progress.
+Learning styles are registered by name with register_learning_style() when the application starts (see
+StudentsInterfaceConfig.ready()), so a new learning style is supported by registering it rather than by changing the
+views or the rule-sets.
+
+A student's learning styles are resolved by their signature (the sorted names of their learning styles) into a
+LearningStylesRules tuple, which is cached per signature so each request costs a dictionary lookup. Where several of a
+student's learning styles register a template the one registered last is used, and every progress rule is applied in
+the order the learning styles were registered.
+"""
+
+from collections import Iterable, OrderedDict, namedtuple
+from functools import lru_cache
+
+__version__ = '1.0'
+__author__ = 'Callum Dempsey Leach'
+
+# The rules of a set of learning styles: the template (or None), the function building its context from the student
+# and the course, and tuples of the functions which update the progress of a lesson (student, lesson) and validate a
+# lesson against a snapshot of the student's progress (completed lessons, lesson).
+LearningStylesRules = namedtuple('LearningStylesRules', ['template', 'template_context', 'update_progress',
+                                                         'validate_progress'])
+
+# The number of signatures whose rules are cached.
+MAXIMUM_CACHED_SIGNATURES = 1024
+
+learning_styles_registry = OrderedDict()
+template_contexts_registry = {}
+
+
+def register_learning_style(name: str, template: str = None, template_context=None, update_progress=None,
+                            validate_progress=None) -> None:
+    """
+    Registers (or replaces) the template and progress rules of a learning style.
+    :param name: The name of the learning style.
+    :param template: The template the lessons of a course are shown with, if any.
+    :param template_context: The function building the context of the template, required with a template.
+    :param update_progress: The function which validates and saves a lesson the student has completed, if any.
+    :param validate_progress: The function which validates a lesson against a snapshot of the student's completed
+    lessons (returning whether it should be added), required with update_progress.
+    """
+    assert (template is None) == (template_context is None)
+    assert (update_progress is None) == (validate_progress is None)
+    learning_styles_registry[name] = LearningStylesRules(template, template_context, update_progress,
+                                                         validate_progress)
+    if template is not None:
+        template_contexts_registry[template] = template_context
+    resolve_learning_styles_signature.cache_clear()
+
+
+def get_learning_styles_signature(learning_styles: Iterable) -> tuple:
+    """
+    Returns the signature of a set of learning styles.
+    :param learning_styles: The LearningStyles objects.
+    :return: Returns the sorted names of the learning styles as a tuple.
+    """
+    return tuple(sorted({learning_style.name for learning_style in learning_styles}))
+
+
+@lru_cache(maxsize=MAXIMUM_CACHED_SIGNATURES)
+def resolve_learning_styles_signature(signature: tuple) -> LearningStylesRules:
+    """
+    Resolves the registered rules of a signature of learning styles.
+    :param signature: The signature returned by get_learning_styles_signature().
+    :return: Returns a LearningStylesRules tuple, whose template is None if no learning style of the signature
+    registers one and whose progress rules are empty if none registers any.
+    """
+    template, template_context = None, None
+    update_progress, validate_progress = [], []
+    for name, rules in learning_styles_registry.items():
+        if name not in signature:
+            continue
+        if rules.template is not None:
+            template, template_context = rules.template, rules.template_context
+        if rules.update_progress is not None:
+            update_progress.append(rules.update_progress)
+            validate_progress.append(rules.validate_progress)
+    return LearningStylesRules(template, template_context, tuple(update_progress), tuple(validate_progress))
+
+
+def get_learning_styles_rules(learning_styles: Iterable) -> LearningStylesRules:
+    """
+    Returns the registered rules of a student's learning styles.
+    :param learning_styles: The LearningStyles objects.
+    :return: Returns a LearningStylesRules tuple (see resolve_learning_styles_signature()).
+    """
+    return resolve_learning_styles_signature(get_learning_styles_signature(learning_styles))
+
+
+def get_template_context_rule(template: str):
+    """
+    Returns the function building the context of a registered template.
+    :param template: The template.
+    :return: Returns the function, or None if the template is not registered.
+    """
+    return template_contexts_registry.get(template)
+
+
+def register_default_learning_styles() -> None:
+    """
+    Registers the learning styles the interface supports out of the box.
+    """
+    from students_interfaces.generator.template_contexts import courses_lessons_global_template, \
+        courses_lessons_sequential_template, global_template_context, sequential_template_context
+    from students_interfaces.update.student_progress import global_update_lesson_complete, \
+        global_validate_lesson_complete, sequential_update_lesson_complete, sequential_validate_lesson_complete
+
+    register_learning_style("Global", template=courses_lessons_global_template,
+                            template_context=global_template_context, update_progress=global_update_lesson_complete,
+                            validate_progress=global_validate_lesson_complete)
+    register_learning_style("Sequential", template=courses_lessons_sequential_template,
+                            template_context=sequential_template_context,
+                            update_progress=sequential_update_lesson_complete,
+                            validate_progress=sequential_validate_lesson_complete)
@@ -0,0 +1,377 @@
+import json
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.http import HttpRequest
+from django.test import TestCase
+
+from communicate.students import get_course_lessons, get_student_learning_styles, update_student_learning_styles
+from courses.manage.userlessonscompleted import add_user_completed_lesson
+from courses.models import Courses, Lessons, UserLessonsCompleted, LessonsLearningStylesResources
+from learning_styles.models import LearningStyles, UserLearningStyles
+from resources.models import Resources
+from students_interfaces.exceptions.template_exceptions import TemplateDoesNotExistException
+from students_interfaces.exceptions.update_exceptions import InvalidUserLessonProgressRequestException
+from students_interfaces.generator.register_template_context_rules import generate_template_context
+from students_interfaces.generator.template import get_learning_styles_template
+from students_interfaces.generator.template_contexts import global_template_context, courses_lessons_global_template, \
+    courses_lessons_sequential_template
+from students_interfaces.registry import register_learning_style, learning_styles_registry, \
+    template_contexts_registry, resolve_learning_styles_signature, get_learning_styles_rules
+from students_interfaces.update.register_progress_update_rules import update_user_lesson_progress_protocols
+from students_interfaces.views import courses_page_size, search_page_size
+
+
+class TemplateContextsTest(TestCase):
+    def setUp(self):
+        """
+        Create a large course for the template context rulesets.
+        """
+        # Manual assignment of primary key.
+        self.test_student = User.objects.create_user(id=1,
+                                                     username='MrTest', email='test@test.com', password='test')
+        self.course = Courses.objects.create(author=self.test_student, title="", description="")
+        Lessons.objects.bulk_create([Lessons(course=self.course, sequence_number=sequence_number, title="",
+                                             description="") for sequence_number in range(200, 0, -1)])
+
+    def test_global_template_context(self):
+        """
+        Tests the global template context marks completed lessons in sequence order in a fixed number of queries
+        regardless of the number of lessons, and in a single query (of the student's progress) once the course's tree
+        is cached.
+        """
+        for sequence_number in (1, 3, 200):
+            add_user_completed_lesson(self.test_student,
+                                      Lessons.objects.get(course=self.course, sequence_number=sequence_number))
+        with self.assertNumQueries(4):
+            global_template_context(self.test_student, self.course)
+        with self.assertNumQueries(1):
+            lessons_completed_tuples = global_template_context(self.test_student, self.course)[
+                "lessons_completed_tuples"]
+        self.assertEqual([lesson.sequence_number for lesson, completed in lessons_completed_tuples],
+                         list(range(1, 201)))
+        self.assertEqual([lesson.sequence_number for lesson, completed in lessons_completed_tuples if completed],
+                         [1, 3, 200])
+
+    def test_global_template_context_without_progress(self):
+        """
+        Tests the global template context marks no lessons completed for a student without progress.
+        """
+        get_course_lessons(self.course)
+        with self.assertNumQueries(1):
+            lessons_completed_tuples = global_template_context(self.test_student, self.course)[
+                "lessons_completed_tuples"]
+        self.assertEqual(len(lessons_completed_tuples), 200)
+        self.assertFalse(any(completed for lesson, completed in lessons_completed_tuples))
+
+
+class CoursesLessonsBatchProgressViewTest(TestCase):
+    def setUp(self):
+        """
+        Create a course and a student to make progress through it.
+        """
+        # Manual assignment of primary key.
+        self.test_student = User.objects.create_user(id=1,
+                                                     username='MrTest', email='test@test.com', password='test')
+        self.course = Courses.objects.create(author=self.test_student, title="", description="")
+        self.lessons = [Lessons.objects.create(course=self.course, sequence_number=sequence_number, title="",
+                                               description="") for sequence_number in range(1, 6)]
+        self.client.login(username='MrTest', password='test')
+
+    def set_learning_style(self, name: str):
+        learning_style = LearningStyles.objects.create(name=name, spectrum_id=1)
+        UserLearningStyles.objects.create(user=self.test_student, learning_style=learning_style)
+
+    def post_lesson_ids(self, lesson_ids):
+        return self.client.post('/courses/' + str(self.course.id) + '/lessons/complete',
+                                json.dumps({'lesson_ids': lesson_ids}), content_type='application/json')
+
+    def get_completed_sequence_numbers(self):
+        return set(UserLessonsCompleted.objects.filter(user=self.test_student).values_list(
+            'lesson__sequence_number', flat=True))
+
+    def test_global_batch_progress(self):
+        """
+        Tests a global learner may complete lessons in any order in one request.
+        """
+        self.set_learning_style("Global")
+        response = self.post_lesson_ids([self.lessons[4].id, self.lessons[1].id])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content.decode('utf-8')), {'added': 2})
+        self.assertEqual(self.get_completed_sequence_numbers(), {2, 5})
+        response = self.post_lesson_ids([self.lessons[1].id, self.lessons[2].id])
+        self.assertEqual(json.loads(response.content.decode('utf-8')), {'added': 1})
+
+    def test_sequential_batch_progress(self):
+        """
+        Tests a sequential learner may complete consecutive lessons in one request but nothing is saved if any lesson
+        is out of sequence.
+        """
+        self.set_learning_style("Sequential")
+        response = self.post_lesson_ids([self.lessons[1].id, self.lessons[0].id])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_completed_sequence_numbers(), {1, 2})
+        response = self.post_lesson_ids([self.lessons[2].id, self.lessons[4].id])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.get_completed_sequence_numbers(), {1, 2})
+
+    def test_batch_progress_invalid_lessons(self):
+        """
+        Tests lessons of other courses and malformed requests are rejected.
+        """
+        self.set_learning_style("Global")
+        other_course = Courses.objects.create(author=self.test_student, title="", description="")
+        other_lesson = Lessons.objects.create(course=other_course, sequence_number=1, title="", description="")
+        self.assertEqual(self.post_lesson_ids([self.lessons[0].id, other_lesson.id]).status_code, 404)
+        self.assertEqual(self.post_lesson_ids(['one']).status_code, 400)
+        self.assertEqual(self.post_lesson_ids([]).status_code, 400)
+        # A string of ids is not read as the ids of its digits.
+        self.assertEqual(self.post_lesson_ids(str(self.lessons[0].id) + str(self.lessons[1].id)).status_code, 400)
+        self.assertEqual(self.post_lesson_ids({'1': 1}).status_code, 400)
+        self.assertEqual(self.get_completed_sequence_numbers(), set())
+
+
+class CoursesViewTest(TestCase):
+    def setUp(self):
+        """
+        Create more courses than fit on a page of the courses view.
+        """
+        # Manual assignment of primary key.
+        self.test_student = User.objects.create_user(id=1,
+                                                     username='MrTest', email='test@test.com', password='test')
+        self.courses = [Courses.objects.create(author=self.test_student, title=str(i), description="")
+                        for i in range(courses_page_size + 2)]
+        self.client.login(username='MrTest', password='test')
+
+    def test_courses_pages(self):
+        """
+        Tests the courses are split into pages and completion percentages are only computed for the page shown.
+        """
+        response = self.client.get('/courses')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['courses'], self.courses[:courses_page_size])
+        self.assertEqual(set(response.context['course_completion_percentages']),
+                         {course.id for course in self.courses[:courses_page_size]})
+        next_cursor = response.context['next_cursor']
+        self.assertEqual(next_cursor, self.courses[courses_page_size - 1].id)
+        response = self.client.get('/courses', {'after': next_cursor})
+        self.assertEqual(response.context['courses'], self.courses[courses_page_size:])
+        self.assertIsNone(response.context['next_cursor'])
+        response = self.client.get('/courses', {'after': self.courses[-1].id})
+        self.assertRedirects(response, '/courses', fetch_redirect_response=False)
+
+
+class SearchViewTest(TestCase):
+    def setUp(self):
+        """
+        Create more matching lessons than fit on a page of search results.
+        """
+        # Manual assignment of primary key.
+        self.test_student = User.objects.create_user(id=1,
+                                                     username='MrTest', email='test@test.com', password='test')
+        self.course = Courses.objects.create(author=self.test_student, title="Astronomy", description="")
+        self.lessons = [Lessons.objects.create(course=self.course, sequence_number=sequence_number, title="Planets",
+                                               description="") for sequence_number in range(1, search_page_size + 2)]
+        self.client.login(username='MrTest', password='test')
+
+    def test_search(self):
+        """
+        Tests results are paginated and link to the lesson they were found in, and empty queries are rejected.
+        """
+        response = self.client.get('/search', {'q': 'planet'})
+        self.assertEqual(response.status_code, 200)
+        content = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(len(content['results']), search_page_size)
+        self.assertEqual(content['next_page'], 2)
+        self.assertEqual(content['results'][0]['url'],
+                         '/courses/' + str(self.course.id) + '/lessons/' + str(self.lessons[0].id))
+        content = json.loads(self.client.get('/search', {'q': 'planet', 'page': 2}).content.decode('utf-8'))
+        self.assertEqual(len(content['results']), 1)
+        self.assertIsNone(content['next_page'])
+        content = json.loads(self.client.get('/search', {'q': 'astronomy'}).content.decode('utf-8'))
+        self.assertEqual(content['results'][0]['url'], '/courses/' + str(self.course.id))
+        self.assertEqual(self.client.get('/search', {'q': '  '}).status_code, 400)
+
+
+class StudentLearningStylesTest(TestCase):
+    def setUp(self):
+        """
+        Create a student with learning styles.
+        """
+        # Manual assignment of primary key.
+        self.test_student = User.objects.create_user(id=1,
+                                                     username='MrTest', email='test@test.com', password='test')
+        self.learning_styles = [LearningStyles.objects.create(name=name, spectrum_id=spectrum_id)
+                                for spectrum_id, name in enumerate(("Active", "Visual", "Sensing", "Global"))]
+        for learning_style in self.learning_styles:
+            UserLearningStyles.objects.create(user=self.test_student, learning_style=learning_style)
+
+    def get_request(self, session: SessionStore) -> HttpRequest:
+        request = HttpRequest()
+        request.session = session
+        return request
+
+    def test_memoized_learning_styles(self):
+        """
+        Tests a student's learning styles are read in one query, then memoized for the request and the session until
+        they are updated.
+        """
+        session = SessionStore()
+        request = self.get_request(session)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_student_learning_styles(self.test_student, request=request), self.learning_styles)
+        with self.assertNumQueries(0):
+            self.assertIs(get_student_learning_styles(self.test_student, request=request), request.learning_styles)
+            learning_styles = get_student_learning_styles(self.test_student, request=self.get_request(session))
+        self.assertEqual([(learning_style.id, learning_style.name) for learning_style in learning_styles],
+                         [(learning_style.id, learning_style.name) for learning_style in self.learning_styles])
+        update_student_learning_styles(self.test_student, self.learning_styles[:2], request=request)
+        self.assertEqual(get_student_learning_styles(self.test_student, request=request), self.learning_styles[:2])
+        # Other sessions of the student read the updated learning styles too.
+        other_session = SessionStore()
+        get_student_learning_styles(self.test_student, request=self.get_request(other_session))
+        update_student_learning_styles(self.test_student, self.learning_styles[2:])
+        self.assertEqual(get_student_learning_styles(self.test_student, request=self.get_request(other_session)),
+                         self.learning_styles[2:])
+
+
+class LearningStylesRegistryTest(TestCase):
+    def setUp(self):
+        """
+        Create learning styles, one of which the registry does not know, and save the registry to restore it.
+        """
+        self.global_style = LearningStyles(id=1, name="Global", spectrum_id=4)
+        self.sequential_style = LearningStyles(id=2, name="Sequential", spectrum_id=4)
+        self.visual_style = LearningStyles(id=3, name="Visual", spectrum_id=2)
+        self.saved_learning_styles = learning_styles_registry.copy()
+        self.saved_template_contexts = template_contexts_registry.copy()
+
+    def tearDown(self):
+        learning_styles_registry.clear()
+        learning_styles_registry.update(self.saved_learning_styles)
+        template_contexts_registry.clear()
+        template_contexts_registry.update(self.saved_template_contexts)
+        resolve_learning_styles_signature.cache_clear()
+
+    def test_default_learning_styles(self):
+        """
+        Tests the learning styles registered at startup resolve to their templates, and unknown learning styles to
+        none.
+        """
+        self.assertEqual(get_learning_styles_template([self.visual_style, self.global_style]),
+                         courses_lessons_global_template)
+        self.assertEqual(get_learning_styles_template([self.sequential_style]), courses_lessons_sequential_template)
+        with self.assertRaises(TemplateDoesNotExistException):
+            get_learning_styles_template([self.visual_style])
+        with self.assertRaises(InvalidUserLessonProgressRequestException):
+            update_user_lesson_progress_protocols(None, [self.visual_style], None)
+
+    def test_rules_cached_per_signature(self):
+        """
+        Tests the rules of a signature are resolved once regardless of the order of the learning styles.
+        """
+        resolve_learning_styles_signature.cache_clear()
+        rules = get_learning_styles_rules([self.visual_style, self.global_style])
+        self.assertIs(get_learning_styles_rules([self.global_style, self.visual_style]), rules)
+        self.assertEqual(resolve_learning_styles_signature.cache_info().misses, 1)
+
+    def test_register_learning_style(self):
+        """
+        Tests a newly registered learning style is used without changes to the rule-sets.
+        """
+        get_learning_styles_rules([self.visual_style])
+        updated = []
+        register_learning_style("Visual", template="students/courses_lessons_visual.html",
+                                template_context=lambda user, course: {"visual": True},
+                                update_progress=lambda student, lesson: updated.append(lesson),
+                                validate_progress=lambda completed_lessons, lesson: True)
+        template = get_learning_styles_template([self.visual_style])
+        self.assertEqual(template, "students/courses_lessons_visual.html")
+        self.assertEqual(generate_template_context(template, None, None), {"visual": True})
+        update_user_lesson_progress_protocols(None, [self.visual_style], "lesson")
+        self.assertEqual(updated, ["lesson"])
+
+
+class LearningStylesConfigurationViewTest(TestCase):
+    def setUp(self):
+        """
+        Create a learning style on each side of the four spectra and a student with a lesson to complete.
+        """
+        # Manual assignment of primary key.
+        self.test_student = User.objects.create_user(id=1,
+                                                     username='MrTest', email='test@test.com', password='test')
+        self.learning_styles = {name: LearningStyles.objects.create(name=name, spectrum_id=spectrum_id)
+                                for spectrum_id, names in enumerate((("Active", "Reflective"),
+                                                                     ("Sequential", "Global"), ("Visual", "Verbal"),
+                                                                     ("Sensing", "Intuitive")))
+                                for name in names}
+        course = Courses.objects.create(author=self.test_student, title="", description="")
+        self.lesson = Lessons.objects.create(course=course, sequence_number=1, title="", description="")
+        self.client.login(username='MrTest', password='test')
+
+    def post_learning_styles(self, *names):
+        learning_styles = [self.learning_styles[name] for name in names]
+        return self.client.post('/settings', {'active_reflective': learning_styles[0].id,
+                                              'sequential_global': learning_styles[1].id,
+                                              'visual_verbal': learning_styles[2].id,
+                                              'sensing_intuitive': learning_styles[3].id})
+
+    def test_progress_kept_unless_learning_styles_change(self):
+        """
+        Tests saving the same learning styles keeps the student's progress and changing them deletes it.
+        """
+        self.post_learning_styles("Active", "Global", "Visual", "Sensing")
+        add_user_completed_lesson(self.test_student, self.lesson)
+        self.assertEqual(self.post_learning_styles("Active", "Global", "Visual", "Sensing").status_code, 200)
+        self.assertEqual(UserLessonsCompleted.objects.filter(user=self.test_student).count(), 1)
+        self.post_learning_styles("Active", "Sequential", "Visual", "Sensing")
+        self.assertEqual(UserLessonsCompleted.objects.filter(user=self.test_student).count(), 0)
+        self.assertEqual({learning_style.name for learning_style in get_student_learning_styles(self.test_student)},
+                         {"Active", "Sequential", "Visual", "Sensing"})
+
+
+class CoursesLessonsResourcesViewTest(TestCase):
+    def setUp(self):
+        """
+        Create a lesson with learning resources for learning styles on two spectra and a student.
+        """
+        # Manual assignment of primary key.
+        self.test_student = User.objects.create_user(id=1,
+                                                     username='MrTest', email='test@test.com', password='test')
+        self.course = Courses.objects.create(author=self.test_student, title="", description="")
+        self.lesson = Lessons.objects.create(course=self.course, sequence_number=1, title="", description="")
+        self.learning_styles = {name: LearningStyles.objects.create(name=name, spectrum_id=spectrum_id)
+                                for spectrum_id, name in ((2, "Visual"), (2, "Verbal"), (0, "Active"))}
+        UserLearningStyles.objects.create(user=self.test_student, learning_style=self.learning_styles["Visual"])
+        self.client.login(username='MrTest', password='test')
+
+    def create_resources(self, count: int):
+        for i in range(count):
+            for learning_style in self.learning_styles.values():
+                LessonsLearningStylesResources.objects.create(
+                    lesson=self.lesson, learning_style=learning_style, resource=Resources.objects.create(file="foo"),
+                    title=learning_style.name, description="")
+
+    def get_resources(self):
+        return self.client.get('/courses/' + str(self.course.id) + '/lessons/' + str(self.lesson.id))
+
+    def test_ranked_resources(self):
+        """
+        Tests the student's resources are listed first and the rest are ranked, in the same number of queries
+        regardless of the number of resources.
+        """
+        self.create_resources(1)
+        self.get_resources()
+        # The session, the student, their progress on the lesson and their roles (read as the course's tree and the
+        # student's learning styles are cached).
+        with self.assertNumQueries(4):
+            response = self.get_resources()
+        self.assertEqual([resource.title for resource in response.context['users_resources']], ["Visual"])
+        # Resources of a spectrum the student is not placed on rank ahead of those of the opposite learning style.
+        self.assertEqual([resource.title for resource in response.context['additional_resources']],
+                         ["Active", "Verbal"])
+        self.create_resources(10)
+        self.get_resources()
+        with self.assertNumQueries(4):
+            response = self.get_resources()
+        self.assertEqual(len(response.context['users_resources']) + len(response.context['additional_resources']), 33)
@@ -2,30 +2,49 @@ from collections import Iterable
 
 from django.contrib.auth.models import User
 
-from courses.models import Lessons
+from communicate.students import add_student_completed_lessons, mark_student_progress_completed_lesson
+from courses.models import Lessons, Courses
 from students_interfaces.exceptions.update_exceptions import InvalidUserLessonProgressRequestException
-from students_interfaces.update.student_progress import sequential_update_lesson_complete, global_update_lesson_complete
+from students_interfaces.registry import get_learning_styles_rules
+from students_interfaces.update.student_progress import get_student_completed_lessons_snapshot
 
 
 def update_user_lesson_progress_protocols(student : User, learning_styles: Iterable,
                                           lesson: Lessons):
     # If there are special rules to follow for a learning style when marking a lesson as complete the functions for
-    # that learning style should be added as functions and passed by the
-    # execute_update_user_lesson_progress_protocols() method. One example where this is useful is to ensure
-    # sequential users cannot complete lessons out of bounds of the last lesson they completed).
+    # that learning style should be registered with it in the learning styles registry (see
+    # students_interfaces.registry). One example where this is useful is to ensure sequential users cannot complete
+    # lessons out of bounds of the last lesson they completed).
 
     # Invalid requests can be handled by the custom exception defined.
-    # Define the protocols / rule-sets. Each of these will be executed in turn.
-    # Flag to indicate whether statements have been executed (so we know whether to execute the default ruleset).
-    statements_executed = False
-    for learning_style in learning_styles:
-        # Define arguments here
-        if learning_style.name == "Sequential":
-            sequential_update_lesson_complete(student, lesson=lesson)
-            statements_executed = True
-        if learning_style.name == "Global":
-            global_update_lesson_complete(student, lesson=lesson)
-            statements_executed = True
-    # If no protocols are executed then the system is not apt to handle the data.
-    if not statements_executed:
+    # The registered protocols / rule-sets of the student's learning styles, each of these will be executed in turn.
+    update_progress = get_learning_styles_rules(learning_styles).update_progress
+    # If no protocols are registered then the system is not apt to handle the data.
+    if not update_progress:
         raise InvalidUserLessonProgressRequestException
+    for update_lesson_complete in update_progress:
+        update_lesson_complete(student, lesson=lesson)
+
+
+def update_user_lessons_progress_protocols(student: User, learning_styles: Iterable, lessons: Iterable,
+                                           course: Courses) -> int:
+    # The batch counterpart of update_user_lesson_progress_protocols() for lessons of a single course. The same rules
+    # validate each lesson in sequence order against one snapshot of the student's progress, which is updated in
+    # memory as each lesson is accepted (so a sequential learner may complete several consecutive lessons at once).
+    # If any lesson is invalid then nothing is saved, otherwise the lessons are saved in a single transaction.
+    validate_progress = get_learning_styles_rules(learning_styles).validate_progress
+    # If no protocols are registered then the system is not apt to handle the data.
+    if not validate_progress:
+        raise InvalidUserLessonProgressRequestException
+    completed_lessons = get_student_completed_lessons_snapshot(student, course)
+    lessons_to_add = []
+    for lesson in sorted(lessons, key=lambda lesson: lesson.sequence_number):
+        add_lesson = False
+        for validate_lesson_complete in validate_progress:
+            add_lesson = validate_lesson_complete(completed_lessons, lesson)
+        if add_lesson:
+            lessons_to_add.append(lesson)
+            completed_lessons = mark_student_progress_completed_lesson(completed_lessons, lesson)
+    if not lessons_to_add:
+        return 0
+    return add_student_completed_lessons(student, lessons_to_add)
@@ -1,58 +1,52 @@
 from django.contrib.auth.models import User
 
-from communicate.students import has_next_lesson, get_next_lesson
-from communicate.students import has_student_completed_lesson, get_student_completed_lessons_sorted, \
-    has_student_completed_any_course_lessons, add_student_completed_lesson
-from courses.models import Lessons
+from communicate.exceptions.courses_exceptions import ProgressNotFound
+from communicate.students import add_student_completed_lesson, get_student_course_progress, \
+    get_student_course_completed_lessons, has_student_progress_completed_lesson, \
+    get_student_progress_contiguous_sequence_number
+from courses.models import Lessons, Courses
 from students_interfaces.exceptions.update_exceptions import InvalidUserLessonProgressRequestException
 
 
-def sequential_update_lesson_complete(student: User, lesson: Lessons):
-    # If the lesson is already complete then do nothing.
-    if has_student_completed_lesson(student, lesson):
-        return True
+def get_student_completed_lessons_snapshot(student: User, course: Courses) -> int:
+    # A snapshot of the lessons the student has completed for the course as a bitmap indexed by sequence number (a
+    # single read of their progress summary). Rules validate against the snapshot rather than querying per lesson.
+    try:
+        return get_student_course_completed_lessons(get_student_course_progress(student, course))
+    except ProgressNotFound:
+        return 0
 
-    # Otherwise validate that this is the next lesson in their sequence (if one exists). If it is not then throw an
-    # error, likely that someone is trying to abuse POST).
-    else:
-        # Get the save data for the user sorted by sequence number (a QuerySet of UserLessonsCompleted objects
-        # indicating which lessons are completed).
-        lesson_save_data = get_student_completed_lessons_sorted(student,
-                                                                lesson.course)
-        # Since our queryset has defined ordering we can use the reverse method to get the last item in the set.
-        # https://docs.djangoproject.com/en/dev/ref/models/querysets/#reverse.
-
-        # If the user has completed lessons in the past from the course the lesson is on, then get the last completed
-        #  lesson from the users save data as a lesson object. If the next lesson exists we need to check that this
-        # lesson is the one the user is trying to mark as complete.
-        if has_student_completed_any_course_lessons(student, lesson.course):
-            last_completed_lesson = lesson_save_data.reverse()[0].lesson
-            if has_next_lesson(last_completed_lesson):
-                next_lesson = get_next_lesson(last_completed_lesson)
-                # Succeeding this we can create the save data (the == operator checks object's for logical
-                # equivalence).
-                if next_lesson == lesson:
-                    add_student_completed_lesson(student, lesson)
-                    return True
-                # If the course has the next lesson but this is not the lesson we are trying to mark completed then
-                # raise the custom InvalidUserLessonProgressRequestException exception (handled by the except clause
-                # of the calling statement).
-                else:
-                    raise InvalidUserLessonProgressRequestException()
-        else:
-            # If the user has not completed a lesson on the specified course before then check the lessons sequence
-            # number is equal to 1. If they have not completed a course lesson before then raise the custom
-            # InvalidUserLessonProgressRequestException exception (handled by the except clause of the calling
-            # statement).
-            if lesson.sequence_number == 1:
-                add_student_completed_lesson(student, lesson)
-            else:
-                raise InvalidUserLessonProgressRequestException()
 
+def sequential_validate_lesson_complete(completed_lessons: int, lesson: Lessons) -> bool:
+    # If the lesson is already complete then there is nothing to add.
+    if has_student_progress_completed_lesson(completed_lessons, lesson):
+        return False
 
-def global_update_lesson_complete(student: User, lesson: Lessons):
-    if has_student_completed_lesson(student, lesson):
+    # Otherwise validate that this is the next lesson in their sequence (if one exists). If the student has not
+    # completed a lesson on the specified course before then the lesson must be the first in the sequence. If this is
+    # not the lesson following the last completed lesson then raise the custom
+    # InvalidUserLessonProgressRequestException exception (handled by the except clause of the calling statement,
+    # likely that someone is trying to abuse POST).
+    if lesson.sequence_number == get_student_progress_contiguous_sequence_number(completed_lessons) + 1:
         return True
     else:
+        raise InvalidUserLessonProgressRequestException()
+
+
+def global_validate_lesson_complete(completed_lessons: int, lesson: Lessons) -> bool:
+    # Global learners may complete lessons in any order, so only lessons which are already complete are skipped.
+    return not has_student_progress_completed_lesson(completed_lessons, lesson)
+
+
+def sequential_update_lesson_complete(student: User, lesson: Lessons):
+    completed_lessons = get_student_completed_lessons_snapshot(student, lesson.course)
+    # Succeeding validation we can create the save data.
+    if sequential_validate_lesson_complete(completed_lessons, lesson):
         add_student_completed_lesson(student, lesson)
-        return True
+    return True
+
+
+def global_update_lesson_complete(student: User, lesson: Lessons):
+    # Adding the save data is idempotent so a lesson which is already complete needs no check beforehand.
+    add_student_completed_lesson(student, lesson)
+    return True
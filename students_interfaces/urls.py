@@ -23,6 +23,10 @@ urlpatterns = [
         views.CoursesLessonsMakeProgressView.as_view(),
         name='courses_lessons_progress'),
 
+    url(r'^courses/(?P<course_id>[0-9]+)/lessons/complete/?$',
+        views.CoursesLessonsBatchProgressView.as_view(),
+        name='courses_lessons_batch_progress'),
+
     url(r'^courses/(?P<course_id>[0-9]+)/purge_progress/?$',
         views.CoursesLessonsPurgeProgressView.as_view(),
         name='courses_purge_progress'),
@@ -34,4 +38,7 @@ urlpatterns = [
 
     url(r'^settings/?$', views.LearningStylesConfigurationView.as_view(), name="settings"),
 
+    # /bark/search?q=<query>&page=<page>
+    url(r'^search/?$', views.SearchView.as_view(), name="search"),
+
 ]
@@ -1,31 +1,43 @@
+import json
+
 from django.contrib import messages
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, redirect
+from django.urls import reverse
 from django.views import View
 
+from bark.pagination import get_page_cursor
 from communicate.exceptions.courses_exceptions import CourseNotFoundException
 from communicate.exceptions.learning_resources_exceptions import NoLearningResourcesExistException
 from communicate.exceptions.learning_styles_exceptions import NoLearningStylesException
 from communicate.exceptions.lessons_exceptions import LessonNotFoundException
+from communicate.exceptions.search_exceptions import InvalidSearchQueryException, SearchUnavailableException
 from communicate.exceptions.static_containers import RenderResourceFailedException
+from communicate.search import search_catalog
 from communicate.static_containers import lessonslearningstyleresource_to_nginx_alpine_static_container
-from communicate.students import get_all_courses, get_course_lesson, get_learning_resources, \
-    get_all_learning_resources_except_learningstyles_from_list, get_course, get_lesson_resource
+from communicate.students import get_courses_page, get_course_lesson, get_lesson_ranked_learning_resources, \
+    get_course, get_lesson_resource, get_course_lessons_from_id_list
 from communicate.students import get_student_course_completion_percentages, get_student_learning_styles, \
-    has_student_completed_lesson, delete_course_student_progress, update_student_learning_styles, \
-    delete_all_student_progress
+    has_student_completed_lesson, delete_course_student_progress, update_student_learning_styles
 from learning_styles.forms import LearningStylesConfigurationForm
 from students_interfaces.exceptions.context_exceptions import UndefinedContextException
 from students_interfaces.exceptions.template_exceptions import TemplateDoesNotExistException
 from students_interfaces.exceptions.update_exceptions import InvalidUserLessonProgressRequestException
 from students_interfaces.generator.register_template_context_rules import generate_template_context
 from students_interfaces.generator.template import get_learning_styles_template
-from students_interfaces.update.register_progress_update_rules import update_user_lesson_progress_protocols
+from students_interfaces.update.register_progress_update_rules import update_user_lesson_progress_protocols, \
+    update_user_lessons_progress_protocols
 
 courses_template = "students/courses.html"
 lessons_resources_template = "students/lessons_resources.html"
 learning_style_settings_template = 'students/settings.html'
 render_resources_template = "students/resources_render.html"
+# The most lessons which may be completed by a single batch progress request.
+maximum_batch_progress_lessons = 1000
+# The number of courses shown per page of the courses view.
+courses_page_size = 20
+# The number of results returned per page of the search view.
+search_page_size = 20
 
 
 class CoursesView(View):
@@ -36,16 +48,22 @@ class CoursesView(View):
         user = request.user
         # Get the users user_profile
         context = {}
+        after = get_page_cursor(request)
         try:
-            courses = get_all_courses()
+            courses, next_cursor = get_courses_page(after=after, page_size=courses_page_size)
         except:
             messages.error(request,
                            'An error has occurred (^・x・^). Looks like we do not have any courses right about now! '
                            'Sorry about that!')
             return redirect("/")
+        # A cursor past the last course (e.g. the courses were deleted) starts again from the first page.
+        if not courses:
+            return redirect("students_interfaces:courses")
+        # Only the courses of the page are shown so only their completion percentages are computed.
         completion_percentages = get_student_course_completion_percentages(user, courses)
         context.update({'courses': courses})
         context.update({'course_completion_percentages': completion_percentages})
+        context.update({'cursor': after, 'next_cursor': next_cursor})
         return render(request, courses_template, context)
 
 
@@ -65,7 +83,7 @@ class CoursesLessonsView(View):
             # Redirect to the home page
             return redirect("/")
         try:
-            learning_styles = get_student_learning_styles(student)
+            learning_styles = get_student_learning_styles(student, request=request)
         except NoLearningStylesException:
             messages.error(request,
                            'An error has occurred (^・x・^). We are unable to display lesson content for you until '
@@ -119,25 +137,23 @@ class CoursesLessonsResourcesView(View):
 
         # Check if student has any learning styles
         try:
-            learning_styles = get_student_learning_styles(student)
+            learning_styles = get_student_learning_styles(student, request=request)
         except NoLearningStylesException:
             messages.error(request,
                            'An error has occurred (^・x・^). We could not find any learning styles associated with your '
                            'account. Please try assigning some in the settings menu, or get in touch!')
             return redirect("/")
 
-        try:
-            student_resources = get_learning_resources(learning_styles, lesson)
-        except NoLearningResourcesExistException:
+        # The lesson's resources are read from the course's cached tree and ranked against the student's learning
+        # styles, the resources for their learning styles are listed first and the rest (best first) as additional.
+        ranked_resources = get_lesson_ranked_learning_resources(learning_styles, lesson)
+        student_resources = [resource for resource, score in ranked_resources if score > 0]
+        additional_lesson_resources = [resource for resource, score in ranked_resources if score <= 0]
+        if not student_resources:
             messages.error(request,
                            '(^・x・^). Looks like we do not have any resources suited for you for this lesson! Sorry '
                            'about that!')
-            student_resources = []
-        additional_lesson_resources = []
-        try:
-            additional_lesson_resources = get_all_learning_resources_except_learningstyles_from_list(learning_styles,
-                                                                                                     lesson)
-        except NoLearningResourcesExistException:
+        if not additional_lesson_resources:
             messages.error(request,
                            '(^・x・^). We could not find any additional resources for this '
                            'lesson! Sorry '
@@ -176,7 +192,7 @@ class CoursesLessonsMakeProgressView(View):
                            'Please contact us so we can fix this right away!')
             return HttpResponse(status=500)
         try:
-            learning_styles = get_student_learning_styles(student)
+            learning_styles = get_student_learning_styles(student, request=request)
         except NoLearningStylesException:
             messages.error(request,
                            'An error has occurred (^・x・^). We are unable to display lesson content for you until '
@@ -200,6 +216,77 @@ class CoursesLessonsMakeProgressView(View):
                         course.id)  # Performs the function of purging user progress of a given course
 
 
+class CoursesLessonsBatchProgressView(View):
+    """
+    Function View, passed when students (e.g. offline or mobile clients syncing) want to make progress on many lessons
+    of a course at once. Lesson ids are sent as a JSON body {"lesson_ids": [...]} or as repeated lesson_ids form
+    fields and the outcome is returned as JSON.
+    """
+    def post(self, request, course_id):
+        student = request.user
+        try:
+            if request.content_type == 'application/json':
+                lesson_ids = json.loads(request.body.decode('utf-8'))['lesson_ids']
+            else:
+                lesson_ids = request.POST.getlist('lesson_ids')
+            # A string (or any other iterable) would otherwise be read as a list of its characters.
+            if not isinstance(lesson_ids, list):
+                raise TypeError
+            lesson_ids = [int(lesson_id) for lesson_id in lesson_ids]
+        except (ValueError, TypeError, KeyError):
+            return JsonResponse({'error': 'Expected a list of lesson ids.'}, status=400)
+        if not lesson_ids or len(lesson_ids) > maximum_batch_progress_lessons:
+            return JsonResponse({'error': 'Expected between 1 and ' + str(maximum_batch_progress_lessons) +
+                                          ' lesson ids.'}, status=400)
+        try:
+            course = get_course(course_id)
+        except CourseNotFoundException:
+            return JsonResponse({'error': 'The course does not exist.'}, status=404)
+        # Identify if the requested lessons *belong to* the requested course (in a single query).
+        try:
+            lessons = get_course_lessons_from_id_list(lesson_ids, course)
+        except LessonNotFoundException:
+            return JsonResponse({'error': 'A lesson does not exist in the course.'}, status=404)
+        try:
+            learning_styles = get_student_learning_styles(student, request=request)
+        except NoLearningStylesException:
+            return JsonResponse({'error': 'Learning styles must be set before making progress.'}, status=400)
+
+        # Execute the rule set for that learning style against every lesson, if any lesson is invalid nothing is saved.
+        try:
+            added = update_user_lessons_progress_protocols(student=student, learning_styles=learning_styles,
+                                                           lessons=lessons, course=course)
+        except InvalidUserLessonProgressRequestException:
+            return JsonResponse({'error': 'The lessons cannot be completed in this order.'}, status=400)
+        return JsonResponse({'added': added})
+
+
+class SearchView(View):
+    """
+    Function View, searches the titles and descriptions of courses, lessons and learning resources for the "q" query
+    parameter and returns a page (the "page" query parameter) of results as JSON, best matches first.
+    """
+    def get(self, request):
+        query = request.GET.get('q', '')
+        page = request.GET.get('page', '1')
+        page = int(page) if page.isdigit() and int(page) > 0 else 1
+        try:
+            results, has_next_page = search_catalog(query, page=page, page_size=search_page_size)
+        except InvalidSearchQueryException:
+            return JsonResponse({'error': 'Expected a search query.'}, status=400)
+        except SearchUnavailableException:
+            return JsonResponse({'error': 'Search is not available.'}, status=503)
+        for result in results:
+            # Lessons and learning resources are found on the page of their lesson's resources.
+            if result['document'] == 'course':
+                result['url'] = reverse('students_interfaces:courses_lessons', args=[result['course_id']])
+            else:
+                result['url'] = reverse('students_interfaces:courses_lessons_resources',
+                                        args=[result['course_id'], result['lesson_id']])
+        return JsonResponse({'query': query, 'page': page, 'next_page': page + 1 if has_next_page else None,
+                             'results': results})
+
+
 class LearningStylesConfigurationView(View):
     """
     View to configure LearningStyles
@@ -214,7 +301,6 @@ class LearningStylesConfigurationView(View):
         config_form = LearningStylesConfigurationForm(request.POST)
         learning_styles = []
         if config_form.is_valid():
-            delete_all_student_progress(student)
             # Define a new list of the learning_styles to update with.
             # Add any desired updates to this list.
             learning_styles = [config_form.cleaned_data["active_reflective"],
@@ -227,8 +313,8 @@ class LearningStylesConfigurationView(View):
                 string = string + learning_style.name + " "
             # Append to learning styles list cleaned data [no injections].
             # Get the user we will be updating.
-            # Update learning styles
-            update_student_learning_styles(student, learning_styles)
+            # Update learning styles, progress made under the previous learning styles is deleted only if they changed.
+            update_student_learning_styles(student, learning_styles, request=request, purge_progress=True)
             messages.success(request,
                              'We have updated your learning styles ฅ^•ﻌ•^ฅ We can see you are an ' + str(
                                  string) + " learner! Happy Learning!")